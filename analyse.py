@@ -1,3 +1,7 @@
+import re
+import threading
+from datetime import timedelta
+from functools import lru_cache
 import pandas as pd
 import numpy as np
 
@@ -42,6 +46,50 @@ def normalize_charge(charge):
     return ((charge - 1) / 4) * 100
 
 
+# Indicateurs de forme : True si l'indicateur doit être inversé (plus haut = plus négatif)
+INDICATEURS_FORME = {
+    'fatigue': True,
+    'sommeil': False,
+    'douleur': True,
+    'stress': True,
+    'humeur': False,
+}
+
+
+def compute_charge_batch(df_suivi):
+    """
+    Calcule la charge brute et normalisée de toutes les lignes d'un DataFrame
+    (une ou plusieurs joueuses) en une seule passe NumPy.
+
+    Équivalent vectorisé de compute_charge + normalize_charge : un indicateur
+    absent (colonne manquante) vaut 3, comme avec row.get(..., 3).
+
+    Args:
+        df_suivi: DataFrame de suivi de forme (fatigue, sommeil, douleur, stress, humeur,
+            et éventuellement joueuse_id et date)
+
+    Returns:
+        DataFrame: Colonnes 'charge' et 'charge_norm' alignées sur l'index d'origine,
+            précédées de 'joueuse_id' et 'date' lorsqu'elles sont présentes
+    """
+    n = len(df_suivi)
+    total = np.zeros(n, dtype=float)
+
+    for col, inverse in INDICATEURS_FORME.items():
+        if col in df_suivi.columns:
+            valeurs = df_suivi[col].to_numpy(dtype=float, na_value=np.nan)
+        else:
+            valeurs = np.full(n, 3.0)
+        total += (6 - valeurs) if inverse else valeurs
+
+    charge = total / 5
+
+    res = df_suivi[[c for c in ('joueuse_id', 'date') if c in df_suivi.columns]].copy()
+    res['charge'] = charge
+    res['charge_norm'] = normalize_charge(charge)
+    return res
+
+
 def compute_variability(df_suivi):
     """
     Calcule la variabilité de la charge psycho-physiologique.
@@ -61,76 +109,568 @@ def compute_variability(df_suivi):
     # Calcul de l'écart-type
     std_dev = df_suivi['charge_norm'].std()
     
-    # Classification de la variabilité
+    return niveau_variabilite(std_dev), std_dev
+
+
+def niveau_variabilite(std_dev):
+    """Classification de l'écart-type de la charge normalisée."""
     if std_dev < 10:
-        niveau = "Faible"
+        return "Faible"
     elif std_dev < 20:
-        niveau = "Modérée"
+        return "Modérée"
     else:
-        niveau = "Élevée"
+        return "Élevée"
+
+
+# Durées saisies librement : "1h", "1h30", "1 h 15", "45 min", "20'", "1:30", "1,5 h", "90"...
+_RE_DUREE = re.compile(
+    r"^(?:(?P<heures>\d+(?:[.,]\d+)?)\s*(?:h|hr|hrs|heures?)\s*)?"
+    r"(?:(?P<minutes>\d+)\s*(?P<unite>min(?:ute)?s?|mn|m|'|’|′)?)?$"
+)
+_RE_HORAIRE = re.compile(r"^(?P<heures>\d{1,2})\s*:\s*(?P<minutes>\d{2})$")
+_RE_NOMBRE = re.compile(r"^\d+(?:[.,]\d+)?$")
+# Un nombre seul jusqu'à cette valeur est compris en heures ("2"), au-delà en minutes ("90")
+MAX_HEURES_SANS_UNITE = 4
+
+
+@lru_cache(maxsize=4096)
+def _minutes(texte):
+    """Durée libre -> minutes (NaN si non reconnue). Mise en cache par chaîne."""
+    t = texte.strip().lower().rstrip(".")
+    if not t:
+        return np.nan
+    
+    horaire = _RE_HORAIRE.match(t)
+    if horaire:
+        return float(int(horaire['heures']) * 60 + int(horaire['minutes']))
+    
+    if _RE_NOMBRE.match(t):
+        nombre = float(t.replace(',', '.'))
+        return nombre * 60 if nombre <= MAX_HEURES_SANS_UNITE else nombre
     
-    return niveau, std_dev
+    duree = _RE_DUREE.match(t)
+    if duree is None or (duree['heures'] is None and duree['minutes'] is None):
+        return np.nan
+    minutes = float(duree['minutes'] or 0)
+    if duree['heures'] is not None:
+        minutes += float(duree['heures'].replace(',', '.')) * 60
+    return minutes
 
 
-def correlation_difficulte_plaisir(df_activites):
+def duree_en_minutes(durees):
     """
-    Calcule la corrélation entre difficulté et plaisir.
+    Convertit une colonne de durées libres (activites.duree) en minutes.
+    
+    Chaque chaîne distincte n'est analysée qu'une fois (et reste en cache
+    d'un appel à l'autre) ; les valeurs sont ensuite propagées en bloc.
     
     Args:
-        df_activites: DataFrame contenant au minimum les colonnes 'difficulte', 'plaisir' et 'sport'
+        durees: Series de chaînes ("1h", "45 min", "1h30"...)
     
     Returns:
-        dict: Dictionnaire contenant la corrélation globale et par sport
+        Series: minutes (float), NaN si la durée est vide ou non reconnue
+    """
+    textes = durees.fillna("").astype(str)
+    minutes = {t: _minutes(t) for t in pd.unique(textes)}
+    return textes.map(minutes).astype(float)
+
+
+def durees_non_reconnues(durees):
+    """Chaînes non vides de `durees` que duree_en_minutes ne sait pas convertir."""
+    textes = pd.unique(durees.dropna().astype(str))
+    return sorted(t for t in textes if t.strip() and np.isnan(_minutes(t)))
+
+
+def charge_seance_batch(df_activites):
+    """
+    Charge de séance (session-RPE : difficulté x durée en minutes) de toutes
+    les lignes d'un DataFrame d'activités (une ou plusieurs joueuses).
+    
+    Args:
+        df_activites: DataFrame avec 'duree' et 'difficulte' (et éventuellement
+            joueuse_id et date)
+    
+    Returns:
+        DataFrame: colonnes 'minutes' et 'charge_seance' (NaN si la durée n'est
+            pas reconnue) alignées sur l'index d'origine, précédées de
+            'joueuse_id' et 'date' lorsqu'elles sont présentes
+    """
+    res = df_activites[[c for c in ('joueuse_id', 'date') if c in df_activites.columns]].copy()
+    res['minutes'] = duree_en_minutes(df_activites['duree'])
+    res['charge_seance'] = pd.to_numeric(df_activites['difficulte'], errors='coerce') * res['minutes']
+    return res
+
+
+def totaux_hebdomadaires(df_jours):
+    """
+    Volume d'entraînement par semaine (du lundi au dimanche) à partir des
+    agrégats journaliers.
+    
+    Args:
+        df_jours: agrégats journaliers (date, nb_seances, minutes, charge_seance,
+            nb_durees_inconnues)
+    
+    Returns:
+        DataFrame: semaine (lundi), nb_seances, minutes, charge_seance et
+            nb_durees_inconnues, de la semaine la plus récente à la plus ancienne
+    """
+    colonnes = ['nb_seances', 'minutes', 'charge_seance', 'nb_durees_inconnues']
+    if df_jours.empty:
+        return pd.DataFrame(columns=['semaine', *colonnes])
+    
+    dates = pd.to_datetime(df_jours['date'])
+    semaines = dates - pd.to_timedelta(dates.dt.weekday, unit='D')
+    res = df_jours[colonnes].fillna(0).groupby(semaines.rename('semaine')).sum()
+    res = res.sort_index(ascending=False).reset_index()
+    res['semaine'] = res['semaine'].dt.date
+    return res
+
+
+def agreger_activites(df_activites):
+    """
+    Agrégats journaliers des activités, par joueuse et par date.
+    
+    Args:
+        df_activites: DataFrame avec 'joueuse_id', 'date', 'plaisir', 'difficulte'
+            et 'duree'
+    
+    Returns:
+        DataFrame: joueuse_id, date, nb_seances, plaisir et difficulte (moyennes
+            du jour), minutes et charge_seance (totaux du jour, séances à durée
+            reconnue) et nb_durees_inconnues
+    """
+    colonnes = ['joueuse_id', 'date', 'nb_seances', 'plaisir', 'difficulte',
+                'minutes', 'charge_seance', 'nb_durees_inconnues']
+    if df_activites.empty:
+        return pd.DataFrame(columns=colonnes)
+    
+    volume = charge_seance_batch(df_activites)
+    df = df_activites[['joueuse_id', 'date', 'plaisir', 'difficulte']].assign(
+        minutes=volume['minutes'],
+        charge_seance=volume['charge_seance'],
+        nb_durees_inconnues=volume['minutes'].isna().astype(int),
+    )
+    groupes = df.groupby(['joueuse_id', 'date'])
+    res = groupes[['plaisir', 'difficulte']].mean()
+    res[['minutes', 'charge_seance', 'nb_durees_inconnues']] = \
+        groupes[['minutes', 'charge_seance', 'nb_durees_inconnues']].sum()
+    res['nb_seances'] = groupes.size()
+    return res.reset_index()[colonnes]
+
+
+def agreger_suivi_forme(df_suivi):
+    """
+    Agrégats journaliers du suivi de forme, par joueuse et par date.
+    
+    La charge normalisée est agrégée par sa moyenne et par la moyenne de son
+    carré, ce qui suffit à retrouver moyenne et écart-type sur une période
+    (voir charge_periode).
+    
+    Args:
+        df_suivi: DataFrame avec 'joueuse_id', 'date' et les cinq indicateurs
+    
+    Returns:
+        DataFrame: joueuse_id, date, nb_suivis, moyennes des cinq indicateurs,
+            charge et charge_carre
+    """
+    indicateurs = list(INDICATEURS_FORME)
+    colonnes = ['joueuse_id', 'date', 'nb_suivis', *indicateurs, 'charge', 'charge_carre']
+    if df_suivi.empty:
+        return pd.DataFrame(columns=colonnes)
+    
+    charge = compute_charge_batch(df_suivi)['charge_norm']
+    df = df_suivi.reindex(columns=['joueuse_id', 'date', *indicateurs]) \
+        .assign(charge=charge, charge_carre=charge ** 2)
+    groupes = df.groupby(['joueuse_id', 'date'])
+    res = groupes[[*indicateurs, 'charge', 'charge_carre']].mean()
+    res['nb_suivis'] = groupes.size()
+    return res.reset_index()[colonnes]
+
+
+# Moyennes des agrégats journaliers, par compteur qui les pondère, et totaux du jour
+MOYENNES_AGREGATS = {
+    'nb_seances': ['plaisir', 'difficulte'],
+    'nb_suivis': [*INDICATEURS_FORME, 'charge', 'charge_carre'],
+}
+TOTAUX_AGREGATS = ['minutes', 'charge_seance', 'nb_durees_inconnues']
+
+
+def cumuler_agregats(df_jours, df_delta, signe=1):
+    """
+    Ajoute (signe=1) ou retire (signe=-1) les agrégats de quelques lignes
+    brutes à des agrégats journaliers, sans relire les autres lignes du jour :
+    les moyennes sont recombinées en les pondérant par leurs compteurs.
+
+    Args:
+        df_jours: agrégats journaliers d'une joueuse (date, compteurs, moyennes...)
+        df_delta: agrégats des lignes ajoutées ou retirées (sortie de
+            agreger_activites ou agreger_suivi_forme)
+        signe: 1 pour un ajout, -1 pour une suppression
+
+    Returns:
+        DataFrame: agrégats journaliers triés par date ; un jour absent est
+            créé, les moyennes d'un jour dont toutes les lignes sont retirées valent NaN
+    """
+    if 'date' in df_jours.columns:
+        jours = df_jours.set_index('date')
+    else:
+        jours = pd.DataFrame(index=pd.Index([], name='date'))
+    delta = df_delta.drop(columns='joueuse_id', errors='ignore').set_index('date')
+    jours = jours.reindex(jours.index.union(delta.index))
+    delta = delta.reindex(jours.index)
+
+    for compteur, moyennes in MOYENNES_AGREGATS.items():
+        if compteur not in delta.columns:
+            continue
+        n = jours[compteur].astype(float).fillna(0) if compteur in jours.columns else 0.0
+        dn = delta[compteur].astype(float).fillna(0)
+        total = n + signe * dn
+        for col in moyennes:
+            avant = jours[col].astype(float).fillna(0) * n if col in jours.columns else 0.0
+            somme = avant + signe * (delta[col].astype(float) * dn).fillna(0)
+            jours[col] = (somme / total).where(total > 0)
+        jours[compteur] = total
+
+    for col in TOTAUX_AGREGATS:
+        if col in delta.columns:
+            avant = jours[col].astype(float).fillna(0) if col in jours.columns else 0.0
+            jours[col] = avant + signe * delta[col].astype(float).fillna(0)
+
+    compteurs = [c for c in (*MOYENNES_AGREGATS, 'nb_durees_inconnues') if c in jours.columns]
+    jours[compteurs] = jours[compteurs].astype(float).fillna(0).astype(int)
+    return jours.reset_index()
+
+
+def charge_periode(df_jours):
+    """
+    Charge moyenne et variabilité sur une période, à partir des agrégats
+    journaliers (mêmes résultats que compute_charge_batch + compute_variability
+    sur les lignes brutes de la période).
+    
+    Args:
+        df_jours: DataFrame avec 'nb_suivis', 'charge' et 'charge_carre'
+    
+    Returns:
+        tuple: (charge_moyenne, niveau_variabilité, score_variabilité)
+    """
+    n = df_jours['nb_suivis'].sum() if not df_jours.empty else 0
+    if n == 0:
+        return None, "Données insuffisantes", None
+    
+    somme = (df_jours['charge'] * df_jours['nb_suivis']).sum()
+    somme_carres = (df_jours['charge_carre'] * df_jours['nb_suivis']).sum()
+    moyenne = somme / n
+    if n < 2:
+        return moyenne, "Données insuffisantes", None
+    
+    std_dev = float(np.sqrt(max(somme_carres - n * moyenne ** 2, 0) / (n - 1)))
+    return moyenne, niveau_variabilite(std_dev), std_dev
+
+
+INSUFFISANT = "Données insuffisantes"
+
+
+def _correlations(df_activites, cles):
+    """
+    Corrélation de Pearson difficulté/plaisir de chaque groupe de `cles`, en
+    une passe (groupes numérotés une fois, sommes des écarts centrés par
+    np.bincount) au lieu d'un masque et d'un Series.corr par groupe.
+
+    Comme Series.corr, seules les lignes où les deux notes sont renseignées
+    comptent ; un groupe de moins de 2 lignes, ou de variance nulle, vaut NaN.
+
+    Returns:
+        Series indexée par les groupes (dans leur ordre d'apparition)
+    """
+    groupes = df_activites.groupby(cles, sort=False, observed=True)
+    index = groupes.size().index
+    codes = groupes.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+    x = pd.to_numeric(df_activites['difficulte'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    y = pd.to_numeric(df_activites['plaisir'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+    # Lignes sans groupe (clé manquante) ou sans les deux notes : ignorées
+    valide = (codes >= 0) & ~np.isnan(x) & ~np.isnan(y)
+    codes, x, y = codes[valide], x[valide], y[valide]
+    k = len(index)
+
+    n = np.bincount(codes, minlength=k)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dx = x - (np.bincount(codes, x, minlength=k) / n)[codes]
+        dy = y - (np.bincount(codes, y, minlength=k) / n)[codes]
+        sxy = np.bincount(codes, dx * dy, minlength=k)
+        denominateur = np.sqrt(np.bincount(codes, dx * dx, minlength=k)
+                               * np.bincount(codes, dy * dy, minlength=k))
+        corr = np.clip(sxy / denominateur, -1, 1)
+
+    corr[(n < 2) | ~(denominateur > 0)] = np.nan
+
+    # Les sommes ne sont pas faites dans le même ordre que np.corrcoef (celui
+    # de Series.corr) : une corrélation rationnelle simple (-0,625) peut sortir
+    # d'un ulp de l'autre côté de l'arrondi à 2 décimales. Ces groupes-là sont
+    # recalculés comme Series.corr pour garder exactement les mêmes arrondis.
+    for g in np.flatnonzero(np.abs(np.abs(corr * 100) % 1 - 0.5) < 1e-6):
+        corr[g] = np.corrcoef(x[codes == g], y[codes == g])[0, 1]
+    return pd.Series(corr, index=index)
+
+
+def _formater(corr):
+    """Corrélation arrondie, ou "Données insuffisantes" si elle n'est pas calculable."""
+    if pd.isna(corr) or np.isinf(corr):
+        return INSUFFISANT
+    return round(float(corr), 2)
+
+
+def correlations_equipe(df_activites):
+    """
+    Corrélations entre difficulté et plaisir calculées en une passe sur les
+    activités de plusieurs joueuses : globale, par sport, par joueuse et par
+    joueuse et sport.
+    
+    Args:
+        df_activites: DataFrame contenant au minimum 'difficulte' et 'plaisir',
+            et si possible 'sport' et 'joueuse_id'
+    
+    Returns:
+        dict: corrélations (arrondies à 2 décimales ou "Données insuffisantes")
+            "correlation_globale", "correlation_par_sport" {sport},
+            "correlation_par_joueuse" {joueuse_id},
+            "correlation_par_joueuse_sport" {(joueuse_id, sport)}
+            et "matrice" (DataFrame joueuse_id x ["Global", sports...], NaN si
+            les données sont insuffisantes)
     """
     res = {
         "correlation_globale": None,
-        "correlation_par_sport": {}
+        "correlation_par_sport": {},
+        "correlation_par_joueuse": {},
+        "correlation_par_joueuse_sport": {},
+        "matrice": pd.DataFrame(),
     }
     
-    # Vérifier que le DataFrame n'est pas vide et contient les colonnes nécessaires
     if df_activites.empty:
         return res
     
     if 'difficulte' not in df_activites.columns or 'plaisir' not in df_activites.columns:
         return res
     
-    # Calculer la corrélation globale
-    try:
-        # Vérifier qu'il y a au moins 2 valeurs
-        if len(df_activites) < 2:
-            res["correlation_globale"] = "Données insuffisantes"
-        else:
-            corr = df_activites['difficulte'].corr(df_activites['plaisir'])
-            
-            # Vérifier que la corrélation est un nombre valide
-            if pd.notna(corr) and not np.isnan(corr) and not np.isinf(corr):
-                res["correlation_globale"] = round(float(corr), 2)
-            else:
-                res["correlation_globale"] = "Données insuffisantes"
-    except Exception as e:
-        res["correlation_globale"] = "Erreur de calcul"
+    globale = _correlations(df_activites.assign(_tout=0), ['_tout'])
+    res["correlation_globale"] = _formater(globale.iloc[0])
     
-    # Calculer la corrélation par sport
+    par_sport = None
     if 'sport' in df_activites.columns:
-        for sport in df_activites['sport'].unique():
-            if pd.isna(sport):
-                continue
-                
-            df_sport = df_activites[df_activites['sport'] == sport]
-            
-            # Vérifier qu'il y a au moins 2 valeurs pour calculer une corrélation
-            if len(df_sport) < 2:
-                res["correlation_par_sport"][sport] = "Données insuffisantes"
-                continue
-            
-            try:
-                corr_sport = df_sport['difficulte'].corr(df_sport['plaisir'])
-                
-                if pd.notna(corr_sport) and not np.isnan(corr_sport) and not np.isinf(corr_sport):
-                    res["correlation_par_sport"][sport] = round(float(corr_sport), 2)
-                else:
-                    res["correlation_par_sport"][sport] = "Données insuffisantes"
-            except Exception as e:
-                res["correlation_par_sport"][sport] = "Erreur de calcul"
+        par_sport = _correlations(df_activites, ['sport'])
+        res["correlation_par_sport"] = {s: _formater(c) for s, c in par_sport.items()}
+    
+    if 'joueuse_id' in df_activites.columns:
+        par_joueuse = _correlations(df_activites, ['joueuse_id'])
+        res["correlation_par_joueuse"] = {j: _formater(c) for j, c in par_joueuse.items()}
+        matrice = par_joueuse.round(2).to_frame("Global")
+        
+        if par_sport is not None:
+            par_joueuse_sport = _correlations(df_activites, ['joueuse_id', 'sport'])
+            res["correlation_par_joueuse_sport"] = {
+                cle: _formater(c) for cle, c in par_joueuse_sport.items()
+            }
+            matrice = matrice.join(
+                par_joueuse_sport.round(2).unstack('sport').reindex(columns=par_sport.index)
+            )
+        res["matrice"] = matrice
     
     return res
+
+
+def correlation_difficulte_plaisir(df_activites):
+    """
+    Calcule la corrélation entre difficulté et plaisir.
+    
+    Args:
+        df_activites: DataFrame contenant au minimum les colonnes 'difficulte', 'plaisir' et 'sport'
+    
+    Returns:
+        dict: Dictionnaire contenant la corrélation globale et par sport
+    """
+    res = correlations_equipe(df_activites.drop(columns='joueuse_id', errors='ignore'))
+    return {
+        "correlation_globale": res["correlation_globale"],
+        "correlation_par_sport": res["correlation_par_sport"],
+    }
+
+
+# Fenêtres glissantes (en jours calendaires) de la charge : aiguë et chronique
+FENETRE_AIGUE = 7
+FENETRE_CHRONIQUE = 28
+
+
+def fenetres_glissantes(df_jours, fin=None, aigue=FENETRE_AIGUE, chronique=FENETRE_CHRONIQUE):
+    """
+    Calcul en lot (rattrapage) de la charge normalisée moyenne sur les `aigue`
+    et `chronique` derniers jours, et de leur rapport, pour chaque joueuse et
+    chaque jour de son historique.
+    
+    Une fenêtre de n jours se terminant le jour J couvre les jours J-n+1 à J ;
+    sa moyenne porte sur tous les suivis de ces jours (pondération par nb_suivis).
+    
+    Args:
+        df_jours: agrégats journaliers (joueuse_id, date, nb_suivis, charge)
+        fin: dernier jour calculé (par défaut le dernier jour de df_jours)
+    
+    Returns:
+        DataFrame: joueuse_id, date, charge_aigue, charge_chronique, rapport ;
+            une ligne par jour calendaire du premier suivi de chaque joueuse
+            jusqu'à `fin` (NaN si une fenêtre ne contient aucun suivi)
+    """
+    colonnes = ['joueuse_id', 'date', 'charge_aigue', 'charge_chronique', 'rapport']
+    if df_jours.empty:
+        return pd.DataFrame(columns=colonnes)
+    
+    df = df_jours[df_jours['nb_suivis'] > 0]
+    df = pd.DataFrame({
+        'joueuse_id': df['joueuse_id'],
+        'date': pd.to_datetime(df['date']),
+        'somme': df['charge'] * df['nb_suivis'],
+        'nb': df['nb_suivis'],
+    })
+    fin = pd.Timestamp(fin) if fin is not None else df['date'].max()
+    
+    resultats = []
+    for joueuse_id, d in df.groupby('joueuse_id'):
+        # Un jour calendaire par ligne, à zéro les jours sans suivi
+        d = d.groupby('date')[['somme', 'nb']].sum()
+        d = d.reindex(pd.date_range(d.index.min(), fin, freq='D'), fill_value=0)
+        fenetre_a = d.rolling(aigue, min_periods=1).sum()
+        fenetre_c = d.rolling(chronique, min_periods=1).sum()
+        res = pd.DataFrame({
+            'joueuse_id': joueuse_id,
+            'date': d.index.date,
+            'charge_aigue': (fenetre_a['somme'] / fenetre_a['nb'].where(fenetre_a['nb'] > 0)).to_numpy(),
+            'charge_chronique': (fenetre_c['somme'] / fenetre_c['nb'].where(fenetre_c['nb'] > 0)).to_numpy(),
+        })
+        res['rapport'] = res['charge_aigue'] / res['charge_chronique'].where(res['charge_chronique'] > 0)
+        resultats.append(res)
+    
+    return pd.concat(resultats, ignore_index=True)[colonnes]
+
+
+class ChargeGlissante:
+    """
+    Version incrémentale de fenetres_glissantes, par joueuse.
+    
+    Chaque joueuse ne garde que ses `chronique` derniers jours (somme des
+    charges et nombre de suivis par jour) et les sommes courantes des deux
+    fenêtres : intégrer de nouveaux jours ne dépend pas de la longueur de
+    l'historique déjà intégré. Un jour déjà intégré peut être corrigé (nouvelle
+    valeur du même jour) tant qu'il reste dans la fenêtre chronique.
+    
+    Partageable entre threads (un verrou protège l'état).
+    """
+    
+    def __init__(self, aigue=FENETRE_AIGUE, chronique=FENETRE_CHRONIQUE):
+        self.fenetres = (aigue, chronique)
+        self._etats = {}
+        self._verrou = threading.Lock()
+    
+    def fin(self, joueuse_id):
+        """Dernier jour couvert par les fenêtres d'une joueuse (None si inconnue)."""
+        etat = self._etats.get(joueuse_id)
+        return etat['fin'] if etat else None
+    
+    def oublier(self, joueuse_id):
+        with self._verrou:
+            self._etats.pop(joueuse_id, None)
+    
+    def integrer(self, df_jours):
+        """
+        Intègre des agrégats journaliers (joueuse_id, date, nb_suivis, charge) :
+        jours nouveaux ou corrections de jours encore dans la fenêtre chronique.
+        """
+        if df_jours.empty:
+            return
+        df = pd.DataFrame({
+            'joueuse_id': df_jours['joueuse_id'],
+            'date': pd.to_datetime(df_jours['date']).dt.date,
+            'somme': (df_jours['charge'].astype(float).fillna(0) * df_jours['nb_suivis']).to_numpy(),
+            'nb': df_jours['nb_suivis'].to_numpy(),
+        }).sort_values('date', kind='stable')
+        
+        with self._verrou:
+            for joueuse_id, jour, somme, nb in df.itertuples(index=False):
+                etat = self._etats.setdefault(joueuse_id, {
+                    'fin': jour, 'jours': {}, 'sommes': {n: [0.0, 0] for n in self.fenetres},
+                })
+                self._integrer_jour(etat, jour, float(somme), int(nb))
+    
+    def _avancer(self, etat, jour):
+        """Déplace la fin des fenêtres au jour `jour` (postérieur à la fin actuelle)."""
+        fin = etat['fin']
+        for n, sommes in etat['sommes'].items():
+            sortie_min, sortie_max = fin - timedelta(days=n), jour - timedelta(days=n)
+            for d, (somme, nb) in etat['jours'].items():
+                if sortie_min < d <= sortie_max:
+                    sommes[0] -= somme
+                    sommes[1] -= nb
+            if sommes[1] == 0:
+                # Pas de résidu d'arrondi dans une fenêtre vide
+                sommes[0] = 0.0
+        etat['fin'] = jour
+        limite = jour - timedelta(days=max(self.fenetres))
+        etat['jours'] = {d: v for d, v in etat['jours'].items() if d > limite}
+    
+    def _integrer_jour(self, etat, jour, somme, nb):
+        if jour > etat['fin']:
+            self._avancer(etat, jour)
+        fin = etat['fin']
+        if jour <= fin - timedelta(days=max(self.fenetres)):
+            return
+        
+        ancienne_somme, ancien_nb = etat['jours'].get(jour, (0.0, 0))
+        for n, sommes in etat['sommes'].items():
+            if jour > fin - timedelta(days=n):
+                sommes[0] += somme - ancienne_somme
+                sommes[1] += nb - ancien_nb
+                if sommes[1] == 0:
+                    sommes[0] = 0.0
+        if nb:
+            etat['jours'][jour] = (somme, nb)
+        else:
+            etat['jours'].pop(jour, None)
+    
+    def valeurs(self, joueuse_id, jour=None):
+        """
+        Charges aiguë et chronique et leur rapport pour les fenêtres se
+        terminant le jour `jour` (par défaut le dernier jour intégré).
+        
+        Une lecture ne modifie pas l'état : les fenêtres d'un jour postérieur
+        au dernier jour intégré sont calculées à partir des jours conservés.
+        
+        Raises:
+            ValueError: si `jour` est antérieur au dernier jour intégré (les
+                jours sortis de la fenêtre chronique ne sont plus connus)
+        
+        Returns:
+            dict: charge_aigue, charge_chronique, rapport (None si non calculable)
+        """
+        with self._verrou:
+            etat = self._etats.get(joueuse_id)
+            if etat is None:
+                return {'charge_aigue': None, 'charge_chronique': None, 'rapport': None}
+            if jour is None or jour == etat['fin']:
+                sommes = [tuple(s) for s in etat['sommes'].values()]
+            elif jour > etat['fin']:
+                sommes = [
+                    (sum(s for d, (s, _) in etat['jours'].items() if d > jour - timedelta(days=n)),
+                     sum(nb for d, (_, nb) in etat['jours'].items() if d > jour - timedelta(days=n)))
+                    for n in self.fenetres
+                ]
+            else:
+                raise ValueError(f"{jour} est antérieur au dernier jour intégré ({etat['fin']})")
+        
+        aigue, chronique = [s / n if n else None for s, n in sommes]
+        rapport = aigue / chronique if aigue is not None and chronique else None
+        return {'charge_aigue': aigue, 'charge_chronique': chronique, 'rapport': rapport}
+    
+    def tableau(self, joueuse_ids, jour=None):
+        """valeurs() de plusieurs joueuses, en DataFrame indexé par joueuse_id."""
+        return pd.DataFrame(
+            [self.valeurs(j, jour) for j in joueuse_ids],
+            index=pd.Index(list(joueuse_ids), name='joueuse_id'),
+            columns=['charge_aigue', 'charge_chronique', 'rapport'],
+        )
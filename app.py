@@ -2,19 +2,36 @@ import streamlit as st
 import os
 import re
 import time
-from datetime import date, datetime, timedelta
-from supabase_client import supabase
-from update_billets_from_storage import update_billets_from_storage
-from analyse import compute_charge, normalize_charge, compute_variability, correlation_difficulte_plaisir
+from datetime import date
+from donnees import (charger_activites, charger_activites_equipe, charger_agregats,
+                     charger_page_historique, charge_glissante_equipe, charger_billets,
+                     charger_joueuses, invalider_billets,
+                     chercher_utilisateur, rafraichir_annuaire, reconstruire_agregats,
+                     charger_en_parallele, FENETRE_JOURS, PERIODES, jours_periode)
+from tache_billets import tache_billets
+from analyse import charge_periode, correlations_equipe, totaux_hebdomadaires, durees_non_reconnues
 import pandas as pd
-from streamlit_plotly_events import plotly_events
-import plotly.graph_objects as go
+from instrumentation import debut_rerun, fin_rerun, section, chronometre, afficher_panneau
+from supabase_client import statistiques_connexions
+from schemas import dataframe
+from ecritures import ecritures_session
 
 st.set_page_config(
     page_title="Pôle France Parabasket Adapté",
     page_icon="🏀",
 )
 
+# Mesures du rerun (uniquement si SUIVI_INSTRUMENTATION est défini)
+mesures = debut_rerun()
+connexions_debut = statistiques_connexions()
+
+# Intervalle de rafraîchissement de la progression d'une synchronisation des billets (s)
+INTERVALLE_SUIVI = 0.5
+LIBELLES_STATUT_BILLET = {
+    "ajoute": "ajouté", "mis_a_jour": "mis à jour", "existant": "déjà attribué",
+    "doublon": "doublon", "sans_correspondance": "sans correspondance", "erreur": "erreur",
+}
+
 # --- Initialisation de la session ---
 if "user" not in st.session_state:
     st.session_state.user = None
@@ -26,14 +43,7 @@ def afficher_billets(user: dict):
     """Affiche tous les billets de train pour la joueuse depuis la table 'billets'.
     Chaque billet est affiché avec un lien cliquable pour téléchargement.
     """
-    billets = (
-        supabase.table("billets")
-        .select("*")
-        .eq("joueuse_id", user['id'])
-        .order("created_at", desc=True)
-        .execute()
-        .data
-    )
+    billets = charger_billets(user['id'])
 
     if not billets:
         st.info("Aucun billet de train disponible pour le moment.")
@@ -53,304 +63,314 @@ def afficher_billets(user: dict):
         st.divider()
 
 
-def graph_suivi_sportif(joueuse):
-    # Initialiser l'état de suppression si nécessaire
-    if "confirm_delete_sport" not in st.session_state:
-        st.session_state.confirm_delete_sport = None
-
-    activites = (
-        supabase.table("activites")
-        .select("*")
-        .eq("joueuse_id", joueuse["id"])
-        .order("date", desc=False)
-        .execute()
-        .data
+# Nombre de lignes par page dans les historiques
+TAILLE_PAGE_HISTORIQUE = 20
+
+COLONNES_HISTORIQUE_SPORT = {
+    "sport": st.column_config.TextColumn("Sport"),
+    "duree": st.column_config.TextColumn("⏱️ Durée"),
+    "difficulte": st.column_config.NumberColumn("💪 Difficulté", format="%d/10"),
+    "plaisir": st.column_config.NumberColumn("😄 Plaisir", format="%d/10"),
+    "commentaire": st.column_config.TextColumn("🗣️ Commentaire"),
+}
+COLONNES_VOLUME_HEBDOMADAIRE = {
+    "semaine": st.column_config.DateColumn("📅 Semaine du", format="DD/MM/YYYY"),
+    "nb_seances": st.column_config.NumberColumn("Séances", format="%d"),
+    "minutes": st.column_config.NumberColumn("⏱️ Minutes", format="%d"),
+    "charge_seance": st.column_config.NumberColumn("💪 Charge (difficulté × min)", format="%d"),
+}
+COLONNES_HISTORIQUE_FORME = {
+    "sommeil": st.column_config.NumberColumn("🛌 Sommeil", format="%d/5"),
+    "fatigue": st.column_config.NumberColumn("😴 Fatigue", format="%d/5"),
+    "douleur": st.column_config.NumberColumn("🤕 Douleurs", format="%d/5"),
+    "stress": st.column_config.NumberColumn("😰 Stress", format="%d/5"),
+    "humeur": st.column_config.NumberColumn("🙂 Humeur", format="%d/5"),
+    "commentaire": st.column_config.TextColumn("🗣️ Commentaire"),
+}
+
+
+def _changer_page(cle_page: str, page: int):
+    st.session_state[cle_page] = page
+
+
+def _supprimer_selection(table: str, joueuse_id, lignes: list, cle: str):
+    """Suppression confirmée : appliquée à l'affichage tout de suite, envoyée en arrière-plan."""
+    ecritures_session().supprimer(table, joueuse_id, lignes)
+    st.session_state[f"confirm_delete_{cle}"] = None
+    st.session_state[f"generation_{cle}"] += 1
+    st.session_state[f"supprimes_{cle}"] = len(lignes)
+
+
+def afficher_historique(table: str, joueuse_id, jours, total: int, colonnes: dict, cle: str,
+                        lecture=None):
+    """
+    Historique paginé (du plus récent au plus ancien) dans un seul tableau,
+    avec une case à cocher par ligne pour supprimer plusieurs suivis à la fois.
+
+    Seule la page affichée est lue dans Supabase, et le nombre de widgets ne
+    dépend pas de la taille de l'historique : un tableau de
+    TAILLE_PAGE_HISTORIQUE lignes et quelques boutons.
+
+    Args:
+        table: table Supabase des lignes ("activites" ou "suivi_forme")
+        joueuse_id: id de la joueuse
+        jours: période affichée (voir jours_periode)
+        total: nombre de lignes de la période (d'après les agrégats journaliers)
+        colonnes: {colonne: st.column_config} des colonnes affichées
+        cle: préfixe des clés de session et de widgets (voir cle_historique)
+        lecture: Future de la page déjà lancée par lectures_graphique (facultatif)
+    """
+    cle_page = f"page_{cle}"
+    cle_confirmation = f"confirm_delete_{cle}"
+    cle_generation = f"generation_{cle}"
+    for k, defaut in ((cle_page, 0), (cle_confirmation, None), (cle_generation, 0)):
+        if k not in st.session_state:
+            st.session_state[k] = defaut
+
+    nb_pages = max(1, -(-total // TAILLE_PAGE_HISTORIQUE))
+    # Page lue par lectures_graphique ; ramenée à la dernière page si la période
+    # compte moins de suivis qu'au rerun précédent (gardée bornée pour le suivant)
+    page_lue = st.session_state[cle_page]
+    page = min(page_lue, nb_pages - 1)
+    st.session_state[cle_page] = page
+    try:
+        if lecture is not None and page == page_lue:
+            lignes = lecture.result()
+        else:
+            lignes = charger_page_historique(table, joueuse_id, jours, page,
+                                             TAILLE_PAGE_HISTORIQUE)
+    except Exception as e:
+        st.error(f"Erreur lors du chargement : {e}")
+        return
+    lignes = ecritures_session().page(table, lignes, joueuse_id, jours, page,
+                                      TAILLE_PAGE_HISTORIQUE)
+    df_page = dataframe(table, lignes, colonnes=["id", "date", *colonnes])
+
+    n_supprimes = st.session_state.pop(f"supprimes_{cle}", None)
+    if n_supprimes:
+        st.success(f"✅ {n_supprimes} suivi(s) supprimé(s).")
+
+    tableau = df_page.reindex(columns=["date", *colonnes])
+    tableau.insert(0, "supprimer", False)
+    edition = st.data_editor(
+        tableau,
+        column_config={
+            "supprimer": st.column_config.CheckboxColumn("🗑️", default=False),
+            "date": st.column_config.DateColumn("🗓️ Date", format="DD/MM/YYYY"),
+            **colonnes,
+        },
+        disabled=["date", *colonnes],
+        hide_index=True,
+        use_container_width=True,
+        # La génération change après une suppression : les cases cochées sont oubliées
+        key=f"historique_{cle}_{page}_{st.session_state[cle_generation]}",
     )
 
-    if not activites:
-        st.info("Aucune activité enregistrée.")
+    if nb_pages > 1:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            st.button("◀️ Précédent", key=f"precedent_{cle}", disabled=page == 0,
+                      on_click=_changer_page, args=(cle_page, page - 1))
+        with col2:
+            st.caption(f"Page {page + 1} / {nb_pages} — {total} suivis")
+        with col3:
+            st.button("Suivant ▶️", key=f"suivant_{cle}", disabled=page == nb_pages - 1,
+                      on_click=_changer_page, args=(cle_page, page + 1))
+
+    # Une ligne tout juste ajoutée (sans id) ne peut être supprimée qu'une fois enregistrée
+    selection = [record_id for record_id, coche
+                 in zip([l["id"] for l in lignes], edition["supprimer"].tolist())
+                 if coche and record_id is not None]
+    if not selection:
         return
 
-    today = date.today()
-    thirty_days_ago = today - timedelta(days=30)
+    # Si on est en mode confirmation pour cette sélection
+    if st.session_state[cle_confirmation] == selection:
+        st.warning(f"Es-tu sûr de vouloir supprimer {len(selection)} suivi(s) ?", icon="⚠️")
 
-    activites_30j = [
-        a for a in activites
-        if pd.to_datetime(a["date"]).date() >= thirty_days_ago
-    ]
+        col1, col2 = st.columns(2)
+        with col1:
+            # Une seule requête pour toute la sélection, envoyée en arrière-plan
+            st.button("✅ Oui, supprimer", key=f"conf_suppr_{cle}", on_click=_supprimer_selection,
+                      args=(table, joueuse_id, [l for l in lignes if l["id"] in selection], cle))
 
-    if not activites_30j:
-        st.info("Aucune activité enregistrée dans les 30 derniers jours.")
-        return
+        with col2:
+            if st.button("❌ Non, annuler", key=f"cancel_suppr_{cle}"):
+                st.session_state[cle_confirmation] = None
+                st.session_state[cle_generation] += 1
+                st.rerun()
+    else:
+        # Bouton pour déclencher la confirmation
+        if st.button(f"🗑️ Supprimer la sélection ({len(selection)})", key=f"suppr_{cle}"):
+            st.session_state[cle_confirmation] = selection
+            st.rerun()
 
-    df = pd.DataFrame(activites_30j)
-    df["date"] = pd.to_datetime(df["date"]).dt.date
-
-    df_avg = df.groupby("date").agg({
-        "plaisir": "mean",
-        "difficulte": "mean"
-    }).reset_index()
-
-    fig = go.Figure()
-
-    fig.add_trace(go.Scatter(
-        x=df_avg["date"], y=df_avg["plaisir"],
-        mode="lines",
-        line=dict(color="green", dash="dash"),
-        marker=dict(color="green"),
-        name="",
-        yaxis="y1",
-        showlegend=False,
-        hoverinfo="skip",
-    ))
-
-    fig.add_trace(go.Scatter(
-        x=df_avg["date"], y=df_avg["difficulte"],
-        mode="lines",
-        line=dict(color="red", dash="dash"),
-        marker=dict(color="red"),
-        name="",
-        yaxis="y2",
-        showlegend=False,
-        hoverinfo="skip",
-    ))
-
-    fig.add_trace(go.Scatter(
-        x=df["date"], y=df["plaisir"],
-        mode="markers",
-        marker=dict(color="green", size=10),
-        name="Plaisir séance",
-        customdata=df[["sport", "duree", "commentaire"]],
-        hovertemplate=(
-            "<b>%{x|%d/%m}</b><br>"
-            "Plaisir: %{y}<br>"
-            "Sport: %{customdata[0]}<br>"
-            "Durée: %{customdata[1]}<br>"
-            "%{customdata[2]}<extra></extra>"
-        ),
-        yaxis="y1",
-    ))
-
-    fig.add_trace(go.Scatter(
-        x=df["date"], y=df["difficulte"],
-        mode="markers",
-        marker=dict(color="red", size=10),
-        name="Difficulté séance",
-        customdata=df[["sport", "duree", "commentaire"]],
-        hovertemplate=(
-            "<b>%{x|%d/%m}</b><br>"
-            "Difficulté: %{y}<br>"
-            "Sport: %{customdata[0]}<br>"
-            "Durée: %{customdata[1]}<br>"
-            "%{customdata[2]}<extra></extra>"
-        ),
-        yaxis="y2",
-    ))
-
-    fig.update_layout(
-        xaxis=dict(title="Date"),
-        yaxis=dict(title="Plaisir", range=[0, 10], side="left", color="green"),
-        yaxis2=dict(title="Difficulté", range=[0, 10], side="right",
-                    overlaying="y", color="red"),
-        legend=dict(orientation="h", yanchor="bottom",
-                    y=1.02, xanchor="right", x=1),
-        template="plotly_white",
-        hovermode="closest",
-        height=500,
-        margin=dict(l=40, r=40, t=60, b=20),
-    )
 
-    st.plotly_chart(fig, use_container_width=True, key="graphique_suivi")
+def choisir_periode(cle: str) -> str:
+    """Sélecteur de la période affichée dans un graphique (30 jours par défaut)."""
+    return st.radio("Période affichée", PERIODES, horizontal=True, key=cle)
 
-    st.subheader("📋 Historique des séances")
 
-    df_sorted = df.sort_values("date", ascending=False)
-
-    for idx, row in df_sorted.iterrows():
-        # Récupérer le vrai ID - convertir en string pour éviter les problèmes de type
-        record_id = str(row['id'])
-        
-        st.markdown(f"""
-**🗓️ {row['date'].strftime('%d/%m/%Y')} — {row['sport']}**
-- ⏱️ Durée : {row['duree']}
-- 💪 Difficulté : {row['difficulte']}/10
-- 😄 Plaisir : {row['plaisir']}/10
-- 🗣️ Commentaire : {row['commentaire'] or '_Aucun_'}
-""")
-
-        # Si on est en mode confirmation pour cette ligne
-        if st.session_state.confirm_delete_sport == record_id:
-            st.warning("Es-tu sûr de vouloir supprimer cette activité ?", icon="⚠️")
-
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button("✅ Oui, supprimer", key=f"conf_suppr_sport_{record_id}"):
-                    try:
-                        # Utiliser l'ID original (pas forcément string dans la base)
-                        supabase.table("activites").delete().eq("id", row['id']).execute()
-                        st.session_state.confirm_delete_sport = None
-                        st.success("✅ Activité supprimée.")
-                        time.sleep(1)
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Erreur lors de la suppression : {e}")
-
-            with col2:
-                if st.button("❌ Non, annuler", key=f"cancel_suppr_sport_{record_id}"):
-                    st.session_state.confirm_delete_sport = None
-                    st.rerun()
-        else:
-            # Bouton pour déclencher la confirmation
-            if st.button("🗑️ Supprimer ce suivi", key=f"suppr_sport_{record_id}"):
-                st.session_state.confirm_delete_sport = record_id
-                st.rerun()
+def cle_historique(table: str, joueuse_id) -> str:
+    """Préfixe des clés de session et de widgets de l'historique d'une joueuse."""
+    return f"{'sport' if table == 'activites' else 'forme'}_{joueuse_id}"
 
-        st.divider()
 
+def lectures_graphique(table: str, joueuse_id, jours) -> dict:
+    """
+    Lectures indépendantes d'un graphique de suivi (voir charger_en_parallele) :
+    agrégats de la période et page d'historique affichée. La page est celle
+    de la session, déjà bornée par afficher_historique au rerun précédent,
+    pour pouvoir partir avec les autres lectures de la page.
+    """
+    page = st.session_state.get(f"page_{cle_historique(table, joueuse_id)}", 0)
+    return {
+        "agregats": (charger_agregats, joueuse_id, jours),
+        "historique": (charger_page_historique, table, joueuse_id, jours, page,
+                       TAILLE_PAGE_HISTORIQUE),
+    }
+
+
+@chronometre("graph_suivi_sportif")
+def graph_suivi_sportif(joueuse, activites_30j=None, lectures=None):
+    # Plotly n'est chargé qu'au premier graphique, pas à l'écran de connexion
+    from graphiques import figure_suivi_sportif, pas_agregation
+
+    periode = choisir_periode("periode_sport")
+    jours = jours_periode(periode)
 
-def graph_suivi_forme(joueuse):
-    # Initialiser l'état de suppression si nécessaire
-    if "confirm_delete_forme" not in st.session_state:
-        st.session_state.confirm_delete_forme = None
+    # Agrégats et historique lus en même temps (ou déjà lancés par l'appelant)
+    if lectures is None:
+        lectures = charger_en_parallele(lectures_graphique("activites", joueuse["id"], jours))
 
+    # Une ligne par jour (agrégats journaliers), quelle que soit la période
     try:
-        data = (
-            supabase.table("suivi_forme")
-            .select("*")
-            .eq("joueuse_id", joueuse["id"])
-            .order("date", desc=False)
-            .execute()
-            .data
-        )
+        df_jours = dataframe("agregats_journaliers", ecritures_session().agregats(
+            "activites", lectures["agregats"].result(), joueuse["id"], jours))
     except Exception as e:
         st.error(f"Erreur lors du chargement : {e}")
         return
-
-    if not data:
-        st.info("Aucune donnée enregistrée.")
+    if not df_jours.empty:
+        df_jours = df_jours[df_jours["nb_seances"] > 0]
+    if df_jours.empty:
+        st.info(f"Aucune activité enregistrée ({periode.lower()}).")
         return
+    n_seances = int(df_jours["nb_seances"].sum())
 
-    today = date.today()
-    thirty_days_ago = today - timedelta(days=30)
+    # Les séances elles-mêmes ne sont lues que si elles sont tracées une par une
+    df = None
+    if pas_agregation(df_jours["date"], n_seances) is None:
+        activites = activites_30j if periode == PERIODES[0] else None
+        if activites is None:
+            try:
+                activites = ecritures_session().lignes(
+                    "activites", charger_activites(joueuse["id"], jours), {joueuse["id"]}, jours)
+            except Exception as e:
+                st.error(f"Erreur lors du chargement : {e}")
+                return
+        df = dataframe("activites", activites)
 
-    data_30j = [
-        a for a in data
-        if pd.to_datetime(a["date"]).date() >= thirty_days_ago
-    ]
+    with section("graphique sportif"):
+        fig = figure_suivi_sportif(df_jours, df)
+        st.plotly_chart(fig, use_container_width=True, key="graphique_suivi")
 
-    if not data_30j:
-        st.info("Aucune donnée enregistrée dans les 30 derniers jours.")
-        return
+    afficher_volume_hebdomadaire(df_jours, df)
 
-    df = pd.DataFrame(data_30j)
-    df["date"] = pd.to_datetime(df["date"]).dt.date
-
-    df_avg = df.groupby("date").agg({
-        "fatigue": "mean",
-        "sommeil": "mean",
-        "douleur": "mean",
-        "stress": "mean",
-        "humeur": "mean",
-    }).reset_index()
-
-    fig = go.Figure()
-
-    infos = {
-        "fatigue": "Fatigue",
-        "sommeil": "Sommeil",
-        "douleur": "Douleur",
-        "stress": "Stress",
-        "humeur": "Humeur",
-    }
+    st.subheader("📋 Historique des séances")
 
-    for key, label in infos.items():
-        fig.add_trace(go.Scatter(
-            x=df_avg["date"], y=df_avg[key],
-            mode="lines+markers",
-            line=dict(dash="dash"),
-            name=f"{label}",
-            hoverinfo="skip"
-        ))
-
-    fig.update_layout(
-        xaxis=dict(title="Date"),
-        yaxis=dict(title="Score (1–5)", range=[0, 5.5]),
-        template="plotly_white",
-        hovermode="closest",
-        height=500,
-        margin=dict(l=40, r=40, t=60, b=20),
-        legend=dict(orientation="h", yanchor="bottom",
-                    y=1.02, xanchor="right", x=1),
-    )
+    with section("historique sportif"):
+        afficher_historique("activites", joueuse["id"], jours, n_seances,
+                            COLONNES_HISTORIQUE_SPORT, cle=cle_historique("activites", joueuse["id"]),
+                            lecture=lectures["historique"])
+
+
+def afficher_volume_hebdomadaire(df_jours, df=None):
+    """Totaux par semaine des minutes et de la charge de séance (difficulté × minutes)."""
+    totaux = totaux_hebdomadaires(df_jours)
+    st.markdown("**⏱️ Volume hebdomadaire**")
+    st.dataframe(totaux[list(COLONNES_VOLUME_HEBDOMADAIRE)], column_config=COLONNES_VOLUME_HEBDOMADAIRE,
+                 hide_index=True, use_container_width=True)
+
+    n_inconnues = int(totaux["nb_durees_inconnues"].sum())
+    if n_inconnues:
+        # Les saisies fautives ne sont listées que si les séances ont été lues
+        exemples = durees_non_reconnues(df["duree"]) if df is not None else []
+        detail = f" : {', '.join(repr(d) for d in exemples[:5])}" if exemples else ""
+        st.caption(f"{n_inconnues} séance(s) dont la durée n'a pas été reconnue "
+                   f"ne sont pas comptées{detail}.")
+
+
+@chronometre("graph_suivi_forme")
+def graph_suivi_forme(joueuse, agregats_30j=None, lectures=None):
+    from graphiques import figure_suivi_forme
+
+    periode = choisir_periode("periode_forme")
+    jours = jours_periode(periode)
+
+    # Une ligne par jour (les 30 derniers jours peuvent déjà être chargés par l'appelant)
+    agregats = agregats_30j if periode == PERIODES[0] else None
+    if agregats is None:
+        # Agrégats et historique lus en même temps (ou déjà lancés par l'appelant)
+        if lectures is None:
+            lectures = charger_en_parallele(lectures_graphique("suivi_forme", joueuse["id"], jours))
+        try:
+            agregats = ecritures_session().agregats(
+                "suivi_forme", lectures["agregats"].result(), joueuse["id"], jours)
+        except Exception as e:
+            st.error(f"Erreur lors du chargement : {e}")
+            return
 
-    st.plotly_chart(fig, use_container_width=True)
+    df_jours = dataframe("agregats_journaliers", agregats)
+    if not df_jours.empty:
+        df_jours = df_jours[df_jours["nb_suivis"] > 0]
+    if df_jours.empty:
+        st.info(f"Aucune donnée enregistrée ({periode.lower()}).")
+        return
 
-    st.subheader("📋 Historique du suivi de forme")
+    with section("graphique forme"):
+        fig = figure_suivi_forme(df_jours)
+        st.plotly_chart(fig, use_container_width=True)
 
-    df_sorted = df.sort_values("date", ascending=False)
-
-    for idx, row in df_sorted.iterrows():
-        # Récupérer le vrai ID - convertir en string pour éviter les problèmes de type
-        record_id = str(row['id'])
-        
-        st.markdown(f"""
-**🗓️ {row['date'].strftime('%d/%m/%Y')}**
-- 🛌 Qualité du sommeil : {row.get('sommeil', '–')}/5
-- 😴 Fatigue générale : {row.get('fatigue', '–')}/5
-- 🤕 Douleurs : {row.get('douleur', '–')}/5
-- 😰 Niveau de stress : {row.get('stress', '–')}/5
-- 🙂 Humeur générale : {row.get('humeur', '–')}/5
-- 🗣️ Commentaire : {row.get('commentaire', '_Aucun_')}
-""")
-
-        # Si on est en mode confirmation pour cette ligne
-        if st.session_state.confirm_delete_forme == record_id:
-            st.warning("Es-tu sûr de vouloir supprimer cette activité ?", icon="⚠️")
-
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button("✅ Oui, supprimer", key=f"conf_suppr_forme_{record_id}"):
-                    try:
-                        # Utiliser l'ID original (pas forcément string dans la base)
-                        supabase.table("suivi_forme").delete().eq("id", row['id']).execute()
-                        st.session_state.confirm_delete_forme = None
-                        st.success("✅ Activité supprimée.")
-                        time.sleep(1)
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Erreur lors de la suppression : {e}")
-
-            with col2:
-                if st.button("❌ Non, annuler", key=f"cancel_suppr_forme_{record_id}"):
-                    st.session_state.confirm_delete_forme = None
-                    st.rerun()
-        else:
-            # Bouton pour déclencher la confirmation
-            if st.button("🗑️ Supprimer ce suivi", key=f"suppr_forme_{record_id}"):
-                st.session_state.confirm_delete_forme = record_id
-                st.rerun()
+    st.subheader("📋 Historique du suivi de forme")
 
-        st.divider()
+    with section("historique forme"):
+        afficher_historique("suivi_forme", joueuse["id"], jours, int(df_jours["nb_suivis"].sum()),
+                            COLONNES_HISTORIQUE_FORME,
+                            cle=cle_historique("suivi_forme", joueuse["id"]),
+                            lecture=lectures["historique"] if lectures is not None else None)
 
 
+@chronometre("verifier_utilisateur")
 def verifier_utilisateur(numero: str):
     """Vérifie si le numéro appartient à une joueuse ou un membre du staff."""
     try:
-        joueuse = supabase.table("joueuses").select("*").eq("numero_tel", numero).execute().data
-        if joueuse:
-            return joueuse[0], "joueuse"
-
-        staff = supabase.table("staff").select("*").eq("numero_tel", numero).execute().data
-        if staff:
-            return staff[0], "staff"
-
-        return None, None
+        # Recherche en mémoire dans l'annuaire partagé (rechargé périodiquement)
+        return chercher_utilisateur(numero)
 
     except Exception as e:
         st.error(f"Erreur lors de la vérification : {e}")
         return None, None
 
 
+# Champs des formulaires de la page joueuse (clés de widgets "<préfixe>_<champ>")
+CHAMPS_FORMULAIRE = {
+    "activites": ("date", "sport", "duree", "difficulte", "plaisir", "commentaire"),
+    "suivi_forme": ("date", "fatigue", "sommeil", "douleur", "stress", "humeur", "commentaire"),
+}
+
+
+def _enregistrer(table: str, joueuse_id, prefixe: str):
+    """
+    Envoi d'un formulaire : la ligne est affichée dès ce rerun et enregistrée
+    en arrière-plan. Rappel de bouton, donc jamais rejoué par un st.rerun().
+    """
+    data = {"joueuse_id": joueuse_id,
+            **{champ: st.session_state[f"{prefixe}_{champ}"] for champ in CHAMPS_FORMULAIRE[table]}}
+    data["date"] = data["date"].isoformat()
+    ecritures_session().inserer(table, data)
+    st.session_state[f"{prefixe}_enregistree"] = True
+
+
 def afficher_page_joueuse(user: dict):
     choix = st.radio("Que voulez-vous faire ?", [
         "Billets de train",
@@ -367,34 +387,23 @@ def afficher_page_joueuse(user: dict):
         st.write("Renseigne ici ton activité du jour 👇")
 
         with st.form("form_activite"):
-            sport = st.selectbox(
+            st.selectbox(
                 "Sport pratiqué",
                 ["⛹️‍♀️Basket", "🚴‍♂️Vélo", "🏃‍♂️Course à pied", "🏓Tennis de table",
                  "🏸Badminton", "🏊‍♂️Natation", "🏋️‍♂️Renforcement musculaire",
-                 "⚽Football", "Autre"]
+                 "⚽Football", "Autre"],
+                key="activite_sport",
             )
-            duree = st.text_input("⏱️Durée")
-            difficulte = st.slider("Difficulté ressentie (😁 -> 🥵)", 1, 10, 5)
-            plaisir = st.slider("Plaisir pris (😡 -> 🥰)", 1, 10, 5)
-            date_activite = st.date_input("📅Date de l'activité", date.today(), format="DD/MM/YYYY")
-            commentaire = st.text_area("🗣️Commentaires (si tu le souhaites)")
-            submitted = st.form_submit_button("Enregistrer")
-
-        if submitted:
-            try:
-                data = {
-                    "joueuse_id": user["id"],
-                    "sport": sport,
-                    "duree": duree,
-                    "difficulte": difficulte,
-                    "plaisir": plaisir,
-                    "commentaire": commentaire,
-                    "date": date_activite.isoformat(),
-                }
-                supabase.table("activites").insert(data).execute()
-                st.success("✅ Activité enregistrée avec succès !")
-            except Exception as e:
-                st.error(f"Erreur lors de l'enregistrement : {e}")
+            st.text_input("⏱️Durée", key="activite_duree")
+            st.slider("Difficulté ressentie (😁 -> 🥵)", 1, 10, 5, key="activite_difficulte")
+            st.slider("Plaisir pris (😡 -> 🥰)", 1, 10, 5, key="activite_plaisir")
+            st.date_input("📅Date de l'activité", date.today(), format="DD/MM/YYYY", key="activite_date")
+            st.text_area("🗣️Commentaires (si tu le souhaites)", key="activite_commentaire")
+            st.form_submit_button("Enregistrer", on_click=_enregistrer,
+                                  args=("activites", user["id"], "activite"))
+
+        if st.session_state.pop("activite_enregistree", False):
+            st.success("✅ Activité enregistrée avec succès !")
 
         graph_suivi_sportif(st.session_state.user)
 
@@ -403,44 +412,102 @@ def afficher_page_joueuse(user: dict):
         st.write("Évalue ton état général du jour 👇")
 
         with st.form("form_suivi_forme"):
-            date_suivi = st.date_input("📅 Date du jour", date.today(), format="DD/MM/YYYY")
-            fatigue = st.slider("😴 Fatigue générale (😊très frais -> 🫩toujours fatigué)", 1, 5, 3)
-            sommeil = st.slider("🛌 Qualité du sommeil (👀insomnie -> 💤très reposant)", 1, 5, 3)
-            douleur = st.slider("🤕 Douleurs (😎aucune douleur -> 😖très douloureux)", 1, 5, 3)
-            stress = st.slider("😰 Niveau de stress (🧘‍♀️très détendu -> 😧très stressé)", 1, 5, 3)
-            humeur = st.slider("😊 Humeur générale (😡contrarié, irritable, déprimé -> 🥳très positif)", 1, 5, 3)
-            commentaire = st.text_area("🗣️ Commentaire (si tu le souhaites)")
-            submitted = st.form_submit_button("Enregistrer")
-
-        if submitted:
-            try:
-                data = {
-                    "joueuse_id": user["id"],
-                    "date": date_suivi.isoformat(),
-                    "fatigue": fatigue,
-                    "sommeil": sommeil,
-                    "douleur": douleur,
-                    "stress": stress,
-                    "humeur": humeur,
-                    "commentaire": commentaire,
-                }
-                supabase.table("suivi_forme").insert(data).execute()
-                st.success("✅ Suivi enregistré avec succès !")
-            except Exception as e:
-                st.error(f"Erreur lors de l'enregistrement : {e}")
+            st.date_input("📅 Date du jour", date.today(), format="DD/MM/YYYY", key="forme_date")
+            st.slider("😴 Fatigue générale (😊très frais -> 🫩toujours fatigué)", 1, 5, 3, key="forme_fatigue")
+            st.slider("🛌 Qualité du sommeil (👀insomnie -> 💤très reposant)", 1, 5, 3, key="forme_sommeil")
+            st.slider("🤕 Douleurs (😎aucune douleur -> 😖très douloureux)", 1, 5, 3, key="forme_douleur")
+            st.slider("😰 Niveau de stress (🧘‍♀️très détendu -> 😧très stressé)", 1, 5, 3, key="forme_stress")
+            st.slider("😊 Humeur générale (😡contrarié, irritable, déprimé -> 🥳très positif)", 1, 5, 3,
+                      key="forme_humeur")
+            st.text_area("🗣️ Commentaire (si tu le souhaites)", key="forme_commentaire")
+            st.form_submit_button("Enregistrer", on_click=_enregistrer,
+                                  args=("suivi_forme", user["id"], "forme"))
+
+        if st.session_state.pop("forme_enregistree", False):
+            st.success("✅ Suivi enregistré avec succès !")
 
         graph_suivi_forme(st.session_state.user)
 
 
+def afficher_synchronisation(etat: dict):
+    """Progression (ou bilan) de la dernière synchronisation des billets."""
+    total = etat["a_traiter"]
+    if etat["statut"] == "en_cours":
+        if total is None:
+            st.info("Mise à jour des billets : lecture du bucket…")
+        else:
+            st.progress(etat["traites"] / total if total else 1.0,
+                        text=f"Mise à jour des billets : {etat['traites']} / {total} fichier(s)")
+    elif etat["statut"] == "terminee":
+        fin = time.strftime("%H:%M", time.localtime(etat["fin"]))
+        if etat["rapport"] is None:
+            st.info(f"Mise à jour des billets terminée à {fin} : aucun fichier dans le bucket.")
+            return
+        st.success(f"Mise à jour des billets terminée à {fin}.")
+    else:
+        st.error(f"Erreur lors de la mise à jour des billets : {etat['erreur']}")
+
+    if total is not None:
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Attribués", etat["attribues"])
+        col2.metric("Inchangés", etat["ignores"])
+        col3.metric("Sans correspondance", etat["sans_correspondance"])
+        col4.metric("Erreurs", etat["erreurs"])
+    if etat["statut"] == "en_cours" and etat["journal"]:
+        st.caption("  \n".join(f"{nom} : {LIBELLES_STATUT_BILLET.get(statut, statut)}"
+                               for nom, statut in reversed(etat["journal"])))
+
+
+def suivre_synchronisation(zone):
+    """
+    Affiche dans `zone` l'état de la synchronisation des billets et le met à
+    jour tant qu'elle tourne. Appelée une fois la page affichée : une action
+    de l'utilisateur interrompt simplement le suivi, pas la synchronisation.
+    """
+    while True:
+        etat = tache_billets.etat()
+        if etat["statut"] == "inactive":
+            return
+        with zone.container():
+            afficher_synchronisation(etat)
+        if etat["statut"] != "en_cours":
+            return
+        time.sleep(INTERVALLE_SUIVI)
+
+
+def categorie_staff(user: dict):
+    """Catégorie suivie par un membre du staff (None s'il suit les deux)."""
+    if user.get("masculin") and not user.get("feminin"):
+        return "Masculin"
+    if user.get("feminin") and not user.get("masculin"):
+        return "Féminin"
+    return None
+
+
+def joueuse_choisie(joueuses: list, noms: list, cle: str) -> dict:
+    """
+    Joueuse du selectbox `cle`, connue dès le début du rerun (la première si
+    rien n'est encore choisi), pour lancer ses lectures avec celles de l'équipe.
+    """
+    nom = st.session_state.get(cle)
+    return joueuses[noms.index(nom)] if nom in noms else joueuses[0]
+
+
 def afficher_page_staff(user: dict):
     if user["numero_tel"] == os.getenv("MON_NUMERO"):
         if st.button("Mettre à jour les billets"):
-            placeholder = st.empty()
-            placeholder.info("Mise à jour en cours…")
-            update_billets_from_storage()
-            placeholder.success("Mise à jour terminée !")
-            time.sleep(3)
-            placeholder.empty()
+            # En arrière-plan : la progression s'affiche en haut de la page
+            if not tache_billets.lancer(a_la_fin=invalider_billets):
+                st.warning("Une mise à jour des billets est déjà en cours.")
+
+        if st.button("Reconstruire les agrégats journaliers"):
+            with st.spinner("Reconstruction en cours…"):
+                n = reconstruire_agregats()
+            st.success(f"{n} jour(s) recalculé(s).")
+
+        if st.button("Recharger la liste des joueuses et du staff"):
+            rafraichir_annuaire()
+            st.success("Liste rechargée.")
 
     choix = st.radio("Que voulez-vous faire ?", [
         "Voir mes billets de train",
@@ -456,14 +523,7 @@ def afficher_page_staff(user: dict):
         st.write("📊 Sélectionnez une joueuse pour consulter son suivi sportif.")
 
         try:
-            query = supabase.table("joueuses").select("id, prenom, nom, categorie")
-
-            if user.get("masculin") and not user.get("feminin"):
-                query = query.eq("categorie", "Masculin")
-            elif user.get("feminin") and not user.get("masculin"):
-                query = query.eq("categorie", "Féminin")
-
-            joueuses = query.order("prenom", desc=False).execute().data
+            joueuses = charger_joueuses(categorie_staff(user))
 
         except Exception as e:
             st.error(f"Erreur lors du chargement des joueuses/joueurs : {e}")
@@ -474,43 +534,64 @@ def afficher_page_staff(user: dict):
             return
 
         noms_joueuses = [f"{j['prenom']} {j['nom']}" for j in joueuses]
-        choix_joueuse = st.selectbox("Choisissez une joueuse :", options=noms_joueuses)
+        joueuse_selectionnee = joueuse_choisie(joueuses, noms_joueuses, "joueuse_sport")
+        jours = jours_periode(st.session_state.get("periode_sport", PERIODES[0]))
+
+        # Lectures de l'équipe et du graphique de la joueuse choisie lancées ensemble.
+        # Une seule lecture (30 derniers jours) pour toute l'équipe, partagée
+        # entre la matrice, les stats de la joueuse choisie et son graphique
+        with section("lectures sport"):
+            lectures = charger_en_parallele({
+                "activites_equipe": (charger_activites_equipe, tuple(j["id"] for j in joueuses)),
+                **lectures_graphique("activites", joueuse_selectionnee["id"], jours),
+            })
+        try:
+            activites_equipe = ecritures_session().lignes(
+                "activites", lectures["activites_equipe"].result(),
+                {j["id"] for j in joueuses}, FENETRE_JOURS)
+        except Exception as e:
+            st.error(f"Erreur lors du chargement des activités : {e}")
+            return
+        with section("correlations_equipe"):
+            corr = correlations_equipe(dataframe("activites", activites_equipe))
+
+        legende = '''+1 : plus la difficulté augmente, plus le plaisir augmente  
+        0 : aucune corrélation  
+        -1 : plus la difficulté augmente, moins le plaisir est ressenti'''
+        with st.expander("Légende"):
+            st.markdown(legende)
+
+        with st.expander("🧮 Corrélations difficulté / plaisir de l'équipe (30 derniers jours)"):
+            if corr["matrice"].empty:
+                st.info("Aucune activité enregistrée dans les 30 derniers jours.")
+            else:
+                noms = {j["id"]: nom for j, nom in zip(joueuses, noms_joueuses)}
+                st.dataframe(corr["matrice"].rename(index=noms).rename_axis("Joueuse"),
+                             use_container_width=True)
+                st.caption("Case vide : données insuffisantes.")
 
-        joueuse_selectionnee = next(
-            (j for j in joueuses if f"{j['prenom']} {j['nom']}" == choix_joueuse), None
-        )
+        choix_joueuse = st.selectbox("Choisissez une joueuse :", options=noms_joueuses,
+                                     key="joueuse_sport")
 
         if joueuse_selectionnee:
             st.markdown(f"### 📈 Suivi de {choix_joueuse}")
-            # Récupération des activités complètes
-            activites = supabase.table("activites").select("*").eq("joueuse_id", joueuse_selectionnee["id"]).execute().data
-            df_activites = pd.DataFrame(activites)
-            
-            if not df_activites.empty:
-                legende = '''+1 : plus la difficulté augmente, plus le plaisir augmente  
-                0 : aucune corrélation  
-                -1 : plus la difficulté augmente, moins le plaisir est ressenti'''
-                with st.expander("Légende"):
-                    st.markdown(legende)
-                corr = correlation_difficulte_plaisir(df_activites)
-                st.markdown("**Corrélation Globale :** " + str(corr["correlation_globale"]))
-                for sport, val in corr["correlation_par_sport"].items():
-                    st.markdown(f"**{sport} :** {val}")
-            graph_suivi_sportif(joueuse_selectionnee)
+            joueuse_id = joueuse_selectionnee["id"]
+            activites = [a for a in activites_equipe if a["joueuse_id"] == joueuse_id]
+
+            if activites:
+                st.markdown("**Corrélation Globale :** "
+                            + str(corr["correlation_par_joueuse"][joueuse_id]))
+                for (j, sport), val in corr["correlation_par_joueuse_sport"].items():
+                    if j == joueuse_id:
+                        st.markdown(f"**{sport} :** {val}")
+            graph_suivi_sportif(joueuse_selectionnee, activites, lectures)
 
     elif choix == "Consulter les suivis de forme quotidienne":
         st.subheader("Suivi des joueuses")
         st.write("📊 Sélectionnez une joueuse pour consulter son suivi de forme quotidienne.")
 
         try:
-            query = supabase.table("joueuses").select("id, prenom, nom, categorie")
-
-            if user.get("masculin") and not user.get("feminin"):
-                query = query.eq("categorie", "Masculin")
-            elif user.get("feminin") and not user.get("masculin"):
-                query = query.eq("categorie", "Féminin")
-
-            joueuses = query.order("prenom", desc=False).execute().data
+            joueuses = charger_joueuses(categorie_staff(user))
 
         except Exception as e:
             st.error(f"Erreur lors du chargement des joueuses/joueurs : {e}")
@@ -521,25 +602,58 @@ def afficher_page_staff(user: dict):
             return
 
         noms_joueuses = [f"{j['prenom']} {j['nom']}" for j in joueuses]
-        choix_joueuse = st.selectbox("Choisissez une joueuse :", options=noms_joueuses)
+        joueuse_selectionnee = joueuse_choisie(joueuses, noms_joueuses, "joueuse_forme")
+        jours = jours_periode(st.session_state.get("periode_forme", PERIODES[0]))
+
+        # Lectures de l'équipe et de la joueuse choisie lancées ensemble : fenêtres
+        # glissantes de toute l'équipe (mises à jour avec les seuls jours nouveaux),
+        # agrégats des 30 derniers jours pour les stats, graphique et historique
+        lectures = lectures_graphique("suivi_forme", joueuse_selectionnee["id"], jours)
+        lectures["charge_glissante"] = (charge_glissante_equipe, [j["id"] for j in joueuses])
+        if jours != FENETRE_JOURS:
+            lectures["agregats_30j"] = (charger_agregats, joueuse_selectionnee["id"])
+        with section("lectures forme"):
+            lectures = charger_en_parallele(lectures)
+        try:
+            charge_glissante = lectures["charge_glissante"].result()
+        except Exception as e:
+            st.error(f"Erreur lors du calcul de la charge glissante : {e}")
+            return
+
+        with st.expander("📈 Charge sur 7 et 28 jours de l'équipe"):
+            noms = {j["id"]: nom for j, nom in zip(joueuses, noms_joueuses)}
+            st.dataframe(
+                charge_glissante.rename(index=noms).rename_axis("Joueuse"),
+                column_config={
+                    "charge_aigue": st.column_config.NumberColumn("7 jours", format="%.1f"),
+                    "charge_chronique": st.column_config.NumberColumn("28 jours", format="%.1f"),
+                    "rapport": st.column_config.NumberColumn("Rapport 7 j / 28 j", format="%.2f"),
+                },
+                use_container_width=True,
+            )
+            st.caption("Rapport < 1 : la dernière semaine est en dessous de la moyenne "
+                       "des quatre dernières. Case vide : aucun suivi sur la période.")
 
-        joueuse_selectionnee = next(
-            (j for j in joueuses if f"{j['prenom']} {j['nom']}" == choix_joueuse), None
-        )
+        choix_joueuse = st.selectbox("Choisissez une joueuse :", options=noms_joueuses,
+                                     key="joueuse_forme")
 
         if joueuse_selectionnee:
             st.markdown(f"### 📈 Suivi de {choix_joueuse}")
-            # Récupération du suivi complet
-            data = supabase.table("suivi_forme").select("*").eq("joueuse_id", joueuse_selectionnee["id"]).execute().data
-            df_suivi = pd.DataFrame(data)
-            
-            if not df_suivi.empty:
-                # Calcul charge normalisée
-                df_suivi["charge"] = df_suivi.apply(compute_charge, axis=1)
-                df_suivi["charge_norm"] = df_suivi["charge"].apply(normalize_charge)
-            
-                niveau_var, var_score = compute_variability(df_suivi)
-                charge_moyenne = df_suivi["charge_norm"].mean()
+            # Une seule lecture des agrégats journaliers (30 derniers jours),
+            # partagée entre les stats et le graphique
+            try:
+                agregats = ecritures_session().agregats(
+                    "suivi_forme", lectures.get("agregats_30j", lectures["agregats"]).result(),
+                    joueuse_selectionnee["id"], FENETRE_JOURS)
+            except Exception as e:
+                st.error(f"Erreur lors du chargement : {e}")
+                return
+            df_jours = dataframe("agregats_journaliers", agregats)
+
+            if not df_jours.empty and df_jours["nb_suivis"].sum() > 0:
+                # Charge normalisée et variabilité, sans relire les suivis bruts
+                with section("charge et variabilité"):
+                    charge_moyenne, niveau_var, var_score = charge_periode(df_jours)
                 legende = '''Charge psycho-physiologique  
                 0 : état très dégradé  
                 100 : bien-être maximal'''
@@ -551,7 +665,14 @@ def afficher_page_staff(user: dict):
                 else:
                     st.markdown(f"**Variabilité de la charge :** {niveau_var} (–)")
 
-            graph_suivi_forme(joueuse_selectionnee)
+            fenetres = charge_glissante.loc[joueuse_selectionnee["id"]]
+            if pd.notna(fenetres["charge_chronique"]):
+                aigue = f"{fenetres['charge_aigue']:.2f}" if pd.notna(fenetres["charge_aigue"]) else "–"
+                rapport = f"{fenetres['rapport']:.2f}" if pd.notna(fenetres["rapport"]) else "–"
+                st.markdown(f"**Charge sur 7 jours / 28 jours :** {aigue} / "
+                            f"{fenetres['charge_chronique']:.2f} (rapport {rapport})")
+
+            graph_suivi_forme(joueuse_selectionnee, agregats, lectures)
 
 
 # --- Page d'accueil ---
@@ -580,10 +701,33 @@ if st.button("🚪Accéder"):
                 st.error("Numéro inconnu.")
 
 # --- Après identification ---
+zone_synchronisation = None
 if st.session_state.user:
     st.success(f"Bienvenue {st.session_state.user['prenom']} !")
+    est_admin = st.session_state.user.get("numero_tel") == os.getenv("MON_NUMERO")
+    if est_admin:
+        # Progression de la synchronisation des billets, suivie en fin de rerun
+        zone_synchronisation = st.empty()
+
+    # Les écritures en attente sont appliquées aux données lues pendant l'affichage
+    with ecritures_session().affichage() as erreurs:
+        for erreur in erreurs:
+            st.error(erreur)
+        if st.session_state.type_user == "joueuse":
+            afficher_page_joueuse(st.session_state.user)
+        else:
+            afficher_page_staff(st.session_state.user)
 
-    if st.session_state.type_user == "joueuse":
-        afficher_page_joueuse(st.session_state.user)
-    else:
-        afficher_page_staff(st.session_state.user)
+    # Panneau de debug, visible uniquement par l'administrateur
+    if est_admin:
+        connexions = {k: v - connexions_debut[k] for k, v in statistiques_connexions().items()}
+        afficher_panneau(mesures, connexions)
+
+fin_rerun(mesures, page=st.session_state.type_user)
+
+# Confirmation des écritures de ce rerun : une écriture refusée est retirée de la page
+if st.session_state.user and ecritures_session().attendre():
+    st.rerun()
+
+if zone_synchronisation is not None:
+    suivre_synchronisation(zone_synchronisation)
@@ -0,0 +1,99 @@
+"""
+Benchmark et vérification des fenêtres glissantes de charge (7 et 28 jours).
+
+Chronomètre trois calculs sur le suivi de forme d'une équipe synthétique :
+un recalcul naïf (masque par joueuse et par jour sur les suivis bruts), le
+calcul en lot fenetres_glissantes et le moteur incrémental ChargeGlissante
+alimenté jour après jour. Leur équivalence, y compris après la correction
+d'un jour déjà intégré, est vérifiée par tests/test_charge_glissante.py.
+
+    python -m benchmarks.bench_charge_glissante --joueuses 20 --saisons 2
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+import pandas as pd
+
+from analyse import (compute_charge_batch, agreger_suivi_forme, fenetres_glissantes,
+                     ChargeGlissante, FENETRE_AIGUE, FENETRE_CHRONIQUE)
+from benchmarks.generateur import generer_equipe
+
+
+def recalcul_naif(df_suivi, joueuse_id, jour):
+    """Moyennes de charge_norm des suivis bruts des 7 et 28 jours finissant à `jour`."""
+    moyennes = []
+    for n in (FENETRE_AIGUE, FENETRE_CHRONIQUE):
+        masque = ((df_suivi["joueuse_id"] == joueuse_id)
+                  & (df_suivi["date"] > jour - timedelta(days=n))
+                  & (df_suivi["date"] <= jour))
+        valeurs = df_suivi.loc[masque, "charge_norm"]
+        moyennes.append(valeurs.mean() if len(valeurs) else None)
+    aigue, chronique = moyennes
+    rapport = aigue / chronique if aigue is not None and chronique else None
+    return aigue, chronique, rapport
+
+
+def suivis_equipe(n_joueuses, n_saisons, graine=0):
+    """
+    Suivis de forme bruts (avec charge_norm) d'une équipe synthétique, dont
+    quelques jours à deux suivis pour vérifier la pondération, et leurs
+    agrégats journaliers.
+
+    Returns:
+        tuple: (df_suivi, df_jours)
+    """
+    equipe = generer_equipe(n_joueuses, n_saisons, graine=graine)
+    df_suivi = pd.DataFrame(equipe["suivi_forme"])
+    rng = random.Random(graine)
+    doublons = df_suivi.sample(frac=0.05, random_state=graine).copy()
+    doublons["fatigue"] = [rng.randint(1, 5) for _ in range(len(doublons))]
+    df_suivi = pd.concat([df_suivi, doublons], ignore_index=True)
+    df_suivi["date"] = pd.to_datetime(df_suivi["date"]).dt.date
+    df_suivi["charge_norm"] = compute_charge_batch(df_suivi)["charge_norm"]
+    return df_suivi, agreger_suivi_forme(df_suivi)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--joueuses", type=int, default=20)
+    parser.add_argument("--saisons", type=int, default=2)
+    parser.add_argument("--graine", type=int, default=0)
+    args = parser.parse_args()
+
+    df_suivi, df_jours = suivis_equipe(args.joueuses, args.saisons, args.graine)
+
+    jours = sorted(df_jours["date"].unique())
+    joueuses = sorted(df_jours["joueuse_id"].unique())
+    premiers = df_jours.groupby("joueuse_id")["date"].min()
+
+    debut = time.perf_counter()
+    naif = {(j, d): recalcul_naif(df_suivi, j, d)
+            for d in jours for j in joueuses if d >= premiers[j]}
+    t_naif = time.perf_counter() - debut
+
+    debut = time.perf_counter()
+    lot = fenetres_glissantes(df_jours)
+    t_lot = time.perf_counter() - debut
+
+    moteur = ChargeGlissante()
+    durees_jour = []
+    par_jour = dict(tuple(df_jours.groupby("date")))
+    for d in jours:
+        debut = time.perf_counter()
+        moteur.integrer(par_jour[d])
+        for j in joueuses:
+            moteur.valeurs(j, d)
+        durees_jour.append(time.perf_counter() - debut)
+
+    print(f"{len(joueuses)} joueuses, {len(jours)} jours, {len(df_suivi)} suivis : "
+          f"{len(naif)} valeurs")
+    print(f"Recalcul naïf                  : {t_naif:.3f} s")
+    print(f"Calcul en lot (rattrapage)     : {t_lot:.3f} s")
+    print(f"Incrémental, par nouveau jour  : {1000 * sum(durees_jour) / len(durees_jour):.2f} ms "
+          f"pour toute l'équipe")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark de la correspondance PDF -> personne sur un bucket synthétique.
+
+Compare l'implémentation de référence (double boucle fuzz.ratio) à IndexNoms
+(process.cdist) sur le texte de N billets générés, et vérifie que les deux
+retiennent la même personne pour chaque billet.
+
+    python -m benchmarks.bench_correspondance --billets 500
+"""
+import argparse
+import random
+import time
+
+from correspondance import normalize, meilleure_correspondance, IndexNoms
+from benchmarks.generateur import generer_roster, generer_textes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--billets", type=int, default=500)
+    parser.add_argument("--personnes", type=int, default=40)
+    parser.add_argument("--seuil", type=int, default=70)
+    parser.add_argument("--graine", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.graine)
+    roster = generer_roster(args.personnes, rng)
+    mots = [[normalize(w) for w in t.split()]
+            for t in generer_textes(roster, args.billets, rng)]
+
+    debut = time.perf_counter()
+    reference = [meilleure_correspondance(m, roster) for m in mots]
+    t_reference = time.perf_counter() - debut
+
+    debut = time.perf_counter()
+    index = IndexNoms(roster, args.seuil)
+    resultats = [index.meilleure_correspondance(m) for m in mots]
+    t_index = time.perf_counter() - debut
+
+    for (p_ref, s_ref), (p_idx, s_idx) in zip(reference, resultats):
+        retenu_ref = p_ref if s_ref >= args.seuil else None
+        retenu_idx = p_idx if s_idx >= args.seuil else None
+        assert retenu_ref is retenu_idx, (p_ref, s_ref, p_idx, s_idx)
+        if retenu_ref is not None:
+            assert s_ref == s_idx
+
+    print(f"{args.billets} billets, {args.personnes} personnes")
+    print(f"Référence (double boucle) : {t_reference:.3f} s")
+    print(f"IndexNoms (cdist)         : {t_index:.3f} s")
+    print(f"Accélération              : x{t_reference / t_index:.1f}")
+
+
+if __name__ == "__main__":
+    main()
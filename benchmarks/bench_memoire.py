@@ -0,0 +1,82 @@
+"""
+Mémoire des DataFrames lus depuis Supabase : pd.DataFrame brut (colonnes
+object) contre DataFrame typé de schemas.py, sur une équipe synthétique de
+plusieurs saisons.
+
+Vérifie aussi que les analyses (charge, corrélations, volume hebdomadaire,
+charge sur la période) donnent les mêmes résultats sur les deux versions.
+
+    python -m benchmarks.bench_memoire --joueuses 20 --saisons 3
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from analyse import compute_charge_batch, correlations_equipe, charge_periode, totaux_hebdomadaires
+from benchmarks.generateur import generer_equipe
+from schemas import dataframe
+
+TABLES = ("activites", "suivi_forme", "agregats_journaliers")
+
+
+def memoire(df) -> int:
+    """Taille en octets, chaînes et catégories comprises."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def verifier(bruts, types):
+    """Mêmes résultats d'analyse sur les DataFrames bruts et typés."""
+    charge_brute = compute_charge_batch(bruts["suivi_forme"])["charge_norm"]
+    charge_typee = compute_charge_batch(types["suivi_forme"])["charge_norm"]
+    assert np.allclose(charge_brute, charge_typee)
+
+    corr_brute = correlations_equipe(bruts["activites"])
+    corr_typee = correlations_equipe(types["activites"])
+    for cle in ("correlation_globale", "correlation_par_sport", "correlation_par_joueuse",
+                "correlation_par_joueuse_sport"):
+        assert corr_brute[cle] == corr_typee[cle], cle
+    pd.testing.assert_frame_equal(corr_brute["matrice"], corr_typee["matrice"],
+                                  check_column_type=False, check_names=False)
+
+    for joueuse_id, jours_bruts in bruts["agregats_journaliers"].groupby("joueuse_id"):
+        jours_types = types["agregats_journaliers"].loc[jours_bruts.index]
+        assert np.allclose(charge_periode(jours_bruts)[::2], charge_periode(jours_types)[::2],
+                           equal_nan=True)
+        pd.testing.assert_frame_equal(totaux_hebdomadaires(jours_bruts),
+                                      totaux_hebdomadaires(jours_types), check_dtype=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--joueuses", type=int, default=20)
+    parser.add_argument("--saisons", type=int, default=3)
+    parser.add_argument("--graine", type=int, default=0)
+    args = parser.parse_args()
+
+    equipe = generer_equipe(args.joueuses, args.saisons, graine=args.graine)
+
+    bruts, types = {}, {}
+    print(f"{args.joueuses} joueuses, {args.saisons} saisons")
+    print(f"{'table':<22}{'lignes':>9}{'brut':>11}{'typé':>11}{'gain':>7}{'construction':>13}")
+    for table in TABLES:
+        bruts[table] = pd.DataFrame(equipe[table])
+        debut = time.perf_counter()
+        types[table] = dataframe(table, equipe[table])
+        duree = time.perf_counter() - debut
+        avant, apres = memoire(bruts[table]), memoire(types[table])
+        print(f"{table:<22}{len(bruts[table]):>9}{avant / 1e6:>9.2f}Mo{apres / 1e6:>9.2f}Mo"
+              f"{avant / apres:>6.1f}x{1000 * duree:>10.1f} ms")
+
+    total_avant = sum(memoire(df) for df in bruts.values())
+    total_apres = sum(memoire(df) for df in types.values())
+    print(f"{'total':<22}{'':>9}{total_avant / 1e6:>9.2f}Mo{total_apres / 1e6:>9.2f}Mo"
+          f"{total_avant / total_apres:>6.1f}x")
+
+    verifier(bruts, types)
+    print("Résultats d'analyse identiques.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Générateur déterministe de données synthétiques pour les benchmarks :
+une équipe de N joueuses, M saisons d'activités et de suivi de forme, et un
+bucket de billets PDF contenant les noms du roster.
+"""
+import random
+import textwrap
+from datetime import date, timedelta
+
+import pandas as pd
+
+from analyse import agreger_activites, agreger_suivi_forme
+
+PRENOMS = ["Léa", "Chloé", "Inès", "Manon", "Camille", "Sarah", "Jade", "Louise", "Emma",
+           "Zoé", "Lucas", "Hugo", "Nathan", "Théo", "Maël", "Noé", "Adam", "Jules"]
+NOMS = ["Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand",
+        "Leroy", "Moreau", "Simon", "Laurent", "Lefèvre", "Michel", "Garcia", "N'Diaye"]
+SPORTS = ["⛹️‍♀️Basket", "🚴‍♂️Vélo", "🏃‍♂️Course à pied", "🏓Tennis de table",
+          "🏸Badminton", "🏊‍♂️Natation", "🏋️‍♂️Renforcement musculaire", "⚽Football", "Autre"]
+DUREES = ["1h", "45 min", "1h30", "30min", "2h", "1 h 15", "90 min", "20'"]
+GARES = ["Paris", "Lyon", "Marseille", "Bordeaux", "Nantes", "Lille", "Toulouse", "Rennes"]
+GABARIT = ("e-billet SNCF TGV INOUI Aller {depart} -> {arrivee} le {jour}/{mois}/2025 "
+           "Voiture {voiture} Place {place} Passager {prenom} {nom} Carte Avantage Jeune "
+           "Référence dossier {ref} Prix 0,00 EUR Échangeable sous conditions "
+           "Conservez ce billet jusqu'à la fin de votre voyage")
+CONDITIONS = ["Conditions générales de vente", "Ce billet est nominatif et incessible",
+              "Présentez ce billet lors du contrôle", "Bon voyage avec SNCF Voyageurs"]
+
+JOURS_PAR_SAISON = 300
+
+
+def generer_roster(n_personnes, rng):
+    return [{"id": i, "prenom": rng.choice(PRENOMS), "nom": rng.choice(NOMS)}
+            for i in range(n_personnes)]
+
+
+def generer_equipe(n_joueuses=20, n_saisons=2, n_staff=4, graine=0, fin=None):
+    """
+    Tables d'une équipe synthétique, au format renvoyé par Supabase.
+
+    Chaque joueuse déclare une séance environ deux jours sur trois (parfois
+    deux) et un suivi de forme environ quatre jours sur cinq.
+
+    Returns:
+        dict: {"joueuses", "staff", "activites", "suivi_forme", "billets",
+               "agregats_journaliers"}
+    """
+    rng = random.Random(graine)
+    fin = fin or date.today()
+    n_jours = n_saisons * JOURS_PAR_SAISON
+
+    joueuses = []
+    for i, p in enumerate(generer_roster(n_joueuses, rng)):
+        joueuses.append({**p, "id": i + 1, "numero_tel": f"06{i + 1:08d}",
+                         "categorie": rng.choice(["Féminin", "Masculin"])})
+    staff = []
+    for i, p in enumerate(generer_roster(n_staff, rng)):
+        staff.append({**p, "id": 10_000 + i, "numero_tel": f"07{i + 1:08d}",
+                      "masculin": True, "feminin": True})
+
+    activites, suivi_forme = [], []
+    for j in joueuses:
+        for k in range(n_jours):
+            jour = (fin - timedelta(days=k)).isoformat()
+            if rng.random() < 2 / 3:
+                for _ in range(1 + (rng.random() < 0.2)):
+                    activites.append({
+                        "id": len(activites) + 1, "joueuse_id": j["id"], "date": jour,
+                        "sport": rng.choice(SPORTS), "duree": rng.choice(DUREES),
+                        "difficulte": rng.randint(1, 10), "plaisir": rng.randint(1, 10),
+                        "commentaire": rng.choice(["", "", "RAS", "Bonne séance"]),
+                    })
+            if rng.random() < 0.8:
+                suivi_forme.append({
+                    "id": len(suivi_forme) + 1, "joueuse_id": j["id"], "date": jour,
+                    **{c: rng.randint(1, 5)
+                       for c in ("fatigue", "sommeil", "douleur", "stress", "humeur")},
+                    "commentaire": rng.choice([None, "", "Courbatures"]),
+                })
+
+    return {"joueuses": joueuses, "staff": staff, "activites": activites,
+            "suivi_forme": suivi_forme, "billets": [],
+            "agregats_journaliers": generer_agregats(activites, suivi_forme)}
+
+
+def generer_agregats(activites, suivi_forme):
+    """Table agregats_journaliers correspondant aux lignes brutes."""
+    jours = agreger_activites(pd.DataFrame(activites)).merge(
+        agreger_suivi_forme(pd.DataFrame(suivi_forme)), on=["joueuse_id", "date"], how="outer")
+    for compteur in ("nb_seances", "nb_durees_inconnues", "nb_suivis"):
+        jours[compteur] = jours[compteur].astype(float).fillna(0).astype(int)
+    return jours.astype(object).where(jours.notna(), None).to_dict("records")
+
+
+def texte_billet(personne, rng):
+    return GABARIT.format(
+        depart=rng.choice(GARES), arrivee=rng.choice(GARES),
+        jour=rng.randint(1, 28), mois=rng.randint(1, 12),
+        voiture=rng.randint(1, 20), place=rng.randint(1, 90),
+        prenom=personne["prenom"].upper(), nom=personne["nom"].upper(),
+        ref="".join(rng.choice("ABCDEFGHJKLMNPQRSTUVWXYZ") for _ in range(6)),
+    )
+
+
+def generer_textes(roster, n_billets, rng):
+    return [texte_billet(rng.choice(roster), rng) for _ in range(n_billets)]
+
+
+def _echapper(ligne: str) -> str:
+    return ligne.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def pdf_texte(pages) -> bytes:
+    """
+    PDF minimal (Helvetica, une ligne de texte par élément) lisible par pdfplumber.
+
+    Args:
+        pages: liste de pages, chacune étant une liste de lignes
+    """
+    objets = ["<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(len(pages)))
+    objets.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>")
+    police = 3 + 2 * len(pages)
+    for i, lignes in enumerate(pages):
+        objets.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                      f"/Resources << /Font << /F1 {police} 0 R >> >> /Contents {4 + 2 * i} 0 R >>")
+        flux = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(
+            f"({_echapper(l)}) '" for l in lignes) + " ET"
+        flux = flux.encode("latin-1", "replace").decode("latin-1")
+        objets.append(f"<< /Length {len(flux)} >>\nstream\n{flux}\nendstream")
+    objets.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+                  "/Encoding /WinAnsiEncoding >>")
+
+    sortie = "%PDF-1.4\n"
+    positions = []
+    for i, objet in enumerate(objets):
+        positions.append(len(sortie.encode("latin-1")))
+        sortie += f"{i + 1} 0 obj\n{objet}\nendobj\n"
+    xref = len(sortie.encode("latin-1"))
+    sortie += f"xref\n0 {len(objets) + 1}\n0000000000 65535 f \n"
+    sortie += "".join(f"{p:010d} 00000 n \n" for p in positions)
+    sortie += f"trailer\n<< /Size {len(objets) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return sortie.encode("latin-1")
+
+
+def generer_bucket(personnes, n_billets=100, graine=0, pages_max=3):
+    """
+    Bucket de billets PDF : le nom du passager figure en page 1, suivie de
+    0 à `pages_max - 1` pages de conditions générales.
+
+    Returns:
+        dict: {nom de fichier: contenu PDF}
+    """
+    rng = random.Random(graine)
+    fichiers = {}
+    for i in range(n_billets):
+        page1 = textwrap.wrap(texte_billet(rng.choice(personnes), rng), 80)
+        pages = [page1] + [rng.sample(CONDITIONS, 3) for _ in range(rng.randint(0, pages_max - 1))]
+        fichiers[f"billet_{i:04d}.pdf"] = pdf_texte(pages)
+    return fichiers
@@ -0,0 +1,196 @@
+"""
+Suite de benchmarks : analyse.py, construction des graphiques et synchronisation
+des billets de bout en bout, sur des données synthétiques déterministes.
+
+Les résultats sont écrits en JSON (un fichier par exécution, avec le commit
+courant) pour comparer deux versions :
+
+    python -m benchmarks.run --joueuses 20 --saisons 3 --billets 200 --sortie avant.json
+    python -m benchmarks.run --sortie apres.json --comparer avant.json
+"""
+import os
+
+# La synchronisation s'exécute contre le substitut local de Supabase
+os.environ["SUPABASE_FAKE"] = "1"
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.generateur import generer_equipe, generer_bucket
+from analyse import (compute_charge, normalize_charge, compute_charge_batch,
+                     compute_variability, correlation_difficulte_plaisir, correlations_equipe,
+                     charge_periode, charge_seance_batch, totaux_hebdomadaires)
+from graphiques import figure_suivi_sportif, figure_suivi_forme
+from schemas import dataframe
+
+
+def chronometrer(fonction, repetitions):
+    """Durées (en secondes) de `repetitions` appels à `fonction`."""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+    return durees
+
+
+def resume(durees):
+    return {
+        "median_s": statistics.median(durees),
+        "min_s": min(durees),
+        "max_s": max(durees),
+        "repetitions": len(durees),
+    }
+
+
+def bench_analyse(equipe, repetitions):
+    df_suivi = dataframe("suivi_forme", equipe["suivi_forme"])
+    df_activites = dataframe("activites", equipe["activites"])
+    df_charge = compute_charge_batch(df_suivi)
+    df_jours = dataframe("agregats_journaliers", equipe["agregats_journaliers"])
+
+    def charge_par_ligne():
+        charge = df_suivi.apply(compute_charge, axis=1)
+        charge.apply(normalize_charge)
+
+    return {
+        "compute_charge_par_ligne": chronometrer(charge_par_ligne, repetitions),
+        "compute_charge_batch": chronometrer(lambda: compute_charge_batch(df_suivi), repetitions),
+        "compute_variability": chronometrer(lambda: compute_variability(df_charge), repetitions),
+        "charge_periode_agregats": chronometrer(lambda: charge_periode(df_jours), repetitions),
+        "correlation_difficulte_plaisir": chronometrer(
+            lambda: correlation_difficulte_plaisir(df_activites), repetitions),
+        "correlations_equipe": chronometrer(lambda: correlations_equipe(df_activites), repetitions),
+        "charge_seance_equipe": chronometrer(lambda: charge_seance_batch(df_activites), repetitions),
+        "totaux_hebdomadaires": chronometrer(lambda: totaux_hebdomadaires(df_jours), repetitions),
+    }
+
+
+def bench_graphiques(equipe, repetitions):
+    """Construction des figures pour une joueuse sur tout son historique."""
+    joueuse_id = equipe["joueuses"][0]["id"]
+    # DataFrames typés, comme dans app.py
+    df_activites = dataframe("activites", [a for a in equipe["activites"]
+                                           if a["joueuse_id"] == joueuse_id])
+    df_jours = dataframe("agregats_journaliers", [j for j in equipe["agregats_journaliers"]
+                                                  if j["joueuse_id"] == joueuse_id])
+
+    return {
+        "figure_suivi_sportif": chronometrer(
+            lambda: figure_suivi_sportif(df_jours, df_activites), repetitions),
+        "figure_suivi_forme": chronometrer(lambda: figure_suivi_forme(df_jours), repetitions),
+    }
+
+
+def bench_ingestion(equipe, n_billets, repetitions, latence_ms):
+    """Synchronisation complète d'un bucket neuf, puis d'un bucket inchangé."""
+    from supabase_client import supabase
+    import update_billets_from_storage as ingestion
+
+    fichiers = generer_bucket(equipe["joueuses"] + equipe["staff"], n_billets)
+    premiere, suivante, requetes = [], [], []
+
+    for _ in range(repetitions):
+        with tempfile.TemporaryDirectory() as dossier:
+            supabase.tables = {"joueuses": equipe["joueuses"], "staff": equipe["staff"],
+                               "billets": []}
+            supabase.fichiers = {"Billets": {n: (c, "2025-01-01T00:00:00+00:00")
+                                             for n, c in fichiers.items()}}
+            supabase.latence_ms = latence_ms
+            options = dict(manifeste_path=os.path.join(dossier, "manifeste.json"),
+                           cache_path=os.path.join(dossier, "cache.sqlite3"))
+
+            # Le détail fichier par fichier n'est pas utile ici
+            with contextlib.redirect_stdout(io.StringIO()):
+                supabase.reinitialiser_compteur()
+                debut = time.perf_counter()
+                ingestion.update_billets_from_storage(**options)
+                premiere.append(time.perf_counter() - debut)
+                requetes.append(supabase.nb_requetes)
+
+                debut = time.perf_counter()
+                ingestion.update_billets_from_storage(**options)
+                suivante.append(time.perf_counter() - debut)
+
+    return {
+        "ingestion_bucket_neuf": premiere,
+        "ingestion_bucket_inchange": suivante,
+    }, {"requetes_bucket_neuf": statistics.median(requetes)}
+
+
+def commit_courant():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparer(resultats, reference):
+    print(f"\nComparaison avec {reference.get('commit')} :")
+    for nom, mesure in resultats["mesures"].items():
+        avant = reference["mesures"].get(nom)
+        if avant is None:
+            continue
+        ratio = mesure["median_s"] / avant["median_s"] if avant["median_s"] else float("nan")
+        alerte = "  <-- régression" if ratio > 1.2 else ""
+        print(f"  {nom:35s} {avant['median_s']:9.4f} s -> {mesure['median_s']:9.4f} s "
+              f"(x{ratio:.2f}){alerte}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de l'app de suivi.")
+    parser.add_argument("--joueuses", type=int, default=20)
+    parser.add_argument("--saisons", type=int, default=2)
+    parser.add_argument("--billets", type=int, default=100)
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--latence-ms", type=float, default=0,
+                        help="latence simulée de chaque aller-retour Supabase")
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--sortie", default="benchmarks/resultats.json")
+    parser.add_argument("--comparer", help="fichier JSON d'une exécution précédente")
+    args = parser.parse_args()
+
+    equipe = generer_equipe(args.joueuses, args.saisons, graine=args.graine)
+    print(f"{len(equipe['joueuses'])} joueuses, {len(equipe['activites'])} activités, "
+          f"{len(equipe['suivi_forme'])} suivis de forme, {args.billets} billets")
+
+    mesures = {}
+    mesures.update(bench_analyse(equipe, args.repetitions))
+    mesures.update(bench_graphiques(equipe, args.repetitions))
+    ingestion, compteurs = bench_ingestion(equipe, args.billets,
+                                           max(1, args.repetitions // 2), args.latence_ms)
+    mesures.update(ingestion)
+
+    resultats = {
+        "commit": commit_courant(),
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "parametres": vars(args),
+        "mesures": {nom: resume(durees) for nom, durees in mesures.items()},
+        "compteurs": compteurs,
+    }
+
+    for nom, mesure in resultats["mesures"].items():
+        print(f"{nom:35s} {mesure['median_s']:9.4f} s (min {mesure['min_s']:.4f})")
+
+    with open(args.sortie, "w", encoding="utf-8") as fh:
+        json.dump(resultats, fh, indent=2, ensure_ascii=False)
+    print(f"Résultats écrits dans {args.sortie}")
+
+    if args.comparer:
+        with open(args.comparer, encoding="utf-8") as fh:
+            comparer(resultats, json.load(fh))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
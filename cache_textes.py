@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+# Fichier SQLite local et taille maximale des listes de mots conservées (en octets)
+CACHE_BILLETS = os.getenv("BILLETS_CACHE", ".billets_cache.sqlite3")
+TAILLE_MAX_CACHE = int(os.getenv("BILLETS_CACHE_TAILLE_MAX", 50 * 1024 * 1024))
+
+
+def empreinte(pdf_bytes: bytes) -> str:
+    """Empreinte SHA-256 du contenu d'un fichier."""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+class CacheTextes:
+    """
+    Cache persistant des mots normalisés extraits des PDFs, indexé par
+    l'empreinte du contenu : un même billet n'est analysé qu'une fois, même
+    s'il est renvoyé sous un autre nom.
+
+    Chaque entrée retient aussi le premier fichier vu avec ce contenu et la
+    personne qui lui a été associée, pour reconnaître les doublons, et si la
+    liste de mots couvre tout le PDF (`complet`) ou seulement les premières pages.
+    Les entrées les moins récemment lues sont évincées au-delà de `taille_max`.
+    """
+
+    def __init__(self, chemin=CACHE_BILLETS, taille_max=TAILLE_MAX_CACHE):
+        self.taille_max = taille_max
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(chemin)
+        colonnes = {c[1] for c in self.conn.execute("PRAGMA table_info(textes)")}
+        if colonnes and "complet" not in colonnes:
+            # Cache d'un format antérieur : il sera reconstruit
+            self.conn.execute("DROP TABLE textes")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS textes ("
+            " empreinte TEXT PRIMARY KEY,"
+            " mots TEXT NOT NULL,"
+            " taille INTEGER NOT NULL,"
+            " nom_fichier TEXT,"
+            " personne_id TEXT,"
+            " complet INTEGER NOT NULL DEFAULT 1,"
+            " dernier_acces REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def lire(self, cle: str):
+        """
+        Returns:
+            dict: {"mots", "nom_fichier", "personne_id", "complet"} ou None si absent
+        """
+        ligne = self.conn.execute(
+            "SELECT mots, nom_fichier, personne_id, complet FROM textes WHERE empreinte = ?",
+            (cle,)
+        ).fetchone()
+        if ligne is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.conn.execute("UPDATE textes SET dernier_acces = ? WHERE empreinte = ?",
+                          (time.time(), cle))
+        self.conn.commit()
+        mots, nom_fichier, personne_id, complet = ligne
+        return {"mots": json.loads(mots), "nom_fichier": nom_fichier,
+                "personne_id": json.loads(personne_id) if personne_id else None,
+                "complet": bool(complet)}
+
+    def ecrire(self, cle: str, mots, nom_fichier=None, personne_id=None, complet=True):
+        contenu = json.dumps(mots, ensure_ascii=False)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO textes VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (cle, contenu, len(contenu.encode("utf-8")), nom_fichier,
+             json.dumps(personne_id) if personne_id is not None else None,
+             int(complet), time.time()),
+        )
+        self._evincer()
+        self.conn.commit()
+
+    def associer(self, cle: str, personne_id):
+        """Retient la personne associée au contenu (pour les doublons futurs)."""
+        self.conn.execute("UPDATE textes SET personne_id = ? WHERE empreinte = ?",
+                          (json.dumps(personne_id) if personne_id is not None else None, cle))
+        self.conn.commit()
+
+    def _evincer(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(taille), 0) FROM textes").fetchone()[0]
+        if total <= self.taille_max:
+            return
+        for cle, taille in self.conn.execute(
+                "SELECT empreinte, taille FROM textes ORDER BY dernier_acces ASC").fetchall():
+            self.conn.execute("DELETE FROM textes WHERE empreinte = ?", (cle,))
+            total -= taille
+            if total <= self.taille_max:
+                break
+
+    def stats(self) -> dict:
+        return {"cache_hits": self.hits, "cache_misses": self.misses}
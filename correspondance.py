@@ -0,0 +1,156 @@
+import re
+import unicodedata
+import numpy as np
+from rapidfuzz import fuzz, process
+
+
+def normalize(s: str) -> str:
+    """
+    Met en minuscules, enlève accents, apostrophes, espaces et caractères spéciaux.
+    """
+    s = s.lower()
+    s = ''.join(c for c in unicodedata.normalize('NFD', s)
+                if unicodedata.category(c) != 'Mn')
+    s = re.sub(r'[^a-z]', '', s)
+    return s
+
+
+def meilleure_correspondance(pdf_words, personnes):
+    """
+    Cherche la personne dont le prénom et le nom ressemblent le plus aux mots du PDF.
+    Implémentation de référence (double boucle), conservée pour les comparaisons.
+
+    Returns:
+        tuple: (personne, score) ; personne vaut None si aucun mot n'est exploitable
+    """
+    best_match = None
+    best_score = 0
+
+    if not pdf_words:
+        return best_match, best_score
+
+    for p in personnes:
+        prenom_norm = normalize(p['prenom'])
+        nom_norm = normalize(p['nom'])
+        score_prenom = max([fuzz.ratio(prenom_norm, w) for w in pdf_words])
+        score_nom = max([fuzz.ratio(nom_norm, w) for w in pdf_words])
+        total_score = (score_prenom + score_nom) / 2
+        if total_score > best_score:
+            best_score = total_score
+            best_match = p
+
+    return best_match, best_score
+
+
+class IndexNoms:
+    """
+    Index des prénoms/noms normalisés des joueuses et du staff, construit une
+    seule fois par synchronisation.
+
+    Une personne ne peut atteindre `score_threshold` que si son prénom et son nom
+    obtiennent chacun au moins 2 * score_threshold - 100. Les scores inférieurs
+    sont donc ignorés (score_cutoff), et les mots dont la longueur interdit
+    d'atteindre ce score contre n'importe quel nom sont écartés avant le calcul :
+    fuzz.ratio(a, b) <= 200 * min(len(a), len(b)) / (len(a) + len(b)).
+    Les correspondances retenues sont identiques à meilleure_correspondance.
+
+    `workers` est le nombre de threads de cdist : 1 par défaut, l'index étant
+    aussi utilisé dans chaque processus d'extraction (voir correspondance_nette),
+    où plusieurs threads par processus dépasseraient le nombre de cœurs.
+    """
+
+    def __init__(self, personnes, score_threshold=70, workers=1):
+        self.personnes = list(personnes)
+        self.score_threshold = score_threshold
+        self.workers = workers
+        self.score_minimal = max(0, 2 * score_threshold - 100)
+
+        prenoms = [normalize(p['prenom']) for p in self.personnes]
+        noms = [normalize(p['nom']) for p in self.personnes]
+        # Une requête par prénom puis une par nom : lignes [0, n) et [n, 2n)
+        self.requetes = prenoms + noms
+
+        longueurs = [len(n) for n in self.requetes] or [0]
+        c = self.score_minimal
+        if c > 0:
+            self.longueur_min = min(longueurs) * c / (200 - c)
+            self.longueur_max = max(longueurs) * (200 - c) / c
+        else:
+            self.longueur_min, self.longueur_max = 0, float("inf")
+
+    def candidats(self, pdf_words):
+        """Mots distincts dont la longueur permet d'atteindre le score minimal."""
+        return [w for w in set(pdf_words)
+                if self.longueur_min <= len(w) <= self.longueur_max]
+
+    def _meilleurs(self, requetes, mots, score_cutoff):
+        """Meilleur fuzz.ratio de chaque requête contre les mots, en un seul appel cdist."""
+        matrice = process.cdist(
+            requetes, mots,
+            scorer=fuzz.ratio,
+            score_cutoff=score_cutoff,
+            dtype=np.float64,
+            workers=self.workers,
+        )
+        return matrice.max(axis=1)
+
+    def scores(self, pdf_words):
+        """
+        Score total (moyenne prénom/nom) de chaque personne, en un seul appel cdist.
+        Un total inférieur à score_threshold peut être sous-estimé.
+        """
+        n = len(self.personnes)
+        mots = self.candidats(pdf_words)
+        if not n or not mots:
+            return np.zeros(n)
+
+        meilleurs = self._meilleurs(self.requetes, mots, self.score_minimal)
+        return (meilleurs[:n] + meilleurs[n:]) / 2
+
+    def correspondance_nette(self, pdf_words, marge=15):
+        """
+        Vrai si une personne atteint score_threshold avec au moins `marge`
+        points d'avance sur la suivante : inutile de lire d'autres pages.
+
+        cdist ramène à 0 les scores inférieurs à score_minimal : le total des
+        autres personnes peut donc être sous-estimé. Celles dont le total réel
+        pourrait réduire l'avance sous `marge` sont recalculées sans seuil, sur
+        tous les mots.
+        """
+        n = len(self.personnes)
+        mots = self.candidats(pdf_words)
+        if not n or not mots:
+            return False
+
+        meilleurs = self._meilleurs(self.requetes, mots, self.score_minimal)
+        totaux = (meilleurs[:n] + meilleurs[n:]) / 2
+        i = int(np.argmax(totaux))
+        if totaux[i] < self.score_threshold:
+            return False
+
+        # Total maximal possible : un score tronqué est inférieur à score_minimal
+        bornes = np.where(meilleurs > 0, meilleurs, self.score_minimal)
+        bornes = (bornes[:n] + bornes[n:]) / 2
+        bornes[i] = 0
+        douteux = np.flatnonzero(bornes > totaux[i] - marge)
+        if len(douteux):
+            requetes = [self.requetes[j] for j in douteux] + [self.requetes[n + j] for j in douteux]
+            exacts = self._meilleurs(requetes, list(set(pdf_words)), None)
+            totaux[douteux] = (exacts[:len(douteux)] + exacts[len(douteux):]) / 2
+
+        second = np.delete(totaux, i).max(initial=0)
+        return totaux[i] - second >= marge
+
+    def meilleure_correspondance(self, pdf_words):
+        """
+        Même contrat que meilleure_correspondance (première personne au score
+        maximal, None si tous les scores sont nuls).
+        """
+        if not pdf_words or not self.personnes:
+            return None, 0
+
+        totaux = self.scores(pdf_words)
+        i = int(np.argmax(totaux))
+        if totaux[i] > 0:
+            return self.personnes[i], float(totaux[i])
+        return None, 0
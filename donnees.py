@@ -0,0 +1,652 @@
+import re
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import date, timedelta
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from supabase_client import supabase
+from instrumentation import mesures_courantes, rattacher
+from analyse import agreger_activites, agreger_suivi_forme, ChargeGlissante
+from schemas import dataframe
+
+# Colonnes réellement utilisées par les graphiques, l'historique et analyse.py
+COLONNES_ACTIVITES = "id, date, sport, duree, difficulte, plaisir, commentaire"
+COLONNES_ACTIVITES_EQUIPE = "joueuse_id, " + COLONNES_ACTIVITES
+COLONNES_SUIVI_FORME = "id, date, fatigue, sommeil, douleur, stress, humeur, commentaire"
+COLONNES_JOUEUSES = "id, prenom, nom, categorie"
+COLONNES_BILLETS = "id, nom_fichier, url_stockage, created_at"
+COLONNES_HISTORIQUE = {"activites": COLONNES_ACTIVITES, "suivi_forme": COLONNES_SUIVI_FORME}
+
+# Agrégats journaliers par joueuse et par date, tenus à jour à chaque écriture
+TABLE_AGREGATS = "agregats_journaliers"
+COLONNES_AGREGATS = ("date, nb_seances, plaisir, difficulte, minutes, charge_seance, "
+                     "nb_durees_inconnues, nb_suivis, "
+                     "fatigue, sommeil, douleur, stress, humeur, charge, charge_carre")
+# Colonnes brutes relues pour recalculer les agrégats, et compteurs de chaque table
+COLONNES_SOURCE_AGREGATS = {
+    "activites": "joueuse_id, date, plaisir, difficulte, duree",
+    "suivi_forme": "joueuse_id, date, fatigue, sommeil, douleur, stress, humeur",
+}
+COMPTEURS_AGREGATS = {"activites": ["nb_seances", "nb_durees_inconnues"],
+                      "suivi_forme": ["nb_suivis"]}
+COLONNES_CHARGE_GLISSANTE = "joueuse_id, date, nb_suivis, charge"
+# Champs conservés dans la session après connexion
+COLONNES_ANNUAIRE = {
+    "joueuses": "id, prenom, nom, numero_tel, categorie",
+    "staff": "id, prenom, nom, numero_tel, masculin, feminin",
+}
+
+# Fenêtre affichée par défaut (en jours)
+FENETRE_JOURS = 30
+# Périodes proposées pour les graphiques ; la saison commence le 1er septembre
+PERIODES = ("30 derniers jours", "Saison en cours", "Tout l'historique")
+MOIS_DEBUT_SAISON = 9
+
+# Durées de vie des caches (en secondes) et nombre maximal d'entrées conservées
+TTL_SUIVI = 10 * 60
+TTL_REFERENTIEL = 60 * 60
+TTL_ANNUAIRE = 15 * 60
+# Délai minimal entre deux rechargements de l'annuaire déclenchés par un numéro inconnu
+DELAI_RECHARGEMENT_ANNUAIRE = 60
+MAX_ENTREES = 256
+# Nombre maximal de lignes renvoyées par PostgREST en une réponse (max_rows)
+TAILLE_LOT = 1000
+# Lectures Supabase d'une même page exécutées en même temps (voir charger_en_parallele)
+LECTURES_SIMULTANEES = 6
+
+# Version des données de chaque joueuse, par table : une écriture incrémente la
+# version, ce qui change la clé de cache de cette joueuse uniquement.
+_versions = {}
+_verrou_versions = threading.Lock()
+
+# Jours dont les agrégats n'ont pas pu être recalculés après une écriture
+# enregistrée, par (table, joueuse) : recalculés à la lecture ou à l'écriture
+# suivante (voir rattraper_agregats)
+_agregats_en_retard = {}
+_verrou_agregats = threading.Lock()
+
+
+def debut_fenetre(jours: int = FENETRE_JOURS) -> date:
+    """Premier jour inclus dans une fenêtre glissante de `jours` jours."""
+    return date.today() - timedelta(days=jours)
+
+
+def debut_saison(aujourdhui: date = None) -> date:
+    """Premier jour de la saison en cours."""
+    aujourdhui = aujourdhui or date.today()
+    annee = aujourdhui.year if aujourdhui.month >= MOIS_DEBUT_SAISON else aujourdhui.year - 1
+    return date(annee, MOIS_DEBUT_SAISON, 1)
+
+
+def jours_periode(periode: str):
+    """Nombre de jours couverts par une des PERIODES (None pour tout l'historique)."""
+    if periode == PERIODES[0]:
+        return FENETRE_JOURS
+    if periode == PERIODES[1]:
+        return (date.today() - debut_saison()).days
+    return None
+
+
+def version_cache(table: str, joueuse_id) -> int:
+    """Version des lectures en cache de `table` pour une joueuse (voir invalider)."""
+    return _versions.get((table, joueuse_id), 0)
+
+
+def invalider(table: str, joueuse_id):
+    """Invalide les lectures en cache de `table` pour une seule joueuse."""
+    with _verrou_versions:
+        _versions[(table, joueuse_id)] = version_cache(table, joueuse_id) + 1
+
+
+def _lire_par_lots(construire):
+    """
+    Exécute la requête renvoyée par `construire()` (filtres et tri compris) par
+    lots de TAILLE_LOT lignes, PostgREST tronquant chaque réponse à max_rows.
+    Une seule requête suffit tant que le résultat compte moins de TAILLE_LOT lignes.
+    """
+    lignes = []
+    while True:
+        lot = construire().range(len(lignes), len(lignes) + TAILLE_LOT - 1).execute().data
+        lignes.extend(lot)
+        if len(lot) < TAILLE_LOT:
+            return lignes
+
+
+# Partagé par toutes les sessions : le nombre de requêtes en vol reste borné
+_executeur = ThreadPoolExecutor(max_workers=LECTURES_SIMULTANEES, thread_name_prefix="lecture")
+
+
+def charger_en_parallele(lectures: dict) -> dict:
+    """
+    Lance en même temps des lectures indépendantes et attend qu'elles soient
+    toutes terminées : la page attend la plus lente au lieu de leur somme.
+
+    Les lectures passent par les mêmes fonctions (et donc les mêmes caches)
+    que le reste de l'app ; les requêtes restent attribuées au rerun en cours
+    (instrumentation).
+
+    Args:
+        lectures: {nom: (fonction, *arguments)}
+
+    Returns:
+        dict: {nom: Future} ; future.result() renvoie le résultat ou relève
+            l'exception de la lecture, à traiter par l'appelant comme un appel direct
+    """
+    contexte = get_script_run_ctx()
+    mesures = mesures_courantes()
+
+    def executer(fonction, *args):
+        # Le thread du pool sert ensuite à d'autres sessions : le contexte est retiré
+        thread = threading.current_thread()
+        add_script_run_ctx(thread, contexte)
+        try:
+            with rattacher(mesures):
+                return fonction(*args)
+        finally:
+            add_script_run_ctx(thread, None)
+
+    futures = {nom: _executeur.submit(executer, *lecture) for nom, lecture in lectures.items()}
+    wait(futures.values())
+    return futures
+
+
+@st.cache_data(ttl=TTL_SUIVI, max_entries=MAX_ENTREES, show_spinner=False)
+def _charger_fenetre(table: str, colonnes: str, joueuse_id, debut, version):
+    """
+    Lit les lignes d'une joueuse dans `table`, en ne gardant que `colonnes`
+    et les dates à partir de `debut` (filtre appliqué côté Supabase).
+    Avec debut=None, tout l'historique est renvoyé.
+
+    `version` ne sert qu'à la clé de cache (voir invalider).
+    """
+    def construire():
+        query = (
+            supabase.table(table)
+            .select(colonnes)
+            .eq("joueuse_id", joueuse_id)
+        )
+        if debut is not None:
+            query = query.gte("date", debut.isoformat())
+        query = query.order("date", desc=False)
+        # Les agrégats n'ont qu'une ligne par date ; les tables brutes sont départagées par id
+        return query if table == TABLE_AGREGATS else query.order("id", desc=False)
+
+    return _lire_par_lots(construire)
+
+
+def charger_activites(joueuse_id, jours=FENETRE_JOURS):
+    """Activités d'une joueuse sur les `jours` derniers jours, triées par date."""
+    debut = debut_fenetre(jours) if jours is not None else None
+    return _charger_fenetre("activites", COLONNES_ACTIVITES, joueuse_id, debut,
+                            version_cache("activites", joueuse_id))
+
+
+def charger_suivi_forme(joueuse_id, jours=FENETRE_JOURS):
+    """Suivi de forme d'une joueuse sur les `jours` derniers jours, trié par date."""
+    debut = debut_fenetre(jours) if jours is not None else None
+    return _charger_fenetre("suivi_forme", COLONNES_SUIVI_FORME, joueuse_id, debut,
+                            version_cache("suivi_forme", joueuse_id))
+
+
+@st.cache_data(ttl=TTL_SUIVI, max_entries=MAX_ENTREES, show_spinner=False)
+def _charger_fenetre_equipe(table: str, colonnes: str, joueuse_ids: tuple, debut, versions):
+    """
+    Comme _charger_fenetre, pour plusieurs joueuses en une requête (filtre `in`).
+
+    `versions` ne sert qu'à la clé de cache (voir invalider).
+    """
+    def construire():
+        query = (
+            supabase.table(table)
+            .select(colonnes)
+            .in_("joueuse_id", list(joueuse_ids))
+        )
+        if debut is not None:
+            query = query.gte("date", debut.isoformat())
+        return query.order("date", desc=False).order("id", desc=False)
+
+    return _lire_par_lots(construire)
+
+
+def charger_activites_equipe(joueuse_ids, jours=FENETRE_JOURS):
+    """Activités de plusieurs joueuses sur les `jours` derniers jours, triées par date."""
+    joueuse_ids = tuple(joueuse_ids)
+    debut = debut_fenetre(jours) if jours is not None else None
+    versions = tuple(version_cache("activites", j) for j in joueuse_ids)
+    return _charger_fenetre_equipe("activites", COLONNES_ACTIVITES_EQUIPE, joueuse_ids,
+                                   debut, versions)
+
+
+def _version_agregats(joueuse_id):
+    # Les agrégats changent à chaque écriture dans l'une des deux tables brutes
+    return version_cache("activites", joueuse_id), version_cache("suivi_forme", joueuse_id)
+
+
+def charger_agregats(joueuse_id, jours=FENETRE_JOURS):
+    """
+    Agrégats journaliers d'une joueuse sur les `jours` derniers jours, triés
+    par date : une ligne par jour, quel que soit le nombre de lignes brutes.
+    """
+    rattraper_agregats([joueuse_id])
+    debut = debut_fenetre(jours) if jours is not None else None
+    return _charger_fenetre(TABLE_AGREGATS, COLONNES_AGREGATS, joueuse_id, debut,
+                            _version_agregats(joueuse_id))
+
+
+@st.cache_resource(ttl=TTL_REFERENTIEL, show_spinner=False)
+def moteur_charge_glissante():
+    """
+    Fenêtres glissantes de charge partagées par tout le processus. Le moteur
+    est recréé toutes les heures, ce qui prend en compte les écritures faites
+    par un autre processus (dans celui-ci, voir charge_glissante_equipe).
+    """
+    return ChargeGlissante()
+
+
+# Version des agrégats de chaque joueuse lors de sa dernière intégration au
+# moteur (partagé entre sessions : protégé par _verrou_versions)
+_versions_charge = {}
+
+
+@st.cache_data(ttl=TTL_SUIVI, max_entries=MAX_ENTREES, show_spinner=False)
+def _charge_glissante_equipe(joueuse_ids: tuple, aujourdhui, versions: tuple):
+    """
+    Voir charge_glissante_equipe. `versions` (versions des agrégats de chaque
+    joueuse) et `aujourdhui` font partie de la clé de cache : un rerun sans
+    écriture ni changement de jour ne relit rien.
+    """
+    moteur = moteur_charge_glissante()
+    rattrapage = aujourdhui - timedelta(days=max(moteur.fenetres) - 1)
+    versions = dict(zip(joueuse_ids, versions))
+
+    with _verrou_versions:
+        integrees = {j: _versions_charge.get(j) for j in joueuse_ids}
+
+    debuts = {}
+    for joueuse_id in joueuse_ids:
+        fin = moteur.fin(joueuse_id)
+        if fin is None or integrees[joueuse_id] != versions[joueuse_id]:
+            moteur.oublier(joueuse_id)
+            debuts[joueuse_id] = rattrapage
+        else:
+            # Le dernier jour intégré a pu recevoir d'autres suivis depuis
+            debuts[joueuse_id] = fin
+
+    if debuts:
+        debut = min(debuts.values())
+        df = dataframe(TABLE_AGREGATS, _lire_par_lots(lambda: (
+            supabase.table(TABLE_AGREGATS)
+            .select(COLONNES_CHARGE_GLISSANTE)
+            .in_("joueuse_id", list(debuts))
+            .gte("date", debut.isoformat())
+            # Un jour saisi d'avance n'est intégré que le jour venu : le moteur
+            # ne sait pas revenir avant son dernier jour intégré
+            .lte("date", aujourdhui.isoformat())
+            .order("date", desc=False)
+        )))
+        if not df.empty:
+            debut_joueuse = df["joueuse_id"].map({j: pd.Timestamp(d) for j, d in debuts.items()})
+            moteur.integrer(df[df["date"] >= debut_joueuse])
+        with _verrou_versions:
+            _versions_charge.update(versions)
+
+    return moteur.tableau(joueuse_ids, aujourdhui)
+
+
+def charge_glissante_equipe(joueuse_ids):
+    """
+    Charge sur 7 et 28 jours et leur rapport, au jour d'aujourd'hui, pour
+    chaque joueuse de `joueuse_ids` (DataFrame indexé par joueuse_id).
+
+    Le résultat est en cache tant qu'aucune joueuse n'a de nouvelle écriture
+    (voir invalider). Sinon, seuls les agrégats arrivés depuis la dernière
+    mise à jour du moteur sont relus, en une requête pour toute l'équipe : à
+    partir du dernier jour intégré pour une joueuse déjà suivie, ses 28
+    derniers jours pour une joueuse nouvelle ou dont les données ont changé
+    depuis.
+    """
+    joueuse_ids = tuple(joueuse_ids)
+    rattraper_agregats(joueuse_ids)
+    versions = tuple(_version_agregats(j) for j in joueuse_ids)
+    return _charge_glissante_equipe(joueuse_ids, date.today(), versions)
+
+
+@st.cache_data(ttl=TTL_SUIVI, max_entries=MAX_ENTREES, show_spinner=False)
+def _charger_page(table: str, joueuse_id, debut, decalage: int, taille: int, version):
+    query = (
+        supabase.table(table)
+        .select(COLONNES_HISTORIQUE[table])
+        .eq("joueuse_id", joueuse_id)
+    )
+    if debut is not None:
+        query = query.gte("date", debut.isoformat())
+
+    return (
+        query.order("date", desc=True)
+        .order("id", desc=True)
+        .range(decalage, decalage + taille - 1)
+        .execute()
+        .data
+    )
+
+
+def charger_page_historique(table: str, joueuse_id, jours, page: int, taille: int):
+    """
+    Une page de l'historique d'une joueuse (du plus récent au plus ancien) :
+    seules les `taille` lignes affichées sont lues.
+    """
+    debut = debut_fenetre(jours) if jours is not None else None
+    return _charger_page(table, joueuse_id, debut, page * taille, taille,
+                         version_cache(table, joueuse_id))
+
+
+@st.cache_data(ttl=TTL_REFERENTIEL, max_entries=MAX_ENTREES, show_spinner=False)
+def _charger_billets(joueuse_id, version):
+    return (
+        supabase.table("billets")
+        .select(COLONNES_BILLETS)
+        .eq("joueuse_id", joueuse_id)
+        .order("created_at", desc=True)
+        .execute()
+        .data
+    )
+
+
+def charger_billets(joueuse_id):
+    """Billets d'une joueuse (ou d'un membre du staff), du plus récent au plus ancien."""
+    return _charger_billets(joueuse_id, version_cache("billets", joueuse_id))
+
+
+def invalider_billets():
+    """Oublie tous les billets en cache (après une synchronisation du bucket)."""
+    _charger_billets.clear()
+
+
+@st.cache_data(ttl=TTL_REFERENTIEL, max_entries=MAX_ENTREES, show_spinner=False)
+def charger_joueuses(categorie=None):
+    """Liste des joueuses (éventuellement d'une seule catégorie), triée par prénom."""
+    query = supabase.table("joueuses").select(COLONNES_JOUEUSES)
+    if categorie is not None:
+        query = query.eq("categorie", categorie)
+    return query.order("prenom", desc=False).execute().data
+
+
+def lignes_json(df) -> list:
+    """
+    Lignes d'un DataFrame en dicts sérialisables en JSON (NaN -> None, dates
+    d'un DataFrame typé en chaînes ISO).
+    """
+    dates = df.select_dtypes("datetime").columns
+    if len(dates):
+        df = df.assign(**{c: df[c].dt.strftime("%Y-%m-%d") for c in dates})
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def mettre_a_jour_agregats(table: str, joueuse_id, dates):
+    """
+    Recalcule les agrégats journaliers d'une joueuse pour quelques dates (celles
+    d'une écriture dans `table`) à partir des lignes brutes de ces seuls jours.
+
+    Seules les colonnes issues de `table` sont écrites (upsert) : la partie de
+    la ligne qui vient de l'autre table est conservée.
+    """
+    dates = sorted({str(d) for d in dates if d})
+    if not dates:
+        return
+
+    lignes = (
+        supabase.table(table)
+        .select(COLONNES_SOURCE_AGREGATS[table])
+        .eq("joueuse_id", joueuse_id)
+        .in_("date", dates)
+        .execute()
+        .data
+    )
+    agreger = agreger_activites if table == "activites" else agreger_suivi_forme
+    jours = dataframe(TABLE_AGREGATS, {"date": dates}).merge(
+        agreger(dataframe(table, lignes)).drop(columns="joueuse_id"), on="date", how="left"
+    )
+    # Un jour dont toutes les lignes ont été supprimées repasse à zéro
+    compteurs = COMPTEURS_AGREGATS[table]
+    jours[compteurs] = jours[compteurs].astype(float).fillna(0).astype(int)
+    jours.insert(0, "joueuse_id", joueuse_id)
+
+    (
+        supabase.table(TABLE_AGREGATS)
+        .upsert(lignes_json(jours), on_conflict="joueuse_id,date")
+        .execute()
+    )
+
+
+def _recalculer_agregats(table: str, joueuse_id, dates) -> bool:
+    """
+    Met à jour les agrégats d'une joueuse après une écriture déjà enregistrée
+    dans `table`, avec les jours restés en retard depuis une écriture
+    précédente. En cas d'échec, les jours sont gardés pour la tentative
+    suivante : l'écriture elle-même a réussi et n'est pas signalée en erreur.
+
+    Returns:
+        bool: True si les agrégats sont à jour
+    """
+    with _verrou_agregats:
+        dates = set(dates) | _agregats_en_retard.pop((table, joueuse_id), set())
+    try:
+        mettre_a_jour_agregats(table, joueuse_id, dates)
+        return True
+    except Exception as e:
+        with _verrou_agregats:
+            _agregats_en_retard.setdefault((table, joueuse_id), set()).update(dates)
+        print(f"Agrégats de la joueuse {joueuse_id} ({table}) non mis à jour, "
+              f"nouvel essai à la prochaine lecture : {e}")
+        return False
+
+
+def rattraper_agregats(joueuse_ids):
+    """
+    Recalcule les agrégats restés en retard (voir _recalculer_agregats) pour
+    `joueuse_ids`, et invalide le cache des joueuses rattrapées. Sans retard,
+    aucune requête n'est envoyée.
+    """
+    with _verrou_agregats:
+        en_retard = [cle for cle in _agregats_en_retard if cle[1] in joueuse_ids]
+    for table, joueuse_id in en_retard:
+        if _recalculer_agregats(table, joueuse_id, ()):
+            invalider(table, joueuse_id)
+
+
+def reconstruire_agregats(joueuse_ids=None) -> int:
+    """
+    Reconstruit les agrégats journaliers de toutes les joueuses (ou seulement
+    de `joueuse_ids`) à partir des tables brutes, par exemple après un import
+    ou une correction faite directement dans Supabase.
+
+    Returns:
+        int: nombre de lignes d'agrégats écrites
+    """
+    if joueuse_ids is None:
+        joueuse_ids = [j["id"] for j in supabase.table("joueuses").select("id").execute().data]
+    joueuse_ids = list(joueuse_ids)
+    if not joueuse_ids:
+        return 0
+
+    def lire(table):
+        return dataframe(table, _lire_par_lots(lambda: (
+            supabase.table(table)
+            .select(COLONNES_SOURCE_AGREGATS[table])
+            .in_("joueuse_id", joueuse_ids)
+            .order("date", desc=False)
+            .order("id", desc=False)
+        )))
+
+    jours = agreger_activites(lire("activites")).merge(
+        agreger_suivi_forme(lire("suivi_forme")), on=["joueuse_id", "date"], how="outer"
+    )
+    for compteurs in COMPTEURS_AGREGATS.values():
+        jours[compteurs] = jours[compteurs].astype(float).fillna(0).astype(int)
+    enregistrements = lignes_json(jours)
+    existants = _lire_par_lots(lambda: (
+        supabase.table(TABLE_AGREGATS)
+        .select("joueuse_id, date")
+        .in_("joueuse_id", joueuse_ids)
+        .order("joueuse_id", desc=False)
+        .order("date", desc=False)
+    ))
+
+    # Les lignes existantes sont remplacées (upsert) avant la suppression des
+    # jours disparus : une erreur en cours de route laisse d'anciens agrégats,
+    # jamais une table vide
+    for i in range(0, len(enregistrements), TAILLE_LOT):
+        (
+            supabase.table(TABLE_AGREGATS)
+            .upsert(enregistrements[i:i + TAILLE_LOT], on_conflict="joueuse_id,date")
+            .execute()
+        )
+    gardes = {(e["joueuse_id"], e["date"]) for e in enregistrements}
+    disparus = {}
+    for e in existants:
+        if (e["joueuse_id"], e["date"]) not in gardes:
+            disparus.setdefault(e["joueuse_id"], []).append(e["date"])
+    for joueuse_id, dates in disparus.items():
+        for i in range(0, len(dates), TAILLE_LOT):
+            (
+                supabase.table(TABLE_AGREGATS)
+                .delete()
+                .eq("joueuse_id", joueuse_id)
+                .in_("date", dates[i:i + TAILLE_LOT])
+                .execute()
+            )
+
+    with _verrou_agregats:
+        for cle in [c for c in _agregats_en_retard if c[1] in joueuse_ids]:
+            del _agregats_en_retard[cle]
+    for joueuse_id in joueuse_ids:
+        invalider("activites", joueuse_id)
+        invalider("suivi_forme", joueuse_id)
+    return len(enregistrements)
+
+
+def inserer(table: str, data: dict, verrou=None):
+    """
+    Insère une ligne pour une joueuse, met à jour ses agrégats du jour et
+    invalide son cache pour cette table. Seul l'échec de l'insertion est
+    relevé : des agrégats non mis à jour sont rattrapés plus tard (voir
+    _recalculer_agregats).
+
+    `verrou`, s'il est fourni, est pris pour invalider le cache (voir ecritures.py).
+    """
+    res = supabase.table(table).insert(data).execute()
+    _recalculer_agregats(table, data["joueuse_id"], [data["date"]])
+    with verrou or nullcontext():
+        invalider(table, data["joueuse_id"])
+    return res
+
+
+def supprimer(table: str, joueuse_id, record_id):
+    """
+    Supprime une ligne d'une joueuse, met à jour ses agrégats du jour et
+    invalide son cache pour cette table.
+    """
+    return supprimer_plusieurs(table, joueuse_id, [record_id])
+
+
+def supprimer_plusieurs(table: str, joueuse_id, record_ids, verrou=None):
+    """
+    Supprime plusieurs lignes d'une joueuse en une seule requête (filtre `in`),
+    met à jour ses agrégats des jours concernés et invalide son cache pour cette
+    table. Comme pour inserer, seul l'échec de la suppression est relevé.
+
+    `verrou`, s'il est fourni, est pris pour invalider le cache (voir ecritures.py).
+    """
+    record_ids = list(record_ids)
+    if not record_ids:
+        return None
+    res = (
+        supabase.table(table)
+        .delete()
+        .eq("joueuse_id", joueuse_id)
+        .in_("id", record_ids)
+        .execute()
+    )
+    # La suppression renvoie les lignes supprimées, donc leurs dates
+    _recalculer_agregats(table, joueuse_id, [l.get("date") for l in res.data])
+    with verrou or nullcontext():
+        invalider(table, joueuse_id)
+    return res
+
+
+def normaliser_numero(numero) -> str:
+    """Numéro de téléphone au format national à 10 chiffres (06…, 07…)."""
+    numero = re.sub(r"[^\d+]", "", str(numero or ""))
+    return re.sub(r"^(\+|00)33", "0", numero)
+
+
+class Annuaire:
+    """
+    Index en mémoire, partagé par tout le processus, des numéros de téléphone
+    des joueuses et du staff : numéro normalisé -> (personne, type).
+
+    Construit en une lecture des deux tables et rechargé après TTL_ANNUAIRE ;
+    une connexion est alors une simple recherche dans un dictionnaire.
+    """
+
+    def __init__(self, ttl=TTL_ANNUAIRE):
+        self.ttl = ttl
+        self._index = {}
+        self._charge_le = None
+        self._verrou = threading.Lock()
+
+    def rafraichir(self):
+        """Recharge l'annuaire (par exemple après l'ajout d'une joueuse)."""
+        index = {}
+        # Le staff d'abord : à numéro égal, la joueuse l'emporte comme avant
+        for table, type_user in (("staff", "staff"), ("joueuses", "joueuse")):
+            for personne in supabase.table(table).select(COLONNES_ANNUAIRE[table]).execute().data:
+                numero = normaliser_numero(personne.get("numero_tel"))
+                if numero:
+                    index[numero] = (personne, type_user)
+        with self._verrou:
+            self._index = index
+            self._charge_le = time.monotonic()
+
+    def _age(self):
+        return float("inf") if self._charge_le is None else time.monotonic() - self._charge_le
+
+    def chercher(self, numero):
+        """
+        Returns:
+            tuple: (personne, "joueuse" | "staff"), ou (None, None) si le numéro est inconnu
+        """
+        if self._age() > self.ttl:
+            self.rafraichir()
+
+        numero = normaliser_numero(numero)
+        trouve = self._index.get(numero)
+        if trouve is None and self._age() > DELAI_RECHARGEMENT_ANNUAIRE:
+            # Numéro peut-être ajouté depuis le dernier chargement
+            self.rafraichir()
+            trouve = self._index.get(numero)
+
+        if trouve is None:
+            return None, None
+        personne, type_user = trouve
+        return dict(personne), type_user
+
+
+annuaire = Annuaire()
+
+
+def chercher_utilisateur(numero):
+    """Personne (joueuse ou staff) associée à un numéro de téléphone."""
+    return annuaire.chercher(numero)
+
+
+def rafraichir_annuaire():
+    """
+    Force le rechargement de l'annuaire (et de la liste des joueuses) sans
+    attendre leur expiration, par exemple après l'ajout d'une joueuse.
+    """
+    annuaire.rafraichir()
+    charger_joueuses.clear()
@@ -0,0 +1,174 @@
+"""
+Écritures optimistes des suivis (insertions et suppressions).
+
+Une écriture est appliquée tout de suite aux données affichées (agrégats
+journaliers, séances, page d'historique) puis envoyée à Supabase en
+arrière-plan : la page est réaffichée sans attendre la réponse ni relire
+l'historique. Une fois la page affichée, le rerun attend la confirmation ;
+si l'écriture a échoué, elle disparaît de l'affichage au rerun suivant, avec
+son message d'erreur.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+from analyse import agreger_activites, agreger_suivi_forme, cumuler_agregats
+from donnees import inserer, supprimer_plusieurs, debut_fenetre, version_cache, lignes_json
+
+# Écritures envoyées en même temps, toutes sessions confondues
+ECRITURES_SIMULTANEES = 4
+
+AJOUT = "ajout"
+SUPPRESSION = "suppression"
+
+_executeur = ThreadPoolExecutor(max_workers=ECRITURES_SIMULTANEES, thread_name_prefix="ecriture")
+
+
+def _debut(jours):
+    return debut_fenetre(jours).isoformat() if jours is not None else None
+
+
+class EcrituresEnAttente:
+    """
+    Écritures d'une session qui ne sont pas encore prises en compte par le
+    cache des lectures.
+
+    Une écriture est appliquée aux lignes lues (lignes(), agregats(), page())
+    tant que le cache de sa joueuse n'a pas été invalidé. L'invalidation, faite
+    par le thread d'écriture une fois Supabase à jour, attend la fin de
+    l'affichage en cours (voir affichage()) : une même page ne mélange jamais
+    données relues et écriture appliquée localement.
+    """
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        # Écritures non encore constatées par affichage(), et celles à appliquer
+        self._en_cours = []
+        self._actives = []
+
+    def _envoyer(self, table, joueuse_id, type_, lignes, message, fonction, *args):
+        ecriture = {"table": table, "joueuse_id": joueuse_id, "type": type_,
+                    "lignes": lignes, "message": message,
+                    # Version du cache avant l'écriture : elle change une fois l'écriture faite
+                    "version": version_cache(table, joueuse_id)}
+        ecriture["future"] = _executeur.submit(fonction, *args, verrou=self._verrou)
+        self._en_cours.append(ecriture)
+        self._actives.append(ecriture)
+
+    def inserer(self, table: str, data: dict):
+        """Insère `data` (voir donnees.inserer) sans attendre Supabase."""
+        self._envoyer(table, data["joueuse_id"], AJOUT, [data],
+                      "Erreur lors de l'enregistrement", inserer, table, data)
+
+    def supprimer(self, table: str, joueuse_id, lignes: list):
+        """
+        Supprime des lignes d'une joueuse (voir donnees.supprimer_plusieurs)
+        sans attendre Supabase. Les lignes complètes sont nécessaires pour
+        retirer leurs notes des agrégats affichés.
+        """
+        lignes = [{**l, "joueuse_id": joueuse_id} for l in lignes]
+        self._envoyer(table, joueuse_id, SUPPRESSION, lignes, "Erreur lors de la suppression",
+                      supprimer_plusieurs, table, joueuse_id, [l["id"] for l in lignes])
+
+    @contextmanager
+    def affichage(self):
+        """
+        Encadre l'affichage d'une page. Les écritures terminées sont retirées
+        (leurs données sont désormais relues) et les messages de celles qui
+        ont échoué sont renvoyés.
+
+        Yields:
+            list: messages d'erreur à afficher
+        """
+        with self._verrou:
+            erreurs = []
+            for ecriture in [e for e in self._en_cours if e["future"].done()]:
+                self._en_cours.remove(ecriture)
+                erreur = ecriture["future"].exception()
+                if erreur is not None:
+                    erreurs.append(f"{ecriture['message']} : {erreur}")
+            self._actives = [e for e in self._en_cours
+                             if version_cache(e["table"], e["joueuse_id"]) == e["version"]]
+            yield erreurs
+
+    def attendre(self) -> bool:
+        """
+        Attend les écritures en cours (à appeler une fois la page affichée).
+
+        Returns:
+            bool: True si l'une d'elles a échoué (la page est à réafficher)
+        """
+        futures = [e["future"] for e in self._en_cours]
+        wait(futures)
+        return any(f.exception() is not None for f in futures)
+
+    def _ecritures(self, table, joueuse_ids, type_):
+        return [e for e in self._actives
+                if e["table"] == table and e["joueuse_id"] in joueuse_ids and e["type"] == type_]
+
+    def _ajouts(self, table, joueuse_ids, jours):
+        debut = _debut(jours)
+        return [{"id": None, **l} for e in self._ecritures(table, joueuse_ids, AJOUT)
+                for l in e["lignes"] if debut is None or l["date"] >= debut]
+
+    def _supprimes(self, table, joueuse_ids):
+        return {l["id"] for e in self._ecritures(table, joueuse_ids, SUPPRESSION)
+                for l in e["lignes"]}
+
+    def lignes(self, table: str, lignes: list, joueuse_ids, jours) -> list:
+        """
+        Lignes brutes d'une ou plusieurs joueuses (triées par date, voir
+        charger_activites) avec les écritures en attente. Une ligne ajoutée
+        n'a pas encore d'id.
+        """
+        ajouts, supprimes = self._ajouts(table, joueuse_ids, jours), self._supprimes(table, joueuse_ids)
+        if not ajouts and not supprimes:
+            return lignes
+        res = [l for l in lignes if l["id"] not in supprimes] + ajouts
+        return sorted(res, key=lambda l: l["date"])
+
+    def agregats(self, table: str, lignes: list, joueuse_id, jours) -> list:
+        """Agrégats journaliers d'une joueuse (voir charger_agregats) avec les écritures en attente."""
+        debut = _debut(jours)
+        agreger = agreger_activites if table == "activites" else agreger_suivi_forme
+        ecritures = self._ecritures(table, {joueuse_id}, AJOUT) \
+            + self._ecritures(table, {joueuse_id}, SUPPRESSION)
+        if not ecritures:
+            return lignes
+
+        df = pd.DataFrame(lignes)
+        for ecriture in ecritures:
+            delta = agreger(pd.DataFrame(ecriture["lignes"]))
+            if debut is not None:
+                delta = delta[delta["date"] >= debut]
+            df = cumuler_agregats(df, delta, 1 if ecriture["type"] == AJOUT else -1)
+        return lignes_json(df)
+
+    def page(self, table: str, lignes: list, joueuse_id, jours, page: int, taille: int) -> list:
+        """
+        Page d'historique (voir charger_page_historique) avec les écritures en
+        attente. Une ligne ajoutée n'apparaît que si elle tombe dans la page
+        lue ; les pages suivantes ne sont décalées qu'à la relecture.
+        """
+        ajouts, supprimes = self._ajouts(table, {joueuse_id}, jours), self._supprimes(table, {joueuse_id})
+        if not ajouts and not supprimes:
+            return lignes
+        complete = len(lignes) == taille
+        res = [l for l in lignes if l["id"] not in supprimes]
+        for ligne in ajouts:
+            # Après les lignes plus récentes ; une ligne ajoutée a le plus grand id de sa date
+            position = sum(l["date"] > ligne["date"] for l in res)
+            if position == 0 and page > 0 and res:
+                continue
+            res.insert(position, ligne)
+        return res[:taille] if complete else res
+
+
+def ecritures_session() -> EcrituresEnAttente:
+    """Écritures en attente de la session Streamlit courante."""
+    if "ecritures" not in st.session_state:
+        st.session_state.ecritures = EcrituresEnAttente()
+    return st.session_state.ecritures
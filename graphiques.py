@@ -0,0 +1,233 @@
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.colors import qualitative
+
+# Nombre maximal de points par série : au-delà, les points sont regroupés par
+# semaine, puis par mois si cela ne suffit pas.
+BUDGET_POINTS = 400
+# Au-delà de ce nombre de points, les séries sont rendues en WebGL (Scattergl)
+SEUIL_WEBGL = 200
+# Libellé et en-tête de survol de chaque pas de regroupement
+PAS_AGREGATION = {
+    "W": ("semaine", "Semaine du %{x|%d/%m/%Y}"),
+    "M": ("mois", "%{x|%m/%Y}"),
+}
+COULEURS_FORME = dict(zip(["fatigue", "sommeil", "douleur", "stress", "humeur"],
+                          qualitative.Plotly))
+
+
+def pas_agregation(dates, n_points=None, budget=BUDGET_POINTS):
+    """
+    Pas de regroupement nécessaire pour tracer en au plus `budget` points une
+    série de `n_points` points (par défaut un par date) répartis sur `dates`.
+
+    Returns:
+        None (pas de regroupement), "W" (par semaine) ou "M" (par mois)
+    """
+    if (len(dates) if n_points is None else n_points) <= budget:
+        return None
+    semaines = pd.to_datetime(pd.Series(dates)).dt.to_period("W").nunique()
+    return "W" if semaines <= budget else "M"
+
+
+def regrouper(df, colonnes, pas, poids=None):
+    """
+    Moyennes de `colonnes` par semaine ou par mois, datées du début de la
+    période, avec le nombre de lignes regroupées dans la colonne "nb".
+
+    Avec `poids` (colonne d'effectifs, ex. nb_seances des agrégats journaliers),
+    les moyennes sont pondérées et "nb" est la somme des effectifs.
+    """
+    periodes = pd.to_datetime(df["date"]).dt.to_period(pas).dt.start_time.rename("date")
+    if poids is None:
+        groupes = df.groupby(periodes)
+        res = groupes[colonnes].mean()
+        res["nb"] = groupes.size()
+        return res.reset_index()
+
+    sommes = df[colonnes].mul(df[poids], axis=0).assign(nb=df[poids]).groupby(periodes).sum()
+    res = sommes[colonnes].div(sommes["nb"], axis=0)
+    res["nb"] = sommes["nb"]
+    return res.reset_index()
+
+
+def type_trace(n_points):
+    """go.Scattergl pour les longues séries, go.Scatter (SVG) sinon."""
+    return go.Scattergl if n_points > SEUIL_WEBGL else go.Scatter
+
+
+def figure_suivi_sportif(df_jours, df=None):
+    """
+    Graphique plaisir/difficulté : moyennes journalières en pointillés et une
+    paire de points par séance. Au-delà de BUDGET_POINTS séances, les points
+    sont des moyennes par semaine ou par mois (les pointillés restent journaliers).
+
+    Args:
+        df_jours: agrégats journaliers (date, nb_seances, plaisir, difficulte)
+        df: DataFrame des activités (date, plaisir, difficulte, sport, duree,
+            commentaire), utilisé seulement sous BUDGET_POINTS séances
+    """
+    df_avg = df_jours[df_jours["nb_seances"] > 0]
+    n_seances = int(df_avg["nb_seances"].sum())
+
+    Scatter = type_trace(n_seances)
+    pas = pas_agregation(df_avg["date"], n_seances)
+
+    fig = go.Figure()
+
+    fig.add_trace(Scatter(
+        x=df_avg["date"], y=df_avg["plaisir"],
+        mode="lines",
+        line=dict(color="green", dash="dash"),
+        marker=dict(color="green"),
+        name="",
+        yaxis="y1",
+        showlegend=False,
+        hoverinfo="skip",
+    ))
+
+    fig.add_trace(Scatter(
+        x=df_avg["date"], y=df_avg["difficulte"],
+        mode="lines",
+        line=dict(color="red", dash="dash"),
+        marker=dict(color="red"),
+        name="",
+        yaxis="y2",
+        showlegend=False,
+        hoverinfo="skip",
+    ))
+
+    if pas is None:
+        # Textes nullables (pd.NA) remplacés par "" : Plotly ne sait pas les sérialiser
+        survol = df[["sport", "duree", "commentaire"]].astype(object).fillna("")
+        fig.add_trace(Scatter(
+            x=df["date"], y=df["plaisir"],
+            mode="markers",
+            marker=dict(color="green", size=10),
+            name="Plaisir séance",
+            customdata=survol,
+            hovertemplate=(
+                "<b>%{x|%d/%m}</b><br>"
+                "Plaisir: %{y}<br>"
+                "Sport: %{customdata[0]}<br>"
+                "Durée: %{customdata[1]}<br>"
+                "%{customdata[2]}<extra></extra>"
+            ),
+            yaxis="y1",
+        ))
+
+        fig.add_trace(Scatter(
+            x=df["date"], y=df["difficulte"],
+            mode="markers",
+            marker=dict(color="red", size=10),
+            name="Difficulté séance",
+            customdata=survol,
+            hovertemplate=(
+                "<b>%{x|%d/%m}</b><br>"
+                "Difficulté: %{y}<br>"
+                "Sport: %{customdata[0]}<br>"
+                "Durée: %{customdata[1]}<br>"
+                "%{customdata[2]}<extra></extra>"
+            ),
+            yaxis="y2",
+        ))
+    else:
+        libelle, entete = PAS_AGREGATION[pas]
+        df_pts = regrouper(df_avg, ["plaisir", "difficulte"], pas, poids="nb_seances")
+        for colonne, nom, couleur, axe in (("plaisir", "Plaisir", "green", "y1"),
+                                           ("difficulte", "Difficulté", "red", "y2")):
+            fig.add_trace(Scatter(
+                x=df_pts["date"], y=df_pts[colonne],
+                mode="markers",
+                marker=dict(color=couleur, size=10),
+                name=f"{nom} moyen par {libelle}",
+                customdata=df_pts["nb"],
+                hovertemplate=(
+                    f"<b>{entete}</b><br>"
+                    f"{nom} moyen: %{{y:.1f}}<br>"
+                    "%{customdata} séance(s)<extra></extra>"
+                ),
+                yaxis=axe,
+            ))
+
+    fig.update_layout(
+        xaxis=dict(title="Date"),
+        yaxis=dict(title="Plaisir", range=[0, 10], side="left", color="green"),
+        yaxis2=dict(title="Difficulté", range=[0, 10], side="right",
+                    overlaying="y", color="red"),
+        legend=dict(orientation="h", yanchor="bottom",
+                    y=1.02, xanchor="right", x=1),
+        template="plotly_white",
+        hovermode="closest",
+        height=500,
+        margin=dict(l=40, r=40, t=60, b=20),
+    )
+
+    return fig
+
+
+def figure_suivi_forme(df_jours):
+    """
+    Graphique des moyennes journalières des cinq indicateurs de forme.
+    Au-delà de BUDGET_POINTS jours, les points sont des moyennes par semaine
+    ou par mois, les pointillés restant journaliers.
+
+    Args:
+        df_jours: agrégats journaliers (date, nb_suivis, fatigue, sommeil,
+            douleur, stress, humeur)
+    """
+    df_avg = df_jours[df_jours["nb_suivis"] > 0]
+
+    fig = go.Figure()
+
+    infos = {
+        "fatigue": "Fatigue",
+        "sommeil": "Sommeil",
+        "douleur": "Douleur",
+        "stress": "Stress",
+        "humeur": "Humeur",
+    }
+
+    Scatter = type_trace(len(df_avg))
+    pas = pas_agregation(df_avg["date"])
+    if pas is not None:
+        libelle, entete = PAS_AGREGATION[pas]
+        df_pts = regrouper(df_avg, list(infos), pas)
+
+    for key, label in infos.items():
+        fig.add_trace(Scatter(
+            x=df_avg["date"], y=df_avg[key],
+            mode="lines+markers" if pas is None else "lines",
+            line=dict(dash="dash", color=COULEURS_FORME[key]),
+            name=f"{label}",
+            legendgroup=key,
+            hoverinfo="skip"
+        ))
+        if pas is not None:
+            fig.add_trace(Scatter(
+                x=df_pts["date"], y=df_pts[key],
+                mode="markers",
+                marker=dict(color=COULEURS_FORME[key], size=8),
+                name=f"{label} moyen par {libelle}",
+                legendgroup=key,
+                showlegend=False,
+                customdata=df_pts["nb"],
+                hovertemplate=(
+                    f"<b>{entete}</b><br>"
+                    f"{label} moyen: %{{y:.1f}}<br>"
+                    "%{customdata} jour(s)<extra></extra>"
+                ),
+            ))
+
+    fig.update_layout(
+        xaxis=dict(title="Date"),
+        yaxis=dict(title="Score (1–5)", range=[0, 5.5]),
+        template="plotly_white",
+        hovermode="closest",
+        height=500,
+        margin=dict(l=40, r=40, t=60, b=20),
+        legend=dict(orientation="h", yanchor="bottom",
+                    y=1.02, xanchor="right", x=1),
+    )
+
+    return fig
@@ -0,0 +1,238 @@
+"""
+Instrumentation optionnelle des reruns Streamlit : chaque appel Supabase
+(requêtes et storage) et chaque section chronométrée de app.py sont
+enregistrés pour le rerun en cours.
+
+Activation :
+    SUIVI_INSTRUMENTATION=1                 active les mesures et le panneau de debug
+    SUIVI_INSTRUMENTATION_LOG=mesures.jsonl ajoute une ligne JSON par rerun
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+
+ACTIF = bool(os.getenv("SUIVI_INSTRUMENTATION"))
+FICHIER_LOG = os.getenv("SUIVI_INSTRUMENTATION_LOG")
+
+_courant = threading.local()
+_verrou_log = threading.Lock()
+
+
+class Mesures:
+    """Requêtes et sections enregistrées pendant un rerun."""
+
+    def __init__(self, page=None):
+        self.page = page
+        self.debut = time.perf_counter()
+        self.duree_ms = None
+        self.requetes = []
+        self.sections = []
+        self._verrou = threading.Lock()
+
+    def ajouter_requete(self, cible, operation, duree_ms, octets, lignes, erreur=None):
+        with self._verrou:
+            self.requetes.append({"cible": cible, "operation": operation,
+                                  "duree_ms": round(duree_ms, 2), "octets": octets,
+                                  "lignes": lignes, "erreur": erreur})
+
+    def ajouter_section(self, nom, duree_ms):
+        with self._verrou:
+            self.sections.append({"section": nom, "duree_ms": round(duree_ms, 2)})
+
+    def resume(self) -> dict:
+        return {
+            "horodatage": datetime.now(timezone.utc).isoformat(),
+            "page": self.page,
+            "duree_ms": self.duree_ms,
+            "nb_requetes": len(self.requetes),
+            "octets": sum(r["octets"] for r in self.requetes),
+            "latence_requetes_ms": round(sum(r["duree_ms"] for r in self.requetes), 2),
+            "requetes": self.requetes,
+            "sections": self.sections,
+        }
+
+
+def debut_rerun():
+    """Démarre la collecte pour le rerun exécuté sur ce thread (None si inactif)."""
+    _courant.mesures = Mesures() if ACTIF else None
+    return _courant.mesures
+
+
+def mesures_courantes():
+    return getattr(_courant, "mesures", None)
+
+
+@contextmanager
+def rattacher(mesures):
+    """Attribue au rerun `mesures` les appels faits depuis un autre thread."""
+    precedent = mesures_courantes()
+    _courant.mesures = mesures
+    try:
+        yield
+    finally:
+        _courant.mesures = precedent
+
+
+def fin_rerun(mesures, page=None):
+    """Clôt la collecte et l'écrit dans le journal JSON si demandé."""
+    if mesures is None:
+        return
+    mesures.page = page
+    mesures.duree_ms = round((time.perf_counter() - mesures.debut) * 1000, 2)
+    if FICHIER_LOG:
+        ligne = json.dumps(mesures.resume(), ensure_ascii=False, default=str)
+        with _verrou_log, open(FICHIER_LOG, "a", encoding="utf-8") as fh:
+            fh.write(ligne + "\n")
+
+
+@contextmanager
+def section(nom):
+    """Chronomètre un bloc de code pour le rerun en cours."""
+    mesures = mesures_courantes()
+    if mesures is None:
+        yield
+        return
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        mesures.ajouter_section(nom, (time.perf_counter() - debut) * 1000)
+
+
+def chronometre(nom):
+    """Décorateur équivalent à `with section(nom)` autour de la fonction."""
+    def decorateur(fonction):
+        @wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            with section(nom):
+                return fonction(*args, **kwargs)
+        return enveloppe
+    return decorateur
+
+
+def _taille(data) -> int:
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    try:
+        return len(json.dumps(data, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _mesurer(cible, operation, appel):
+    mesures = mesures_courantes()
+    if mesures is None:
+        return appel()
+    debut = time.perf_counter()
+    try:
+        res = appel()
+    except Exception as e:
+        mesures.ajouter_requete(cible, operation, (time.perf_counter() - debut) * 1000,
+                                0, 0, erreur=str(e))
+        raise
+    data = getattr(res, "data", res)
+    mesures.ajouter_requete(cible, operation, (time.perf_counter() - debut) * 1000,
+                            _taille(data), len(data) if isinstance(data, list) else None)
+    return res
+
+
+class _RequeteInstrumentee:
+    """Enveloppe d'un query builder : seul execute() est mesuré."""
+
+    OPERATIONS = ("select", "insert", "update", "upsert", "delete")
+
+    def __init__(self, builder, table, operation="select"):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+
+    def __getattr__(self, nom):
+        attr = getattr(self._builder, nom)
+        if not callable(attr):
+            # Propriétés qui renvoient un builder (ex. not_)
+            if hasattr(attr, "execute"):
+                return _RequeteInstrumentee(attr, self._table, self._operation)
+            return attr
+
+        def appel(*args, **kwargs):
+            res = attr(*args, **kwargs)
+            operation = nom if nom in self.OPERATIONS else self._operation
+            return _RequeteInstrumentee(res, self._table, operation)
+        return appel
+
+    def execute(self):
+        return _mesurer(self._table, self._operation, self._builder.execute)
+
+
+class _BucketInstrumente:
+    def __init__(self, bucket, nom):
+        self._bucket = bucket
+        self._cible = f"storage:{nom}"
+
+    def __getattr__(self, nom):
+        attr = getattr(self._bucket, nom)
+        if nom not in ("list", "download", "upload", "remove"):
+            return attr
+        return lambda *args, **kwargs: _mesurer(self._cible, nom,
+                                                lambda: attr(*args, **kwargs))
+
+
+class _StockageInstrumente:
+    def __init__(self, stockage):
+        self._stockage = stockage
+
+    def from_(self, bucket):
+        return _BucketInstrumente(self._stockage.from_(bucket), bucket)
+
+    def __getattr__(self, nom):
+        return getattr(self._stockage, nom)
+
+
+class ClientInstrumente:
+    """Enveloppe du client Supabase qui enregistre chaque aller-retour."""
+
+    def __init__(self, client):
+        self._client = client
+        self.storage = _StockageInstrumente(client.storage)
+
+    def table(self, nom):
+        return _RequeteInstrumentee(self._client.table(nom), nom)
+
+    def __getattr__(self, nom):
+        return getattr(self._client, nom)
+
+
+def afficher_panneau(mesures, connexions=None):
+    """
+    Panneau de debug repliable (réservé à l'administrateur).
+
+    `connexions` : compteurs HTTP du client Supabase pendant le rerun
+    (voir supabase_client.statistiques_connexions).
+    """
+    if mesures is None:
+        return
+    import streamlit as st
+    import pandas as pd
+
+    resume = mesures.resume()
+    with st.expander(f"🔧 Instrumentation : {resume['nb_requetes']} requête(s), "
+                     f"{resume['latence_requetes_ms']:.0f} ms réseau, "
+                     f"{resume['octets'] / 1024:.1f} Ko"):
+        st.caption("Durée du rerun jusqu'ici : "
+                   f"{(time.perf_counter() - mesures.debut) * 1000:.0f} ms")
+        if connexions:
+            st.caption(f"Connexions HTTP (tout le processus) : {connexions['requetes']} "
+                       f"requête(s), {connexions['connexions_ouvertes']} connexion(s) ouverte(s), "
+                       f"{connexions['connexions_reutilisees']} réutilisée(s), "
+                       f"{connexions['echecs']} échec(s), "
+                       f"{connexions['reprises']} nouvelle(s) tentative(s)")
+        if resume["requetes"]:
+            st.markdown("**Requêtes Supabase**")
+            st.dataframe(pd.DataFrame(resume["requetes"]), use_container_width=True)
+        if resume["sections"]:
+            st.markdown("**Sections**")
+            st.dataframe(pd.DataFrame(resume["sections"]), use_container_width=True)
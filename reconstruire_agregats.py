@@ -0,0 +1,47 @@
+"""
+Reconstruit la table agregats_journaliers à partir des tables activites et
+suivi_forme (voir donnees.reconstruire_agregats), par exemple après la
+création de la table, un import en masse ou une correction faite directement
+dans Supabase.
+
+    python reconstruire_agregats.py            # toutes les joueuses
+    python reconstruire_agregats.py 12 15      # seulement ces joueuses
+
+En mode hors ligne (SUPABASE_FAKE), --enregistrer réécrit le fichier
+SUPABASE_FAKE_DONNEES avec la table reconstruite.
+"""
+import argparse
+import json
+import os
+
+from supabase_client import supabase
+from donnees import reconstruire_agregats
+
+
+def identifiant(valeur: str):
+    return int(valeur) if valeur.isdigit() else valeur
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruit les agrégats journaliers.")
+    parser.add_argument("joueuses", nargs="*", type=identifiant,
+                        help="ids des joueuses à reconstruire (toutes par défaut)")
+    parser.add_argument("--enregistrer", action="store_true",
+                        help="mode hors ligne : réécrit le fichier SUPABASE_FAKE_DONNEES")
+    args = parser.parse_args()
+
+    chemin = os.getenv("SUPABASE_FAKE_DONNEES")
+    if args.enregistrer and not (os.getenv("SUPABASE_FAKE") and chemin):
+        parser.error("--enregistrer nécessite SUPABASE_FAKE et SUPABASE_FAKE_DONNEES")
+
+    n = reconstruire_agregats(args.joueuses or None)
+    print(f"{n} ligne(s) d'agrégats écrite(s).")
+
+    if args.enregistrer:
+        with open(chemin, "w", encoding="utf-8") as fh:
+            json.dump(supabase.tables, fh, ensure_ascii=False, indent=1)
+        print(f"Tables enregistrées dans {chemin}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+DataFrames typés des tables Supabase.
+
+Les lignes renvoyées par Supabase (listes de dicts, dates en chaînes ISO)
+sont converties une seule fois, à la lecture : notes sur int8, compteurs des
+agrégats sur int16, sport catégoriel, dates en datetime64 et textes libres
+en chaînes nullables. Les fonctions d'analyse et les graphiques reçoivent
+ces DataFrames sans avoir à reconvertir les dates.
+"""
+import pandas as pd
+
+DATE = "datetime64[ns]"
+# Notes des curseurs (1-10) et des indicateurs de forme (1-5)
+NOTE = "int8"
+COMPTEUR = "int16"
+TEXTE = "string"
+
+SCHEMAS = {
+    "activites": {
+        "date": DATE, "sport": "category", "duree": TEXTE,
+        "difficulte": NOTE, "plaisir": NOTE, "commentaire": TEXTE,
+    },
+    "suivi_forme": {
+        "date": DATE, "fatigue": NOTE, "sommeil": NOTE, "douleur": NOTE,
+        "stress": NOTE, "humeur": NOTE, "commentaire": TEXTE,
+    },
+    # Moyennes et charges restent en float64 (variance calculée à partir des carrés)
+    "agregats_journaliers": {
+        "date": DATE, "nb_seances": COMPTEUR, "nb_suivis": COMPTEUR,
+        "nb_durees_inconnues": COMPTEUR,
+    },
+}
+
+# Équivalent nullable des entiers, pour une colonne où une valeur manque
+NULLABLES = {NOTE: "Int8", COMPTEUR: "Int16"}
+
+
+def convertir(serie: pd.Series, type_: str) -> pd.Series:
+    """Convertit une colonne brute vers `type_` (voir SCHEMAS)."""
+    if type_ == DATE:
+        return pd.to_datetime(serie, format="ISO8601")
+    if type_ in NULLABLES:
+        valeurs = pd.to_numeric(serie)
+        return valeurs.astype(NULLABLES[type_] if valeurs.isna().any() else type_)
+    return serie.astype(type_)
+
+
+def dataframe(table: str, lignes, colonnes=None) -> pd.DataFrame:
+    """
+    DataFrame typé des `lignes` d'une table (les colonnes hors schéma, comme
+    les ids, sont laissées telles quelles).
+
+    Args:
+        table: "activites", "suivi_forme" ou "agregats_journaliers"
+        lignes: résultat d'une requête Supabase (liste de dicts)
+        colonnes: colonnes du DataFrame, même s'il est vide (facultatif)
+
+    Returns:
+        DataFrame
+    """
+    df = pd.DataFrame(lignes, columns=colonnes)
+    for colonne, type_ in SCHEMAS[table].items():
+        if colonne in df.columns:
+            df[colonne] = convertir(df[colonne], type_)
+    return df
@@ -1,8 +1,200 @@
-from supabase import create_client, Client
+"""
+Client Supabase partagé par tout le processus (st.cache_resource) : une
+seule réserve de connexions HTTP, réutilisées d'une requête et d'une session
+à l'autre, y compris si Streamlit réimporte ce module.
+
+Réglages (variables d'environnement, valeurs par défaut entre parenthèses) :
+    SUPABASE_CONNEXIONS_MAX (10)        connexions simultanées au plus
+    SUPABASE_KEEPALIVE_MAX (5)          connexions inactives gardées ouvertes
+    SUPABASE_KEEPALIVE_S (60)           durée de vie d'une connexion inactive
+    SUPABASE_TIMEOUT_CONNEXION_S (5)    établissement de la connexion
+    SUPABASE_TIMEOUT_S (30)             lecture, écriture et attente d'une connexion libre
+    SUPABASE_TENTATIVES (3)             essais d'une lecture (GET) en cas d'erreur réseau ou 5xx
+    SUPABASE_ATTENTE_S (0.2)            attente de base entre deux essais (exponentielle, aléatoire)
+"""
 import os
+import random
+import threading
+import time
 
+import streamlit as st
 
 url = os.getenv("SUPABASE_URL")
 key = os.getenv("SUPABASE_KEY")
 
-supabase: Client = create_client(url, key)
+CONNEXIONS_MAX = int(os.getenv("SUPABASE_CONNEXIONS_MAX", 10))
+KEEPALIVE_MAX = int(os.getenv("SUPABASE_KEEPALIVE_MAX", 5))
+KEEPALIVE_S = float(os.getenv("SUPABASE_KEEPALIVE_S", 60))
+TIMEOUT_CONNEXION_S = float(os.getenv("SUPABASE_TIMEOUT_CONNEXION_S", 5))
+TIMEOUT_S = float(os.getenv("SUPABASE_TIMEOUT_S", 30))
+TENTATIVES = int(os.getenv("SUPABASE_TENTATIVES", 3))
+ATTENTE_S = float(os.getenv("SUPABASE_ATTENTE_S", 0.2))
+
+# Seules les lectures sont rejouées : une écriture pourrait être appliquée deux fois
+METHODES_IDEMPOTENTES = {"GET", "HEAD", "OPTIONS"}
+STATUTS_A_REESSAYER = {429, 502, 503, 504}
+
+
+class CompteursConnexions:
+    """
+    Requêtes HTTP envoyées et connexions ouvertes pour elles, par processus.
+
+    Un essai est compté comme réutilisant une connexion s'il a reçu une
+    réponse sans qu'une connexion soit établie pour lui ; un essai terminé
+    par une erreur réseau est compté à part (echecs).
+    """
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self.requetes = 0
+        self.ouvertes = 0
+        self.reutilisees = 0
+        self.echecs = 0
+        self.reprises = 0
+
+    def ajouter(self, requetes=0, ouvertes=0, reutilisees=0, echecs=0, reprises=0):
+        with self._verrou:
+            self.requetes += requetes
+            self.ouvertes += ouvertes
+            self.reutilisees += reutilisees
+            self.echecs += echecs
+            self.reprises += reprises
+
+    def resume(self) -> dict:
+        with self._verrou:
+            return {"requetes": self.requetes, "connexions_ouvertes": self.ouvertes,
+                    "connexions_reutilisees": self.reutilisees,
+                    "echecs": self.echecs, "reprises": self.reprises}
+
+
+def _transport(compteurs):
+    """
+    Transport httpx commun à PostgREST et au storage (même hôte) : réserve de
+    connexions bornée, comptage des connexions ouvertes et nouvelles
+    tentatives des lectures, avec une attente exponentielle aléatoire
+    (« full jitter ») pour ne pas relancer toutes les sessions en même temps.
+
+    Args:
+        compteurs: CompteursConnexions mis à jour à chaque requête
+    """
+    import httpx
+
+    class TransportSupabase(httpx.HTTPTransport):
+
+        def handle_request(self, request):
+            suivant = request.extensions.get("trace")
+            # Connexion établie pendant l'essai en cours
+            connexion = [False]
+
+            def tracer(evenement, infos):
+                # Émis par httpcore uniquement quand une nouvelle connexion est établie
+                if evenement == "connection.connect_tcp.complete":
+                    compteurs.ajouter(ouvertes=1)
+                    connexion[0] = True
+                if suivant is not None:
+                    suivant(evenement, infos)
+
+            request.extensions = {**request.extensions, "trace": tracer}
+            essais = TENTATIVES if request.method in METHODES_IDEMPOTENTES else 1
+            for essai in range(essais):
+                if essai:
+                    time.sleep(random.uniform(0, ATTENTE_S * 2 ** essai))
+                    compteurs.ajouter(reprises=1)
+                compteurs.ajouter(requetes=1)
+                connexion[0] = False
+                try:
+                    reponse = super().handle_request(request)
+                except httpx.TransportError:
+                    compteurs.ajouter(echecs=1)
+                    if essai == essais - 1:
+                        raise
+                    continue
+                if not connexion[0]:
+                    compteurs.ajouter(reutilisees=1)
+                if reponse.status_code in STATUTS_A_REESSAYER and essai < essais - 1:
+                    # Corps lu entièrement : la connexion retourne dans la réserve
+                    reponse.read()
+                    reponse.close()
+                    continue
+                return reponse
+
+    return TransportSupabase(
+        http2=True,
+        limits=httpx.Limits(max_connections=CONNEXIONS_MAX,
+                            max_keepalive_connections=KEEPALIVE_MAX,
+                            keepalive_expiry=KEEPALIVE_S),
+    )
+
+
+def _client_supabase():
+    """
+    Client supabase-py dont PostgREST et le storage passent par _transport() ;
+    ses compteurs de connexions sont dans l'attribut `compteurs`.
+    """
+    import httpx
+    from postgrest import SyncPostgrestClient
+    from postgrest.utils import SyncClient
+    from storage3 import SyncStorageClient
+    from supabase import Client, ClientOptions
+
+    compteurs = CompteursConnexions()
+    transport = _transport(compteurs)
+
+    def session(base_url, headers, timeout, verify=True):
+        # Mêmes options que supabase-py, avec la réserve de connexions partagée
+        return SyncClient(base_url=base_url, headers=headers, timeout=timeout,
+                          verify=verify, follow_redirects=True, transport=transport)
+
+    class Postgrest(SyncPostgrestClient):
+        def create_session(self, base_url, headers, timeout, verify=True):
+            return session(base_url, headers, timeout, verify)
+
+    class Stockage(SyncStorageClient):
+        def _create_session(self, base_url, headers, timeout, verify=True):
+            return session(base_url, headers, timeout, verify)
+
+    class ClientPartage(Client):
+        @staticmethod
+        def _init_postgrest_client(rest_url, headers, schema, timeout):
+            return Postgrest(rest_url, headers=headers, schema=schema, timeout=timeout)
+
+        @staticmethod
+        def _init_storage_client(storage_url, headers, storage_client_timeout):
+            return Stockage(storage_url, headers, storage_client_timeout)
+
+    timeout = httpx.Timeout(TIMEOUT_S, connect=TIMEOUT_CONNEXION_S)
+    client = ClientPartage(url, key, options=ClientOptions(postgrest_client_timeout=timeout,
+                                                           storage_client_timeout=timeout))
+    client.compteurs = compteurs
+    return client
+
+
+@st.cache_resource(show_spinner=False)
+def obtenir_client():
+    """Client Supabase du processus, créé au premier appel."""
+    if os.getenv("SUPABASE_FAKE"):
+        # Substitut local (tests de performance hors ligne), voir supabase_fake.py
+        from supabase_fake import FakeClient
+        client = FakeClient.depuis_env()
+    else:
+        client = _client_supabase()
+
+    if os.getenv("SUIVI_INSTRUMENTATION"):
+        # Mesure de chaque aller-retour (panneau de debug, voir instrumentation.py)
+        from instrumentation import ClientInstrumente
+        client = ClientInstrumente(client)
+    return client
+
+
+supabase = obtenir_client()
+
+
+def statistiques_connexions() -> dict:
+    """
+    Compteurs HTTP du client partagé depuis le démarrage du processus :
+    requêtes (nouvelles tentatives comprises), connexions ouvertes et
+    réutilisées, essais en erreur réseau, nouvelles tentatives. Vide en mode
+    hors ligne.
+    """
+    compteurs = getattr(supabase, "compteurs", None)
+    return compteurs.resume() if compteurs is not None else {}
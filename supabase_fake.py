@@ -0,0 +1,295 @@
+"""
+Substitut local du client Supabase, pour exécuter et chronométrer l'app et la
+synchronisation des billets sans le projet en ligne.
+
+Il implémente le sous-ensemble du query builder utilisé dans le code
+(table().select().eq().gte().lte().in_().order().limit().range().insert().upsert()
+.update().delete().execute(), et storage.from_().list()/download()/get_public_url()/upload()),
+avec une latence configurable par appel et un compteur d'allers-retours.
+
+Activation par variables d'environnement (voir supabase_client.py) :
+    SUPABASE_FAKE=1                  utilise ce substitut
+    SUPABASE_FAKE_DONNEES=seed.json  tables initiales {"table": [lignes, ...]}
+    SUPABASE_FAKE_STOCKAGE=dossier   un sous-dossier par bucket, un fichier par objet
+    SUPABASE_FAKE_LATENCE_MS=40      latence ajoutée à chaque aller-retour
+"""
+import copy
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+
+class Reponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class Requete:
+    """Requête sur une table, construite par chaînage puis exécutée par execute()."""
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.operation = "select"
+        self.colonnes = "*"
+        self.filtres = []
+        self.tri = []
+        self.limite = None
+        self.decalage = 0
+        self.donnees = None
+
+    # --- Opérations ---
+    def select(self, colonnes="*", count=None):
+        self.operation = "select"
+        self.colonnes = colonnes
+        return self
+
+    def insert(self, donnees):
+        self.operation = "insert"
+        self.donnees = donnees
+        return self
+
+    def upsert(self, donnees, on_conflict=""):
+        self.operation = "upsert"
+        self.donnees = donnees
+        self.cles_conflit = [c.strip() for c in on_conflict.split(",") if c.strip()] or ["id"]
+        return self
+
+    def update(self, donnees):
+        self.operation = "update"
+        self.donnees = donnees
+        return self
+
+    def delete(self):
+        self.operation = "delete"
+        return self
+
+    # --- Filtres ---
+    def eq(self, colonne, valeur):
+        self.filtres.append(lambda r: r.get(colonne) == valeur)
+        return self
+
+    def neq(self, colonne, valeur):
+        self.filtres.append(lambda r: r.get(colonne) != valeur)
+        return self
+
+    def gte(self, colonne, valeur):
+        self.filtres.append(lambda r: r.get(colonne) is not None and r.get(colonne) >= valeur)
+        return self
+
+    def lte(self, colonne, valeur):
+        self.filtres.append(lambda r: r.get(colonne) is not None and r.get(colonne) <= valeur)
+        return self
+
+    def in_(self, colonne, valeurs):
+        valeurs = list(valeurs)
+        self.filtres.append(lambda r: r.get(colonne) in valeurs)
+        return self
+
+    def order(self, colonne, desc=False):
+        self.tri.append((colonne, desc))
+        return self
+
+    def limit(self, n):
+        self.limite = n
+        return self
+
+    def range(self, debut, fin):
+        # Bornes incluses, comme le header Range de PostgREST
+        self.decalage = debut
+        self.limite = fin - debut + 1
+        return self
+
+    # --- Exécution ---
+    def _projeter(self, lignes):
+        if self.colonnes.strip() == "*":
+            return lignes
+        colonnes = [c.strip() for c in self.colonnes.split(",")]
+        return [{c: l.get(c) for c in colonnes} for l in lignes]
+
+    def execute(self):
+        self.client._aller_retour(self.table, self.operation)
+        with self.client._verrou:
+            lignes = self.client.tables.setdefault(self.table, [])
+
+            if self.operation == "insert":
+                nouvelles = self.donnees if isinstance(self.donnees, list) else [self.donnees]
+                ids = self.client._nouveaux_ids(lignes)
+                ajoutees = []
+                for d in nouvelles:
+                    ligne = {"id": next(ids),
+                             "created_at": datetime.now(timezone.utc).isoformat(),
+                             **d}
+                    lignes.append(ligne)
+                    ajoutees.append(ligne)
+                return Reponse(copy.deepcopy(ajoutees))
+
+            if self.operation == "upsert":
+                nouvelles = self.donnees if isinstance(self.donnees, list) else [self.donnees]
+                index = {tuple(l.get(c) for c in self.cles_conflit): l for l in lignes}
+                ids = self.client._nouveaux_ids(lignes)
+                ecrites = []
+                for d in nouvelles:
+                    ligne = index.get(tuple(d.get(c) for c in self.cles_conflit))
+                    if ligne is None:
+                        # Colonnes absentes : valeur par défaut de la table
+                        ligne = {"id": next(ids),
+                                 "created_at": datetime.now(timezone.utc).isoformat()}
+                        lignes.append(ligne)
+                        index[tuple(d.get(c) for c in self.cles_conflit)] = ligne
+                    # Comme merge-duplicates : seules les colonnes envoyées sont modifiées
+                    ligne.update(d)
+                    ecrites.append(ligne)
+                return Reponse(copy.deepcopy(ecrites))
+
+            selection = [l for l in lignes if all(f(l) for f in self.filtres)]
+
+            if self.operation == "delete":
+                ids = {id(l) for l in selection}
+                lignes[:] = [l for l in lignes if id(l) not in ids]
+                return Reponse(copy.deepcopy(selection))
+
+            if self.operation == "update":
+                for l in selection:
+                    l.update(self.donnees)
+                return Reponse(copy.deepcopy(selection))
+
+            for colonne, desc in reversed(self.tri):
+                selection.sort(key=lambda l: (l.get(colonne) is None, l.get(colonne)),
+                               reverse=desc)
+            selection = selection[self.decalage:]
+            if self.limite is not None:
+                selection = selection[:self.limite]
+            resultat = copy.deepcopy(self._projeter(selection))
+            return Reponse(resultat, count=len(resultat))
+
+
+class Bucket:
+    def __init__(self, client, nom):
+        self.client = client
+        self.nom = nom
+
+    def _objets(self):
+        return self.client.fichiers.setdefault(self.nom, {})
+
+    def list(self, path=None, options=None):
+        self.client._aller_retour(f"storage:{self.nom}", "list")
+        with self.client._verrou:
+            return [
+                {
+                    "name": nom,
+                    "id": hashlib.md5(f"{self.nom}/{nom}".encode()).hexdigest(),
+                    "updated_at": maj,
+                    "metadata": {"size": len(contenu),
+                                 "eTag": f'"{hashlib.md5(contenu).hexdigest()}"',
+                                 "mimetype": "application/pdf"},
+                }
+                for nom, (contenu, maj) in sorted(self._objets().items())
+            ]
+
+    def download(self, path):
+        self.client._aller_retour(f"storage:{self.nom}", "download")
+        with self.client._verrou:
+            return self._objets()[path][0]
+
+    def upload(self, path, file, file_options=None):
+        self.client._aller_retour(f"storage:{self.nom}", "upload")
+        with self.client._verrou:
+            self._objets()[path] = (bytes(file), datetime.now(timezone.utc).isoformat())
+
+    def remove(self, paths):
+        self.client._aller_retour(f"storage:{self.nom}", "remove")
+        with self.client._verrou:
+            for p in paths:
+                self._objets().pop(p, None)
+
+    def get_public_url(self, path):
+        # Calculée localement par le vrai client : pas d'aller-retour
+        return f"http://supabase.local/storage/v1/object/public/{self.nom}/{path}"
+
+
+class Stockage:
+    def __init__(self, client):
+        self.client = client
+
+    def from_(self, bucket):
+        return Bucket(self.client, bucket)
+
+
+class FakeClient:
+    """
+    Client Supabase en mémoire.
+
+    Args:
+        tables: {"table": [lignes]} initial
+        fichiers: {"bucket": {"nom": bytes}} initial
+        latence_ms: latence simulée ajoutée à chaque aller-retour
+    """
+
+    def __init__(self, tables=None, fichiers=None, latence_ms=0):
+        self.tables = copy.deepcopy(tables) if tables else {}
+        maintenant = datetime.now(timezone.utc).isoformat()
+        self.fichiers = {
+            bucket: {nom: (contenu, maintenant) for nom, contenu in objets.items()}
+            for bucket, objets in (fichiers or {}).items()
+        }
+        self.latence_ms = latence_ms
+        self.storage = Stockage(self)
+        self.compteur = Counter()
+        self._verrou = threading.RLock()
+
+    @classmethod
+    def depuis_env(cls):
+        """Construit le client à partir des variables SUPABASE_FAKE_*."""
+        tables = {}
+        chemin = os.getenv("SUPABASE_FAKE_DONNEES")
+        if chemin:
+            with open(chemin, encoding="utf-8") as fh:
+                tables = json.load(fh)
+
+        fichiers = {}
+        dossier = os.getenv("SUPABASE_FAKE_STOCKAGE")
+        if dossier:
+            for bucket in sorted(os.listdir(dossier)):
+                chemin_bucket = os.path.join(dossier, bucket)
+                if not os.path.isdir(chemin_bucket):
+                    continue
+                fichiers[bucket] = {}
+                for nom in sorted(os.listdir(chemin_bucket)):
+                    with open(os.path.join(chemin_bucket, nom), "rb") as fh:
+                        fichiers[bucket][nom] = fh.read()
+
+        return cls(tables, fichiers, float(os.getenv("SUPABASE_FAKE_LATENCE_MS", 0)))
+
+    def table(self, nom):
+        return Requete(self, nom)
+
+    @staticmethod
+    def _nouveaux_ids(lignes):
+        """Ids des lignes insérées : comme une colonne bigserial, ou uuid si la
+        table a déjà des ids non entiers."""
+        ids = [l.get("id") for l in lignes]
+        if all(isinstance(i, int) for i in ids):
+            return itertools.count(max(ids, default=0) + 1)
+        return (str(uuid.uuid4()) for _ in itertools.count())
+
+    def _aller_retour(self, cible, operation):
+        with self._verrou:
+            self.compteur[(cible, operation)] += 1
+        if self.latence_ms:
+            time.sleep(self.latence_ms / 1000)
+
+    @property
+    def nb_requetes(self):
+        return sum(self.compteur.values())
+
+    def reinitialiser_compteur(self):
+        with self._verrou:
+            self.compteur.clear()
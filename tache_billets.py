@@ -0,0 +1,184 @@
+"""
+Synchronisation des billets (update_billets_from_storage) en tâche de fond.
+
+Une seule synchronisation à la fois : un verrou de fichier (BILLETS_VERROU)
+est pris pour toute la durée d'une exécution, qu'elle soit lancée depuis
+l'app ou depuis la ligne de commande (cron) :
+
+    python tache_billets.py
+    python tache_billets.py --complet      # réexamine aussi les fichiers connus
+
+Code de sortie 0 si la synchronisation s'est terminée, 1 si elle a échoué,
+2 si une autre synchronisation était déjà en cours.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:  # Windows : seul le verrou du processus s'applique
+    fcntl = None
+
+VERROU_BILLETS = os.getenv("BILLETS_VERROU", ".billets_synchro.lock")
+# Nombre de fichiers récents conservés pour l'affichage de la progression
+TAILLE_JOURNAL = 8
+
+# Statuts de fichier regroupés dans les compteurs affichés
+ATTRIBUES = ("ajoute", "mis_a_jour", "existant", "doublon")
+
+
+class TacheBillets:
+    """
+    État partagé de la synchronisation des billets d'un processus.
+
+    lancer() démarre une exécution dans un thread indépendant du rerun
+    Streamlit (un rafraîchissement du navigateur ne l'interrompt pas) ;
+    executer() l'exécute sur le thread appelant. etat() renvoie une copie de
+    la progression, lisible depuis n'importe quel thread.
+    """
+
+    def __init__(self, chemin_verrou=VERROU_BILLETS):
+        self.chemin_verrou = chemin_verrou
+        # Le premier est tenu pendant toute une exécution, le second protège l'état
+        self._verrou = threading.Lock()
+        self._verrou_etat = threading.Lock()
+        self._fichier_verrou = None
+        self._etat = {"statut": "inactive"}
+
+    def _acquerir(self) -> bool:
+        """Prend le verrou du processus puis celui du fichier (sans attendre)."""
+        if not self._verrou.acquire(blocking=False):
+            return False
+        if fcntl is None:
+            return True
+        fichier = open(self.chemin_verrou, "a")
+        try:
+            fcntl.flock(fichier, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            # Synchronisation en cours dans un autre processus (cron, autre instance)
+            fichier.close()
+            self._verrou.release()
+            return False
+        self._fichier_verrou = fichier
+        return True
+
+    def _liberer(self):
+        if self._fichier_verrou is not None:
+            self._fichier_verrou.close()
+            self._fichier_verrou = None
+        self._verrou.release()
+
+    def en_cours(self) -> bool:
+        return self._etat["statut"] == "en_cours"
+
+    def etat(self) -> dict:
+        with self._verrou_etat:
+            etat = dict(self._etat)
+            if "journal" in etat:
+                etat["journal"] = list(etat["journal"])
+            return etat
+
+    def _progression(self, filename, statut, rapport):
+        with self._verrou_etat:
+            etat = self._etat
+            etat["a_traiter"] = rapport["a_traiter"]
+            etat["ignores"] = rapport["ignores"]
+            if filename is None:
+                return
+            etat["traites"] += 1
+            if statut in ATTRIBUES:
+                etat["attribues"] += 1
+            elif statut == "sans_correspondance":
+                etat["sans_correspondance"] += 1
+            else:
+                etat["erreurs"] += 1
+            etat["journal"].append((filename, statut))
+
+    def _executer(self, a_la_fin=None, **options):
+        from update_billets_from_storage import update_billets_from_storage
+
+        try:
+            rapport = update_billets_from_storage(progression=self._progression, **options)
+            statut, erreur = "terminee", None
+        except Exception as e:
+            traceback.print_exc()
+            rapport, statut, erreur = None, "echec", str(e)
+        with self._verrou_etat:
+            self._etat.update(statut=statut, fin=time.time(), rapport=rapport, erreur=erreur)
+        try:
+            if a_la_fin is not None:
+                a_la_fin()
+        finally:
+            self._liberer()
+        return statut == "terminee"
+
+    def _demarrer(self) -> bool:
+        if not self._acquerir():
+            return False
+        with self._verrou_etat:
+            self._etat = {"statut": "en_cours", "debut": time.time(), "fin": None,
+                          "a_traiter": None, "traites": 0, "ignores": 0, "attribues": 0,
+                          "sans_correspondance": 0, "erreurs": 0,
+                          "journal": deque(maxlen=TAILLE_JOURNAL),
+                          "rapport": None, "erreur": None}
+        return True
+
+    def lancer(self, a_la_fin=None, **options) -> bool:
+        """
+        Démarre une synchronisation en arrière-plan.
+
+        Args:
+            a_la_fin: fonction appelée une fois la synchronisation finie
+                (par exemple pour vider le cache des billets de l'app)
+            **options: arguments de update_billets_from_storage
+
+        Returns:
+            bool: False si une synchronisation est déjà en cours
+        """
+        if not self._demarrer():
+            return False
+        threading.Thread(target=self._executer, args=(a_la_fin,), kwargs=options,
+                         name="synchro-billets", daemon=True).start()
+        return True
+
+    def executer(self, **options):
+        """
+        Synchronisation sur le thread appelant (ligne de commande).
+
+        Returns:
+            bool | None: True si terminée, False si échouée, None si une autre
+                synchronisation était déjà en cours
+        """
+        if not self._demarrer():
+            return None
+        return self._executer(**options)
+
+
+# Une seule tâche par processus, partagée par toutes les sessions Streamlit
+tache_billets = TacheBillets()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synchronise les billets du bucket Supabase.")
+    parser.add_argument("--bucket", default="Billets")
+    parser.add_argument("--seuil", type=int, default=70,
+                        help="score minimal de correspondance d'un nom")
+    parser.add_argument("--complet", action="store_true",
+                        help="réexamine aussi les fichiers inchangés depuis le dernier passage")
+    args = parser.parse_args()
+
+    resultat = tache_billets.executer(bucket_name=args.bucket, score_threshold=args.seuil,
+                                      incremental=not args.complet)
+    if resultat is None:
+        print("Une synchronisation des billets est déjà en cours.", file=sys.stderr)
+        return 2
+    return 0 if resultat else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
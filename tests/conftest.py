@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Modules de l'app importables depuis les tests, avec le substitut local de Supabase
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUPABASE_FAKE", "1")
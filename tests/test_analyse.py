@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyse import (compute_charge, normalize_charge, compute_charge_batch,
+                     charge_seance_batch, duree_en_minutes, durees_non_reconnues,
+                     correlation_difficulte_plaisir, correlations_equipe, INDICATEURS_FORME)
+
+INDICATEURS = list(INDICATEURS_FORME)
+
+
+def suivis_aleatoires(n, graine, colonnes=INDICATEURS, taux_nan=0.0):
+    rng = np.random.default_rng(graine)
+    df = pd.DataFrame({c: rng.integers(1, 6, n).astype(float) for c in colonnes})
+    if taux_nan:
+        df = df.mask(rng.random(df.shape) < taux_nan)
+    df.insert(0, "joueuse_id", rng.integers(1, 5, n))
+    df.insert(1, "date", pd.date_range("2025-09-01", periods=n).date)
+    return df
+
+
+def attendu_par_ligne(df):
+    charge = df.apply(compute_charge, axis=1).astype(float)
+    return charge, normalize_charge(charge)
+
+
+@pytest.mark.parametrize("graine", range(5))
+def test_charge_batch_identique_au_calcul_par_ligne(graine):
+    df = suivis_aleatoires(200, graine)
+    res = compute_charge_batch(df)
+    charge, charge_norm = attendu_par_ligne(df)
+    np.testing.assert_allclose(res["charge"], charge)
+    np.testing.assert_allclose(res["charge_norm"], charge_norm)
+    assert list(res.columns) == ["joueuse_id", "date", "charge", "charge_norm"]
+    assert res.index.equals(df.index)
+
+
+@pytest.mark.parametrize("absentes", [["fatigue"], ["sommeil", "humeur"], INDICATEURS])
+def test_charge_batch_colonnes_manquantes(absentes):
+    # Un indicateur absent vaut 3, comme row.get(..., 3)
+    df = suivis_aleatoires(50, 1, [c for c in INDICATEURS if c not in absentes])
+    res = compute_charge_batch(df)
+    charge, charge_norm = attendu_par_ligne(df)
+    np.testing.assert_allclose(res["charge"], charge)
+    np.testing.assert_allclose(res["charge_norm"], charge_norm)
+
+
+def test_charge_batch_valeurs_manquantes():
+    df = suivis_aleatoires(100, 2, taux_nan=0.1)
+    res = compute_charge_batch(df)
+    charge, charge_norm = attendu_par_ligne(df)
+    np.testing.assert_allclose(res["charge"], charge, equal_nan=True)
+    np.testing.assert_allclose(res["charge_norm"], charge_norm, equal_nan=True)
+
+
+def test_charge_batch_types_compacts():
+    # int8 et Int8 nullable (voir schemas.py) donnent les mêmes valeurs
+    df = suivis_aleatoires(100, 3, taux_nan=0.05)
+    compact = df.astype({c: "Int8" for c in INDICATEURS})
+    pd.testing.assert_frame_equal(compute_charge_batch(compact), compute_charge_batch(df))
+
+
+def test_charge_batch_vide():
+    res = compute_charge_batch(pd.DataFrame(columns=["joueuse_id", "date", *INDICATEURS]))
+    assert res.empty
+    assert list(res.columns) == ["joueuse_id", "date", "charge", "charge_norm"]
+    assert compute_charge_batch(pd.DataFrame()).empty
+
+
+@pytest.mark.parametrize("duree, minutes", [
+    ("1h", 60), ("45 min", 45), ("1h30", 90), ("1 h 15", 75), ("20'", 20), ("1:30", 90),
+    ("1,5 h", 90), ("2 heures", 120), (" 45 MIN. ", 45),
+    # Nombre seul : en heures jusqu'à MAX_HEURES_SANS_UNITE, en minutes au-delà
+    ("1", 60), ("4", 240), ("1,5", 90), ("5", 5), ("90", 90),
+])
+def test_duree_en_minutes(duree, minutes):
+    assert duree_en_minutes(pd.Series([duree])).tolist() == [minutes]
+
+
+def test_charge_seance_durees_manquantes():
+    df = pd.DataFrame({
+        "duree": ["1h", None, np.nan, "", "45 min", "beaucoup", "1h30", "90", "h", "1:3"],
+        "difficulte": [5, 6, 7, 8, 4, 3, None, 2, 5, 5],
+    })
+    res = charge_seance_batch(df)
+    minutes = [60, np.nan, np.nan, np.nan, 45, np.nan, 90, 90, np.nan, np.nan]
+    np.testing.assert_array_equal(res["minutes"], minutes)
+    np.testing.assert_array_equal(res["charge_seance"],
+                                  [300, np.nan, np.nan, np.nan, 180, np.nan, np.nan, 180,
+                                   np.nan, np.nan])
+    assert durees_non_reconnues(df["duree"]) == ["1:3", "beaucoup", "h"]
+    assert charge_seance_batch(df.iloc[:0]).empty
+
+
+def correlation_par_masque(df_activites):
+    """Implémentation d'origine : un masque et un Series.corr par sport."""
+    res = {"correlation_globale": None, "correlation_par_sport": {}}
+    if df_activites.empty:
+        return res
+    if 'difficulte' not in df_activites.columns or 'plaisir' not in df_activites.columns:
+        return res
+
+    def formater(corr):
+        if pd.notna(corr) and not np.isnan(corr) and not np.isinf(corr):
+            return round(float(corr), 2)
+        return "Données insuffisantes"
+
+    if len(df_activites) < 2:
+        res["correlation_globale"] = "Données insuffisantes"
+    else:
+        res["correlation_globale"] = formater(df_activites['difficulte'].corr(df_activites['plaisir']))
+
+    if 'sport' in df_activites.columns:
+        for sport in df_activites['sport'].unique():
+            if pd.isna(sport):
+                continue
+            df_sport = df_activites[df_activites['sport'] == sport]
+            if len(df_sport) < 2:
+                res["correlation_par_sport"][sport] = "Données insuffisantes"
+                continue
+            res["correlation_par_sport"][sport] = formater(df_sport['difficulte'].corr(df_sport['plaisir']))
+    return res
+
+
+def activites_aleatoires(n, graine, n_joueuses, note_max):
+    # Notes entières et petits groupes : beaucoup de corrélations rationnelles
+    # simples (-0,625...), à la limite d'un arrondi à 2 décimales
+    rng = np.random.default_rng(graine)
+    df = pd.DataFrame({
+        "joueuse_id": rng.integers(1, n_joueuses + 1, n),
+        "sport": rng.choice(["Course", "Vélo", "Natation", "Muscu", None], n),
+        "difficulte": rng.integers(1, note_max + 1, n).astype(float),
+        "plaisir": rng.integers(1, note_max + 1, n).astype(float),
+    })
+    for col in ("difficulte", "plaisir"):
+        df.loc[rng.random(n) < 0.05, col] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("graine", range(200))
+def test_correlations_identiques_au_calcul_par_masque(graine):
+    rng = np.random.default_rng(graine)
+    df = activites_aleatoires(int(rng.integers(1, 250)), graine, int(rng.integers(1, 12)),
+                              int(rng.choice([4, 5, 10])))
+    assert correlation_difficulte_plaisir(df) == correlation_par_masque(df)
+
+    # Par joueuse : comme l'appel d'origine sur les activités de chaque joueuse
+    res = correlations_equipe(df)
+    for joueuse_id, df_joueuse in df.groupby("joueuse_id"):
+        attendu = correlation_par_masque(df_joueuse)
+        assert res["correlation_par_joueuse"][joueuse_id] == attendu["correlation_globale"]
+        assert {s: c for (j, s), c in res["correlation_par_joueuse_sport"].items()
+                if j == joueuse_id} == attendu["correlation_par_sport"]
+
+
+def test_correlation_a_la_limite_d_un_arrondi():
+    # r = -0,625 exactement : Series.corr donne -0.6250000000000001 (arrondi -0,63),
+    # les sommes par np.bincount -0.625 (arrondi -0,62)
+    df = pd.DataFrame({"joueuse_id": 1, "sport": "Course",
+                       "difficulte": [9.0, 8, 5, 3, 5], "plaisir": [3.0, 7, 7, 9, 4]})
+    assert correlation_par_masque(df)["correlation_globale"] == -0.63
+    assert correlation_difficulte_plaisir(df) == correlation_par_masque(df)
+    res = correlations_equipe(df)
+    assert res["correlation_par_joueuse"] == {1: -0.63}
+    assert res["correlation_par_joueuse_sport"] == {(1, "Course"): -0.63}
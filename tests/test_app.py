@@ -0,0 +1,59 @@
+import os
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import donnees
+from benchmarks.generateur import generer_equipe
+from supabase_fake import FakeClient
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    equipe = generer_equipe(2, 1, n_staff=1, graine=0)
+    client = FakeClient({t: equipe[t] for t in ("joueuses", "staff", "activites", "suivi_forme",
+                                                "agregats_journaliers", "billets")})
+    monkeypatch.setattr(donnees, "supabase", client)
+    st.cache_data.clear()
+    return client
+
+
+def page_joueuse(client, choix):
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.session_state.user = client.tables["joueuses"][0]
+    at.session_state.type_user = "joueuse"
+    at.run()
+    at.radio[0].set_value(choix).run()
+    assert not at.exception, at.exception
+    return at
+
+
+def legende_page(at):
+    return next(c.value for c in at.caption if c.value.startswith("Page"))
+
+
+@pytest.mark.parametrize("choix", ["Suivi sportif", "Suivi de forme quotidienne"])
+def test_erreur_de_lecture_de_l_historique_affichee(client, monkeypatch, choix):
+    def en_panne(*args):
+        raise RuntimeError("historique indisponible")
+
+    monkeypatch.setattr(donnees, "charger_page_historique", en_panne)
+    at = page_joueuse(client, choix)
+    assert "Erreur lors du chargement : historique indisponible" in [e.value for e in at.error]
+    # Le graphique de la période reste affiché
+    assert at.get("plotly_chart")
+
+
+def test_page_ramenee_a_la_derniere(client):
+    at = page_joueuse(client, "Suivi sportif")
+    at.radio[1].set_value("Tout l'historique").run()
+    nb_pages = int(legende_page(at).split(" / ")[1].split()[0])
+    # Page au-delà de la dernière (période raccourcie depuis le rerun précédent)
+    at.session_state[f"page_sport_{client.tables['joueuses'][0]['id']}"] = nb_pages + 3
+    at.run()
+    assert not at.exception, at.exception
+    assert legende_page(at).startswith(f"Page {nb_pages} / {nb_pages}")
+    assert at.session_state[f"page_sport_{client.tables['joueuses'][0]['id']}"] == nb_pages - 1
@@ -0,0 +1,75 @@
+import random
+import textwrap
+
+import pytest
+
+import update_billets_from_storage as ingestion
+from benchmarks.generateur import pdf_texte, texte_billet
+from supabase_fake import FakeClient
+
+LEA = {"id": 1, "prenom": "Léa", "nom": "Martin"}
+HUGO = {"id": 2, "prenom": "Hugo", "nom": "Dubois"}
+NOE = {"id": 10_000, "prenom": "Noé", "nom": "Lefèvre"}
+
+
+def billet(personne, graine=0):
+    return pdf_texte([textwrap.wrap(texte_billet(personne, random.Random(graine)), 80)])
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = FakeClient(
+        {"joueuses": [LEA], "staff": [NOE], "billets": []},
+        {"Billets": {"lea.pdf": billet(LEA), "hugo.pdf": billet(HUGO, 1)}},
+    )
+    monkeypatch.setattr(ingestion, "supabase", client)
+    return client
+
+
+@pytest.fixture
+def chemins(tmp_path):
+    return dict(manifeste_path=str(tmp_path / "manifeste.json"),
+                cache_path=str(tmp_path / "cache.sqlite3"), max_processus=1)
+
+
+def attribues(client):
+    return {b["nom_fichier"]: b["joueuse_id"] for b in client.tables["billets"]}
+
+
+def test_billet_sans_correspondance_reexamine_si_le_roster_change(client, chemins):
+    rapport = ingestion.update_billets_from_storage(**chemins)
+    assert rapport["ajoutes"] == 1 and rapport["sans_correspondance"] == 1
+    assert attribues(client) == {"lea.pdf": 1}
+
+    # Roster inchangé : rien n'est retéléchargé
+    rapport = ingestion.update_billets_from_storage(**chemins)
+    assert rapport["ignores"] == 2 and rapport["telecharges"] == 0
+
+    client.tables["joueuses"].append(HUGO)
+    rapport = ingestion.update_billets_from_storage(**chemins)
+    assert rapport["ignores"] == 1 and rapport["ajoutes"] == 1
+    assert attribues(client) == {"lea.pdf": 1, "hugo.pdf": 2}
+
+
+def test_update_billets_db_requetes_groupees(client, chemins):
+    client.tables["joueuses"].append(HUGO)
+    client.tables["billets"] = [{"id": 1, "joueuse_id": 1, "nom_fichier": "ancien.pdf"},
+                                {"id": 2, "joueuse_id": 2, "nom_fichier": "perdu.pdf"}]
+    ingestion.update_billets_db(cache_path=chemins["cache_path"])
+
+    assert attribues(client) == {"lea.pdf": 1, "hugo.pdf": 2}
+    assert client.compteur == {
+        ("billets", "select"): 1,
+        ("storage:Billets", "list"): 1,
+        # Une seule suppression in_ pour les deux fichiers disparus
+        ("billets", "delete"): 1,
+        ("joueuses", "select"): 1,
+        ("staff", "select"): 1,
+        ("storage:Billets", "download"): 2,
+        ("billets", "insert"): 1,
+    }
+
+    # Base synchronisée : une lecture des billets et un listing, sans roster
+    client.reinitialiser_compteur()
+    ingestion.update_billets_db(cache_path=chemins["cache_path"])
+    assert client.compteur == {("billets", "select"): 1, ("storage:Billets", "list"): 1}
@@ -0,0 +1,105 @@
+import json
+import sqlite3
+from itertools import count
+
+import pytest
+
+import cache_textes
+import update_billets_from_storage as ingestion
+from benchmarks.generateur import pdf_texte
+from cache_textes import CacheTextes, empreinte
+from supabase_fake import FakeClient
+
+MOTS = ["billet", "lea", "martin"]
+
+
+def taille(mots):
+    return len(json.dumps(mots, ensure_ascii=False).encode("utf-8"))
+
+
+@pytest.fixture
+def chemin(tmp_path, monkeypatch):
+    # Horloge strictement croissante : l'ordre des accès ne dépend pas de la
+    # résolution de time.time()
+    horloge = count()
+    monkeypatch.setattr(cache_textes.time, "time", lambda: next(horloge))
+    return str(tmp_path / "cache.sqlite3")
+
+
+def test_hits_et_misses(chemin):
+    with CacheTextes(chemin) as cache:
+        assert cache.lire("a") is None
+        cache.ecrire("a", MOTS, "lea.pdf", complet=False)
+        cache.associer("a", 1)
+        assert cache.lire("a") == {"mots": MOTS, "nom_fichier": "lea.pdf",
+                                   "personne_id": 1, "complet": False}
+        assert cache.lire("b") is None
+        assert cache.stats() == {"cache_hits": 1, "cache_misses": 2}
+
+    # Persistant d'une ouverture à l'autre, compteurs remis à zéro
+    with CacheTextes(chemin) as cache:
+        assert cache.lire("a")["mots"] == MOTS
+        assert cache.stats() == {"cache_hits": 1, "cache_misses": 0}
+
+
+def test_eviction_des_moins_recemment_lus(chemin):
+    with CacheTextes(chemin, taille_max=3 * taille(MOTS)) as cache:
+        for cle in "abc":
+            cache.ecrire(cle, MOTS)
+        # "a" relu : "b" devient la plus ancienne entrée
+        assert cache.lire("a") is not None
+        cache.ecrire("d", MOTS)
+        assert [cle for cle in "abcd" if cache.lire(cle) is not None] == ["a", "c", "d"]
+
+        # Une grosse entrée évince autant d'entrées anciennes que nécessaire
+        cache.ecrire("e", MOTS * 2)
+        assert [cle for cle in "acde" if cache.lire(cle) is not None] == ["d", "e"]
+
+
+def test_remplacement_d_une_entree(chemin):
+    with CacheTextes(chemin, taille_max=2 * taille(MOTS)) as cache:
+        cache.ecrire("a", MOTS)
+        cache.ecrire("b", MOTS)
+        # Réécrire une clé remplace sa taille au lieu de l'ajouter
+        cache.ecrire("a", MOTS, complet=False)
+        assert cache.lire("a")["complet"] is False and cache.lire("b") is not None
+
+
+def test_ancien_format_reconstruit(chemin):
+    conn = sqlite3.connect(chemin)
+    conn.execute("CREATE TABLE textes (empreinte TEXT PRIMARY KEY, mots TEXT NOT NULL,"
+                 " taille INTEGER NOT NULL, dernier_acces REAL NOT NULL)")
+    conn.execute("INSERT INTO textes VALUES ('a', '[]', 2, 0)")
+    conn.commit()
+    conn.close()
+
+    with CacheTextes(chemin) as cache:
+        assert cache.lire("a") is None
+        cache.ecrire("a", MOTS)
+        assert cache.lire("a")["complet"] is True
+
+
+def test_fichier_remplace_reexamine(tmp_path, monkeypatch):
+    # Même nom, nouveau contenu : la signature de stockage change, le billet
+    # est retéléchargé et son texte, d'empreinte différente, réanalysé
+    lea = {"id": 1, "prenom": "Léa", "nom": "Martin"}
+    hugo = {"id": 2, "prenom": "Hugo", "nom": "Dubois"}
+    client = FakeClient({"joueuses": [lea, hugo], "staff": [], "billets": []},
+                        {"Billets": {"billet.pdf": pdf_texte([["Billet de Léa Martin"]])}})
+    monkeypatch.setattr(ingestion, "supabase", client)
+    chemins = dict(manifeste_path=str(tmp_path / "manifeste.json"),
+                   cache_path=str(tmp_path / "cache.sqlite3"), max_processus=1)
+
+    rapport = ingestion.update_billets_from_storage(**chemins)
+    assert rapport["ajoutes"] == 1 and rapport["cache_misses"] == 1
+    rapport = ingestion.update_billets_from_storage(**chemins)
+    assert rapport["ignores"] == 1 and rapport["telecharges"] == 0
+
+    nouveau = pdf_texte([["Billet de Hugo Dubois"]])
+    client.storage.from_("Billets").upload("billet.pdf", nouveau)
+    rapport = ingestion.update_billets_from_storage(**chemins)
+    assert rapport["telecharges"] == 1 and rapport["mis_a_jour"] == 1
+    assert rapport["cache_misses"] == 1 and rapport["cache_hits"] == 0
+    assert [b["joueuse_id"] for b in client.tables["billets"]] == [2]
+    with CacheTextes(chemins["cache_path"]) as cache:
+        assert cache.lire(empreinte(nouveau))["personne_id"] == 2
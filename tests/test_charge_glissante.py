@@ -0,0 +1,110 @@
+import math
+import random
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+
+from analyse import (compute_charge_batch, agreger_suivi_forme, fenetres_glissantes,
+                     ChargeGlissante, FENETRE_AIGUE, FENETRE_CHRONIQUE)
+from benchmarks.generateur import generer_equipe
+
+
+def recalcul_naif(df_suivi, joueuse_id, jour):
+    """Moyennes de charge_norm des suivis bruts des 7 et 28 jours finissant à `jour`."""
+    moyennes = []
+    for n in (FENETRE_AIGUE, FENETRE_CHRONIQUE):
+        masque = ((df_suivi["joueuse_id"] == joueuse_id)
+                  & (df_suivi["date"] > jour - timedelta(days=n))
+                  & (df_suivi["date"] <= jour))
+        valeurs = df_suivi.loc[masque, "charge_norm"]
+        moyennes.append(valeurs.mean() if len(valeurs) else None)
+    aigue, chronique = moyennes
+    rapport = aigue / chronique if aigue is not None and chronique else None
+    return aigue, chronique, rapport
+
+
+def identiques(a, b):
+    if a is None or b is None or (isinstance(a, float) and math.isnan(a)):
+        return (a is None or math.isnan(a)) and (b is None or math.isnan(b))
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+
+
+@pytest.fixture(scope="module")
+def suivis():
+    # Petite équipe sur une saison : le recalcul naïf reste rapide. Quelques
+    # jours à deux suivis vérifient la pondération par nb_suivis
+    df_suivi = pd.DataFrame(generer_equipe(3, 1, graine=0)["suivi_forme"])
+    rng = random.Random(0)
+    doublons = df_suivi.sample(frac=0.05, random_state=0).copy()
+    doublons["fatigue"] = [rng.randint(1, 5) for _ in range(len(doublons))]
+    df_suivi = pd.concat([df_suivi, doublons], ignore_index=True)
+    df_suivi["date"] = pd.to_datetime(df_suivi["date"]).dt.date
+    df_suivi["charge_norm"] = compute_charge_batch(df_suivi)["charge_norm"]
+    return df_suivi, agreger_suivi_forme(df_suivi)
+
+
+def test_naif_lot_et_incremental_identiques(suivis):
+    df_suivi, df_jours = suivis
+    jours = sorted(df_jours["date"].unique())
+    joueuses = sorted(df_jours["joueuse_id"].unique())
+    premiers = df_jours.groupby("joueuse_id")["date"].min()
+
+    lot = fenetres_glissantes(df_jours).set_index(["joueuse_id", "date"])
+    moteur = ChargeGlissante()
+    par_jour = dict(tuple(df_jours.groupby("date")))
+    for d in jours:
+        moteur.integrer(par_jour[d])
+        for j in joueuses:
+            if d < premiers[j]:
+                continue
+            attendu = recalcul_naif(df_suivi, j, d)
+            obtenu_lot = tuple(lot.loc[(j, d), ["charge_aigue", "charge_chronique", "rapport"]])
+            incremental = tuple(moteur.valeurs(j, d).values())
+            for a, b, c in zip(attendu, obtenu_lot, incremental):
+                assert identiques(a, b) and identiques(a, c), (j, d, attendu, obtenu_lot, incremental)
+
+
+@pytest.mark.parametrize("recul", [3, 20])
+def test_correction_jour_deja_integre(suivis, recul):
+    df_suivi, df_jours = suivis
+    moteur = ChargeGlissante()
+    moteur.integrer(df_jours)
+    dernier = max(df_jours["date"])
+    jour_corrige = dernier - timedelta(days=recul)
+    j = df_jours.loc[df_jours["date"] == jour_corrige, "joueuse_id"].iloc[0]
+
+    # Suivi modifié puis supprimé
+    masque = (df_suivi["joueuse_id"] == j) & (df_suivi["date"] == jour_corrige)
+    df_suivi = df_suivi.copy()
+    df_suivi.loc[masque, "charge_norm"] = 100.0
+    ligne = df_jours[(df_jours["joueuse_id"] == j) & (df_jours["date"] == jour_corrige)]
+    moteur.integrer(ligne.assign(charge=100.0, charge_carre=10_000.0))
+    assert all(identiques(a, b) for a, b in zip(recalcul_naif(df_suivi, j, dernier),
+                                                moteur.valeurs(j, dernier).values()))
+
+    df_suivi = df_suivi[~masque]
+    moteur.integrer(ligne.assign(nb_suivis=0, charge=None))
+    assert all(identiques(a, b) for a, b in zip(recalcul_naif(df_suivi, j, dernier),
+                                                moteur.valeurs(j, dernier).values()))
+
+
+def test_lecture_sans_effet_de_bord(suivis):
+    df_suivi, df_jours = suivis
+    j = df_jours["joueuse_id"].iloc[0]
+    df_jours = df_jours[df_jours["joueuse_id"] == j]
+    dernier = max(df_jours["date"])
+    moteur = ChargeGlissante()
+    moteur.integrer(df_jours)
+    avant = moteur.valeurs(j)
+
+    # Fenêtres d'un jour sans suivi, 10 jours plus tard : la fin ne bouge pas
+    plus_tard = dernier + timedelta(days=10)
+    valeurs = tuple(moteur.valeurs(j, plus_tard).values())
+    assert all(identiques(a, b) for a, b in zip(recalcul_naif(df_suivi, j, plus_tard), valeurs))
+    assert moteur.fin(j) == dernier
+    assert moteur.valeurs(j) == avant == moteur.valeurs(j, dernier)
+
+    # Un jour antérieur au dernier jour intégré est refusé
+    with pytest.raises(ValueError):
+        moteur.valeurs(j, dernier - timedelta(days=1))
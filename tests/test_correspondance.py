@@ -0,0 +1,59 @@
+import random
+
+import numpy as np
+import pytest
+from rapidfuzz import fuzz
+
+from benchmarks.generateur import generer_roster, generer_textes
+from correspondance import IndexNoms, normalize, meilleure_correspondance
+
+
+def mots(texte):
+    return [normalize(m) for m in texte.split() if normalize(m)]
+
+
+def nette_attendue(pdf_words, personnes, score_threshold, marge):
+    # Totaux exacts, sans seuil
+    totaux = sorted(((max(fuzz.ratio(normalize(p["prenom"]), w) for w in pdf_words)
+                      + max(fuzz.ratio(normalize(p["nom"]), w) for w in pdf_words)) / 2
+                     for p in personnes), reverse=True)
+    second = totaux[1] if len(totaux) > 1 else 0
+    return totaux[0] >= score_threshold and totaux[0] - second >= marge
+
+
+def test_second_score_non_tronque():
+    # Le nom de la seconde personne est sous score_minimal (40) : compté 0 par cdist,
+    # son total réel (100 + 33) / 2 = 67 ne laisse que 33 points d'avance
+    personnes = [{"id": 1, "prenom": "Lea", "nom": "Martin"},
+                 {"id": 2, "prenom": "Lea", "nom": "Thomas"}]
+    pdf_words = ["lea", "martin"]
+    assert max(fuzz.ratio("thomas", w) for w in pdf_words) < 40
+    index = IndexNoms(personnes, 70)
+    assert not index.correspondance_nette(pdf_words, marge=40)
+    assert index.correspondance_nette(pdf_words, marge=30)
+
+
+@pytest.mark.parametrize("graine", range(5))
+@pytest.mark.parametrize("marge", [5, 15, 30])
+def test_correspondance_nette_identique_au_calcul_exact(graine, marge):
+    rng = random.Random(graine)
+    personnes = generer_roster(30, rng)
+    index = IndexNoms(personnes, 70)
+    for texte in generer_textes(personnes, 20, rng):
+        pdf_words = mots(texte)
+        # Premières lignes seulement, comme une lecture page par page interrompue
+        pdf_words = pdf_words[:rng.randint(1, len(pdf_words))]
+        assert index.correspondance_nette(pdf_words, marge) == \
+            nette_attendue(pdf_words, personnes, 70, marge)
+
+
+@pytest.mark.parametrize("graine", range(3))
+def test_index_identique_a_la_reference(graine):
+    rng = random.Random(graine)
+    personnes = generer_roster(30, rng)
+    index = IndexNoms(personnes, 70)
+    for texte in generer_textes(personnes, 20, rng):
+        personne, score = index.meilleure_correspondance(mots(texte))
+        attendue, score_attendu = meilleure_correspondance(mots(texte), personnes)
+        if score_attendu >= 70:
+            assert personne is attendue and np.isclose(score, score_attendu)
@@ -0,0 +1,162 @@
+import pandas as pd
+import pytest
+import streamlit as st
+
+import donnees
+from analyse import agreger_activites, agreger_suivi_forme
+from benchmarks.generateur import generer_equipe
+from supabase_fake import FakeClient
+
+
+class Panne(Exception):
+    pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    equipe = generer_equipe(2, 1, n_staff=0, graine=0)
+    client = FakeClient({t: equipe[t] for t in ("joueuses", "activites", "suivi_forme",
+                                                "agregats_journaliers")})
+    monkeypatch.setattr(donnees, "supabase", client)
+    monkeypatch.setattr(donnees, "_agregats_en_retard", {})
+    # Sous AppTest (tests/test_app.py), st.cache_data garde les lectures
+    st.cache_data.clear()
+    return client
+
+
+def en_panne(client, monkeypatch, cible, operation, apres=0):
+    """Fait échouer les requêtes `operation` sur `cible` au-delà des `apres` premières."""
+    aller_retour = client._aller_retour
+    appels = []
+
+    def panne(c, o):
+        if (c, o) == (cible, operation):
+            appels.append(o)
+            if len(appels) > apres:
+                raise Panne(f"{cible} {operation}")
+        aller_retour(c, o)
+
+    monkeypatch.setattr(client, "_aller_retour", panne)
+    return lambda: monkeypatch.setattr(client, "_aller_retour", aller_retour)
+
+
+def agregats_attendus(client, joueuse_id):
+    brutes = {t: pd.DataFrame([l for l in client.tables[t] if l["joueuse_id"] == joueuse_id])
+              for t in ("activites", "suivi_forme")}
+    jours = agreger_activites(brutes["activites"]).merge(
+        agreger_suivi_forme(brutes["suivi_forme"]), on=["joueuse_id", "date"], how="outer")
+    return jours.set_index("date").sort_index()
+
+
+def agregats(client, joueuse_id, colonnes):
+    df = pd.DataFrame([l for l in client.tables["agregats_journaliers"]
+                       if l["joueuse_id"] == joueuse_id])
+    return df.set_index("date").sort_index()[colonnes]
+
+
+def test_ecriture_enregistree_malgre_agregats_en_echec(client, monkeypatch):
+    retablir = en_panne(client, monkeypatch, "agregats_journaliers", "upsert")
+    seance = {"joueuse_id": 1, "date": "2031-01-05", "sport": "Autre", "duree": "1h",
+              "difficulte": 7, "plaisir": 8, "commentaire": ""}
+    version = donnees.version_cache("activites", 1)
+
+    # L'insertion est faite : pas d'erreur, cache invalidé, jour gardé pour plus tard
+    donnees.inserer("activites", seance)
+    assert any(l["date"] == "2031-01-05" for l in client.tables["activites"])
+    assert donnees.version_cache("activites", 1) == version + 1
+    assert donnees._agregats_en_retard == {("activites", 1): {"2031-01-05"}}
+
+    # Toujours en panne : la lecture renvoie les anciens agrégats
+    donnees.charger_agregats(1, None)
+    assert donnees._agregats_en_retard
+
+    retablir()
+    lignes = donnees.charger_agregats(1, None)
+    assert donnees._agregats_en_retard == {}
+    jour = next(l for l in lignes if l["date"] == "2031-01-05")
+    assert jour["nb_seances"] == 1 and jour["difficulte"] == 7
+
+
+def test_suppression_enregistree_malgre_agregats_en_echec(client, monkeypatch):
+    retablir = en_panne(client, monkeypatch, "agregats_journaliers", "upsert")
+    ligne = next(l for l in client.tables["suivi_forme"] if l["joueuse_id"] == 2)
+    donnees.supprimer_plusieurs("suivi_forme", 2, [ligne["id"]])
+    assert all(l["id"] != ligne["id"] for l in client.tables["suivi_forme"])
+    assert donnees._agregats_en_retard == {("suivi_forme", 2): {ligne["date"]}}
+
+    retablir()
+    # Rattrapé à l'écriture suivante de la joueuse
+    autre = next(l for l in client.tables["suivi_forme"] if l["joueuse_id"] == 2)
+    donnees.supprimer_plusieurs("suivi_forme", 2, [autre["id"]])
+    assert donnees._agregats_en_retard == {}
+    attendus = agregats_attendus(client, 2)
+    pd.testing.assert_series_equal(agregats(client, 2, ["nb_suivis"])["nb_suivis"],
+                                   attendus["nb_suivis"].fillna(0).astype(int),
+                                   check_dtype=False)
+
+
+def test_reconstruction_interrompue_garde_les_agregats(client, monkeypatch):
+    monkeypatch.setattr(donnees, "TAILLE_LOT", 50)
+    avant = {(l["joueuse_id"], l["date"]) for l in client.tables["agregats_journaliers"]}
+    # Un jour absent des tables brutes, et un jour dont les séances ont été supprimées
+    client.tables["agregats_journaliers"].append({"joueuse_id": 1, "date": "2000-01-01",
+                                                 "nb_seances": 3, "nb_suivis": 0,
+                                                 "nb_durees_inconnues": 0})
+    dernier = max(l["date"] for l in client.tables["activites"] if l["joueuse_id"] == 2)
+    client.tables["activites"] = [l for l in client.tables["activites"]
+                                  if (l["joueuse_id"], l["date"]) != (2, dernier)]
+
+    retablir = en_panne(client, monkeypatch, "agregats_journaliers", "upsert", apres=2)
+    with pytest.raises(Panne):
+        donnees.reconstruire_agregats()
+    restants = {(l["joueuse_id"], l["date"]) for l in client.tables["agregats_journaliers"]}
+    assert avant <= restants
+
+    retablir()
+    donnees.reconstruire_agregats()
+    for joueuse_id in (1, 2):
+        attendus = agregats_attendus(client, joueuse_id)
+        obtenus = agregats(client, joueuse_id, ["nb_seances", "nb_suivis"])
+        assert list(obtenus.index) == list(attendus.index)
+        assert (obtenus["nb_seances"].values == attendus["nb_seances"].fillna(0).values).all()
+
+
+@pytest.mark.parametrize("jours", [None, 120])
+def test_page_historique_decoupage(client, jours):
+    debut = donnees.debut_fenetre(jours).isoformat() if jours else ""
+    attendues = sorted((l for l in client.tables["activites"]
+                        if l["joueuse_id"] == 1 and l["date"] >= debut),
+                       key=lambda l: (l["date"], l["id"]), reverse=True)
+    taille = 7
+    nb_pages = -(-len(attendues) // taille)
+    assert nb_pages > 2
+
+    client.reinitialiser_compteur()
+    pages = [donnees.charger_page_historique("activites", 1, jours, page, taille)
+             for page in range(nb_pages + 1)]
+    # Une requête par page, seules les lignes de la page sont lues
+    assert client.compteur == {("activites", "select"): nb_pages + 1}
+    for page, lignes in enumerate(pages[:-1]):
+        assert [l["id"] for l in lignes] == \
+            [l["id"] for l in attendues[page * taille:(page + 1) * taille]]
+        assert set(lignes[0]) == {c.strip() for c in donnees.COLONNES_ACTIVITES.split(",")}
+    assert 0 < len(pages[-2]) <= taille and pages[-1] == []
+
+
+def test_suppression_multiple_en_une_requete(client):
+    ids = [l["id"] for l in client.tables["activites"] if l["joueuse_id"] == 1][:3]
+    autre = next(l["id"] for l in client.tables["activites"] if l["joueuse_id"] == 2)
+    nb_lignes = len(client.tables["activites"])
+
+    client.reinitialiser_compteur()
+    # L'id d'une autre joueuse est filtré par joueuse_id
+    res = donnees.supprimer_plusieurs("activites", 1, [*ids, autre])
+    assert client.compteur[("activites", "delete")] == 1
+    assert client.compteur[("agregats_journaliers", "upsert")] == 1
+    assert sorted(l["id"] for l in res.data) == sorted(ids)
+    assert len(client.tables["activites"]) == nb_lignes - 3
+    assert any(l["id"] == autre for l in client.tables["activites"])
+
+    client.reinitialiser_compteur()
+    assert donnees.supprimer_plusieurs("activites", 1, []) is None
+    assert client.nb_requetes == 0
@@ -0,0 +1,147 @@
+import threading
+
+import pytest
+import streamlit as st
+
+import donnees
+from ecritures import EcrituresEnAttente
+from supabase_fake import FakeClient
+
+
+def seance(id_, date, plaisir=6):
+    return {"id": id_, "joueuse_id": 1, "date": date, "sport": "Autre", "duree": "1h",
+            "difficulte": 4, "plaisir": plaisir, "commentaire": ""}
+
+
+SEANCES = [seance(1, "2031-01-01"), seance(2, "2031-01-02"), seance(3, "2031-01-02", 8),
+           seance(4, "2031-01-03")]
+NOUVELLE = {k: v for k, v in seance(None, "2031-01-04", 9).items() if k != "id"}
+
+
+class Panne(Exception):
+    pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = FakeClient({"activites": SEANCES, "suivi_forme": [], "agregats_journaliers": []})
+    monkeypatch.setattr(donnees, "supabase", client)
+    donnees.reconstruire_agregats([1])
+    # Sous AppTest (tests/test_app.py), st.cache_data garde les lectures
+    st.cache_data.clear()
+    return client
+
+
+@pytest.fixture
+def feu(client, monkeypatch):
+    """Retient les écritures sur activites jusqu'à feu.set()."""
+    feu = threading.Event()
+    aller_retour = client._aller_retour
+
+    def retenir(cible, operation):
+        if cible == "activites" and operation in ("insert", "delete"):
+            assert feu.wait(10)
+        aller_retour(cible, operation)
+
+    monkeypatch.setattr(client, "_aller_retour", retenir)
+    yield feu
+    feu.set()
+
+
+@pytest.fixture
+def panne(client, monkeypatch):
+    aller_retour = client._aller_retour
+
+    def refuser(cible, operation):
+        aller_retour(cible, operation)
+        if cible == "activites" and operation in ("insert", "delete"):
+            raise Panne(operation)
+
+    monkeypatch.setattr(client, "_aller_retour", refuser)
+
+
+def lire():
+    return (donnees.charger_activites(1, None), donnees.charger_agregats(1, None),
+            donnees.charger_page_historique("activites", 1, None, 0, 10))
+
+
+def test_ajout_affiche_avant_confirmation(client, feu):
+    ecritures = EcrituresEnAttente()
+    ecritures.inserer("activites", NOUVELLE)
+
+    with ecritures.affichage() as erreurs:
+        assert erreurs == []
+        lignes, jours, page = lire()
+        assert [l["id"] for l in ecritures.lignes("activites", lignes, {1}, None)] \
+            == [1, 2, 3, 4, None]
+        jour = ecritures.agregats("activites", jours, 1, None)[-1]
+        assert (jour["date"], jour["nb_seances"], jour["plaisir"]) == ("2031-01-04", 1, 9)
+        assert [l["id"] for l in ecritures.page("activites", page, 1, None, 0, 10)] \
+            == [None, 4, 3, 2, 1]
+    assert len(client.tables["activites"]) == 4
+
+    feu.set()
+    assert ecritures.attendre() is False
+    with ecritures.affichage() as erreurs:
+        assert erreurs == []
+        lignes, jours, page = lire()
+        # Relu depuis Supabase : l'écriture n'est plus appliquée localement
+        assert [l["id"] for l in ecritures.lignes("activites", lignes, {1}, None)] \
+            == [1, 2, 3, 4, 5]
+        assert ecritures.agregats("activites", jours, 1, None) == jours
+
+
+def test_echecs_retires_avec_leur_message(client, panne):
+    ecritures = EcrituresEnAttente()
+    lignes, jours, page = lire()
+    ecritures.inserer("activites", NOUVELLE)
+    ecritures.supprimer("activites", 1, [lignes[0]])
+    assert ecritures.attendre() is True
+
+    with ecritures.affichage() as erreurs:
+        assert sorted(erreurs) == ["Erreur lors de l'enregistrement : insert",
+                                   "Erreur lors de la suppression : delete"]
+        assert ecritures.lignes("activites", lignes, {1}, None) == lignes
+        assert ecritures.agregats("activites", jours, 1, None) == jours
+        assert ecritures.page("activites", page, 1, None, 0, 10) == page
+    # Un message n'est renvoyé qu'une fois
+    with ecritures.affichage() as erreurs:
+        assert erreurs == []
+
+
+def test_page_positions(client, feu):
+    ecritures = EcrituresEnAttente()
+    ecritures.inserer("activites", {**NOUVELLE, "date": "2031-01-04", "commentaire": "A"})
+    ecritures.inserer("activites", {**NOUVELLE, "date": "2031-01-02", "commentaire": "B"})
+
+    def ids(lignes, page):
+        return [l["id"] or l["commentaire"]
+                for l in ecritures.page("activites", lignes, 1, None, page, 3)]
+
+    page0 = [{"id": 6, "date": "2031-01-06"}, {"id": 5, "date": "2031-01-05"},
+             {"id": 4, "date": "2031-01-03"}]
+    page1 = [{"id": 3, "date": "2031-01-03"}, {"id": 2, "date": "2031-01-02"},
+             {"id": 1, "date": "2031-01-01"}]
+    # Page complète : les lignes poussées hors de la page n'apparaissent qu'à la relecture
+    assert ids(page0, 0) == [6, 5, "A"]
+    # Après la première page, une ligne plus récente que toute la page est sur une page précédente
+    assert ids(page1, 1) == [3, "B", 2]
+    # Dernière page, incomplète : rien n'est retiré
+    assert ids([page1[0], page1[2]], 1) == [3, "B", 1]
+    # Page vide au-delà de l'historique
+    assert ids([], 0) == ["A", "B"]
+
+
+def test_suppression_qui_vide_un_jour(client, feu):
+    ecritures = EcrituresEnAttente()
+    lignes, jours, _ = lire()
+    ecritures.supprimer("activites", 1, [l for l in lignes if l["date"] == "2031-01-03"])
+    ecritures.supprimer("activites", 1, [l for l in lignes if l["id"] == 3])
+
+    obtenus = {j["date"]: j for j in ecritures.agregats("activites", jours, 1, None)}
+    assert obtenus["2031-01-03"]["nb_seances"] == 0
+    assert obtenus["2031-01-03"]["plaisir"] is None
+    assert obtenus["2031-01-03"]["minutes"] == 0
+    # Jour à deux séances dont une est retirée : moyenne de celle qui reste
+    assert (obtenus["2031-01-02"]["nb_seances"], obtenus["2031-01-02"]["plaisir"]) == (1, 6)
+    assert obtenus["2031-01-01"] == next(j for j in jours if j["date"] == "2031-01-01")
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+from graphiques import (pas_agregation, regrouper, type_trace, figure_suivi_sportif,
+                        BUDGET_POINTS, SEUIL_WEBGL)
+from schemas import dataframe
+
+
+def jours(n, debut="2030-01-01", freq="D"):
+    return pd.Series(pd.date_range(debut, periods=n, freq=freq))
+
+
+def agregats_aleatoires(n, graine=0, freq="D"):
+    rng = np.random.default_rng(graine)
+    return dataframe("agregats_journaliers", {
+        "date": jours(n, freq=freq).dt.strftime("%Y-%m-%d"),
+        "nb_seances": rng.integers(1, 4, n),
+        "plaisir": rng.integers(1, 11, n).astype(float),
+        "difficulte": rng.integers(1, 11, n).astype(float),
+    })
+
+
+def test_pas_selon_le_budget():
+    assert pas_agregation(jours(BUDGET_POINTS)) is None
+    assert pas_agregation(jours(BUDGET_POINTS + 1)) == "W"
+    # Plusieurs points par date : c'est leur nombre qui compte
+    assert pas_agregation(jours(100), n_points=BUDGET_POINTS) is None
+    assert pas_agregation(jours(100), n_points=BUDGET_POINTS + 1) == "W"
+    # Trop de semaines pour le budget : regroupement par mois
+    semaines = jours(BUDGET_POINTS, freq="W-MON")
+    assert pas_agregation(semaines, n_points=BUDGET_POINTS + 1) == "W"
+    assert pas_agregation(jours(BUDGET_POINTS + 1, freq="W-MON")) == "M"
+    assert pas_agregation(jours(20), budget=10) == "W"
+
+
+def test_type_de_trace_selon_le_seuil():
+    assert type_trace(SEUIL_WEBGL) is go.Scatter
+    assert type_trace(SEUIL_WEBGL + 1) is go.Scattergl
+    assert SEUIL_WEBGL < BUDGET_POINTS
+
+
+@pytest.mark.parametrize("pas", ["W", "M"])
+def test_regroupement_conserve_les_totaux(pas):
+    df = agregats_aleatoires(500, graine=1)
+    res = regrouper(df, ["plaisir", "difficulte"], pas)
+    assert res["nb"].sum() == len(df)
+    np.testing.assert_allclose((res[["plaisir", "difficulte"]].mul(res["nb"], axis=0)).sum(),
+                               df[["plaisir", "difficulte"]].sum())
+    debuts = res["date"].dt.to_period(pas).dt.start_time
+    assert (res["date"] == debuts).all() and res["date"].is_unique
+
+    # Moyennes pondérées : les totaux pondérés sont conservés
+    res = regrouper(df, ["plaisir", "difficulte"], pas, poids="nb_seances")
+    assert res["nb"].sum() == df["nb_seances"].sum()
+    np.testing.assert_allclose(
+        (res[["plaisir", "difficulte"]].mul(res["nb"], axis=0)).sum(),
+        df[["plaisir", "difficulte"]].mul(df["nb_seances"], axis=0).sum())
+
+
+def test_figure_regroupee_au_dela_du_budget():
+    df_jours = agregats_aleatoires(BUDGET_POINTS, graine=2)
+    fig = figure_suivi_sportif(df_jours)
+    n_seances = int(df_jours["nb_seances"].sum())
+    assert n_seances > BUDGET_POINTS
+    assert {type(t) for t in fig.data} == {go.Scattergl}
+    points = fig.data[2]
+    assert points.name == "Plaisir moyen par semaine"
+    assert len(points.x) <= BUDGET_POINTS and sum(points.customdata) == n_seances
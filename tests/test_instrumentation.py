@@ -0,0 +1,106 @@
+import json
+import threading
+
+import pytest
+import streamlit as st
+
+import donnees
+import instrumentation
+from instrumentation import ClientInstrumente, debut_rerun, fin_rerun, section, chronometre
+from benchmarks.generateur import generer_equipe
+from supabase_fake import FakeClient
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    chemin = tmp_path / "mesures.jsonl"
+    monkeypatch.setattr(instrumentation, "ACTIF", True)
+    monkeypatch.setattr(instrumentation, "FICHIER_LOG", str(chemin))
+    return chemin
+
+
+@pytest.fixture
+def client(monkeypatch):
+    equipe = generer_equipe(2, 1, n_staff=0, graine=0)
+    client = FakeClient({t: equipe[t] for t in ("joueuses", "activites", "suivi_forme")})
+    monkeypatch.setattr(donnees, "supabase", ClientInstrumente(client))
+    # Sous AppTest (tests/test_app.py), st.cache_data garde les lectures
+    st.cache_data.clear()
+    return client
+
+
+def lectures(joueuse_id, threads, page=0):
+    def lire(table):
+        threads.add(threading.get_ident())
+        return donnees.charger_page_historique(table, joueuse_id, None, page, 10)
+    return {"activites": (lire, "activites"), "suivi_forme": (lire, "suivi_forme")}
+
+
+def test_requetes_du_pool_attribuees_au_rerun(client, journal):
+    threads = set()
+    mesures = debut_rerun()
+    with section("lectures"):
+        futures = donnees.charger_en_parallele(lectures(1, threads))
+    assert all(len(f.result()) == 10 for f in futures.values())
+    assert threading.get_ident() not in threads
+
+    # Le thread du pool n'est plus rattaché au rerun une fois la lecture faite
+    donnees._executeur.submit(donnees.charger_page_historique, "activites", 1, None, 1, 10).result()
+    fin_rerun(mesures, page="Suivi sportif")
+
+    ligne = json.loads(journal.read_text(encoding="utf-8"))
+    assert ligne["page"] == "Suivi sportif" and ligne["nb_requetes"] == 2
+    assert sorted((r["cible"], r["operation"], r["lignes"]) for r in ligne["requetes"]) == \
+        [("activites", "select", 10), ("suivi_forme", "select", 10)]
+    assert ligne["octets"] > 0
+    assert [s["section"] for s in ligne["sections"]] == ["lectures"]
+
+
+def test_reruns_simultanes_separes(client, journal):
+    # Deux sessions en même temps partagent le pool : chacune ne voit que ses requêtes
+    depart = threading.Barrier(2)
+    resultats = {}
+
+    def rerun(joueuse_id):
+        mesures = debut_rerun()
+        depart.wait()
+        for page in range(3):
+            donnees.charger_en_parallele(lectures(joueuse_id, set(), page))
+        fin_rerun(mesures)
+        resultats[joueuse_id] = mesures
+
+    sessions = [threading.Thread(target=rerun, args=(j,)) for j in (1, 2)]
+    for t in sessions:
+        t.start()
+    for t in sessions:
+        t.join(30)
+
+    assert [m.resume()["nb_requetes"] for m in resultats.values()] == [6, 6]
+    assert len(journal.read_text(encoding="utf-8").splitlines()) == 2
+
+
+def test_requete_en_erreur_et_chronometre(client, journal, monkeypatch):
+    def panne(cible, operation):
+        raise ConnectionError("coupure")
+
+    monkeypatch.setattr(client, "_aller_retour", panne)
+
+    @chronometre("lecture")
+    def lire():
+        return donnees.charger_page_historique("activites", 1, None, 0, 10)
+
+    mesures = debut_rerun()
+    with pytest.raises(ConnectionError):
+        lire()
+    resume = mesures.resume()
+    assert [(r["cible"], r["erreur"], r["octets"]) for r in resume["requetes"]] == \
+        [("activites", "coupure", 0)]
+    assert [s["section"] for s in resume["sections"]] == ["lecture"]
+
+
+def test_inactif_sans_mesures(client, monkeypatch):
+    monkeypatch.setattr(instrumentation, "ACTIF", False)
+    assert debut_rerun() is None
+    futures = donnees.charger_en_parallele(lectures(1, set()))
+    assert len(futures["activites"].result()) == 10
+    fin_rerun(None)
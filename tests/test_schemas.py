@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+from schemas import convertir, dataframe, SCHEMAS, DATE, NOTE, COMPTEUR
+
+ACTIVITES = [
+    {"id": 1, "date": "2031-01-02", "sport": "🏃 Course", "duree": "1h", "difficulte": 7,
+     "plaisir": 5, "commentaire": "ok"},
+    {"id": 2, "date": "2031-01-01", "sport": "🚴 Vélo", "duree": None, "difficulte": 3,
+     "plaisir": 8, "commentaire": None},
+]
+
+
+def test_types_des_colonnes():
+    df = dataframe("activites", ACTIVITES)
+    assert df.dtypes.astype(str).to_dict() == {
+        "id": "int64", "date": "datetime64[ns]", "sport": "category", "duree": "string",
+        "difficulte": "int8", "plaisir": "int8", "commentaire": "string",
+    }
+    assert df["date"].tolist() == [pd.Timestamp("2031-01-02"), pd.Timestamp("2031-01-01")]
+    assert df["commentaire"].isna().tolist() == [False, True]
+    assert list(df["sport"].cat.categories) == ["🏃 Course", "🚴 Vélo"]
+
+
+@pytest.mark.parametrize("type_, nullable", [(NOTE, "Int8"), (COMPTEUR, "Int16")])
+def test_entiers_avec_valeur_manquante(type_, nullable):
+    assert str(convertir(pd.Series([1, 5]), type_).dtype) == type_
+    serie = convertir(pd.Series([1, None, 5]), type_)
+    assert str(serie.dtype) == nullable
+    assert serie.isna().tolist() == [False, True, False]
+
+
+def test_dates_iso():
+    serie = convertir(pd.Series(["2031-01-01", "2031-12-31"]), DATE)
+    assert str(serie.dtype) == DATE
+    assert serie.dt.strftime("%Y-%m-%d").tolist() == ["2031-01-01", "2031-12-31"]
+    with pytest.raises(ValueError):
+        convertir(pd.Series(["01/02/2031"]), DATE)
+
+
+def test_colonnes_manquantes():
+    # Seules les colonnes présentes sont converties, les autres ne sont pas créées
+    df = dataframe("suivi_forme", [{"date": "2031-01-01", "fatigue": 2}])
+    assert list(df.columns) == ["date", "fatigue"]
+    assert str(df["fatigue"].dtype) == "int8"
+
+    df = dataframe("suivi_forme", [{"date": "2031-01-01", "fatigue": 2}],
+                   colonnes=["id", "date", "fatigue", "humeur"])
+    assert list(df.columns) == ["id", "date", "fatigue", "humeur"]
+    assert df["humeur"].isna().all()
+
+
+@pytest.mark.parametrize("table", list(SCHEMAS))
+def test_resultat_vide(table):
+    colonnes = ["id", *SCHEMAS[table]]
+    df = dataframe(table, [], colonnes=colonnes)
+    assert df.empty and list(df.columns) == colonnes
+    assert str(df["date"].dtype) == DATE
+    assert dataframe(table, []).empty
@@ -0,0 +1,55 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+import supabase_client
+from supabase_client import CompteursConnexions, _transport
+
+
+class Reponses(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"[]")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def serveur():
+    serveur = ThreadingHTTPServer(("127.0.0.1", 0), Reponses)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{serveur.server_address[1]}"
+    serveur.shutdown()
+    serveur.server_close()
+
+
+def test_connexion_reutilisee(serveur):
+    compteurs = CompteursConnexions()
+    with httpx.Client(transport=_transport(compteurs)) as client:
+        for _ in range(3):
+            assert client.get(f"{serveur}/rest/v1/joueuses").status_code == 200
+    assert compteurs.resume() == {"requetes": 3, "connexions_ouvertes": 1,
+                                  "connexions_reutilisees": 2, "echecs": 0, "reprises": 0}
+
+
+def test_echecs_non_comptes_comme_reutilises(monkeypatch):
+    monkeypatch.setattr(supabase_client, "ATTENTE_S", 0)
+    # Port libre : connexion refusée à chaque essai
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    compteurs = CompteursConnexions()
+    with httpx.Client(transport=_transport(compteurs)) as client:
+        with pytest.raises(httpx.ConnectError):
+            client.get(f"http://127.0.0.1:{port}/rest/v1/joueuses")
+    assert compteurs.resume() == {"requetes": 3, "connexions_ouvertes": 0,
+                                  "connexions_reutilisees": 0, "echecs": 3, "reprises": 2}
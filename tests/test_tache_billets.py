@@ -0,0 +1,98 @@
+import random
+import textwrap
+import threading
+
+import pytest
+
+import update_billets_from_storage as ingestion
+from benchmarks.generateur import pdf_texte, texte_billet
+from supabase_fake import FakeClient
+from tache_billets import TacheBillets
+
+LEA = {"id": 1, "prenom": "Léa", "nom": "Martin"}
+HUGO = {"id": 2, "prenom": "Hugo", "nom": "Dubois"}
+NOE = {"id": 10_000, "prenom": "Noé", "nom": "Lefèvre"}
+
+
+def billet(personne, graine=0):
+    return pdf_texte([textwrap.wrap(texte_billet(personne, random.Random(graine)), 80)])
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Hugo n'est pas dans le roster, casse.pdf n'est pas un PDF
+    client = FakeClient(
+        {"joueuses": [LEA], "staff": [NOE], "billets": []},
+        {"Billets": {"lea.pdf": billet(LEA), "hugo.pdf": billet(HUGO, 1),
+                     "noe.pdf": billet(NOE, 2), "casse.pdf": b"pas un pdf"}},
+    )
+    monkeypatch.setattr(ingestion, "supabase", client)
+    return client
+
+
+@pytest.fixture
+def options(tmp_path):
+    return dict(manifeste_path=str(tmp_path / "manifeste.json"),
+                cache_path=str(tmp_path / "cache.sqlite3"), max_processus=1)
+
+
+@pytest.fixture
+def tache(tmp_path):
+    return TacheBillets(str(tmp_path / "synchro.lock"))
+
+
+def thread_synchro():
+    return next(t for t in threading.enumerate() if t.name == "synchro-billets")
+
+
+def test_second_lancement_refuse(client, options, tache, monkeypatch):
+    # Le listing du bucket attend le feu vert : l'exécution garde le verrou
+    feu = threading.Event()
+    aller_retour = client._aller_retour
+
+    def retenir(cible, operation):
+        if operation == "list":
+            assert feu.wait(10)
+        aller_retour(cible, operation)
+
+    monkeypatch.setattr(client, "_aller_retour", retenir)
+    try:
+        assert tache.lancer(**options) is True
+        thread = thread_synchro()
+        assert tache.en_cours()
+        assert tache.lancer(**options) is False
+        # Autre instance sur le même fichier de verrou (cron, autre processus)
+        assert TacheBillets(tache.chemin_verrou).executer(**options) is None
+    finally:
+        feu.set()
+    # a_la_fin est appelé avant la libération du verrou : on attend le thread
+    thread.join(30)
+
+    assert tache.etat()["statut"] == "terminee"
+    # Verrou libéré : une nouvelle exécution est acceptée
+    assert tache.executer(**options) is True
+
+
+def test_etat_termine_avec_compteurs(client, options, tache):
+    fini = threading.Event()
+    assert tache.etat() == {"statut": "inactive"}
+    assert tache.lancer(fini.set, **options) is True
+    thread_synchro().join(30)
+    assert fini.is_set()
+
+    etat = tache.etat()
+    assert etat["statut"] == "terminee" and etat["erreur"] is None
+    assert {k: etat[k] for k in ("a_traiter", "traites", "ignores", "attribues",
+                                 "sans_correspondance", "erreurs")} == {
+        "a_traiter": 4, "traites": 4, "ignores": 0, "attribues": 2,
+        "sans_correspondance": 1, "erreurs": 1,
+    }
+    assert sorted(etat["journal"]) == [("casse.pdf", "erreur"), ("hugo.pdf", "sans_correspondance"),
+                                       ("lea.pdf", "ajoute"), ("noe.pdf", "ajoute")]
+    assert etat["rapport"]["ajoutes"] == 2 and etat["fin"] >= etat["debut"]
+    assert sorted(b["nom_fichier"] for b in client.tables["billets"]) == ["lea.pdf", "noe.pdf"]
+
+    # Deuxième passage : seul le fichier en erreur, absent du manifeste, est retraité
+    assert tache.executer(**options) is True
+    etat = tache.etat()
+    assert (etat["a_traiter"], etat["traites"], etat["ignores"]) == (1, 1, 3)
@@ -1,30 +1,236 @@
 from supabase_client import supabase
+from correspondance import normalize, IndexNoms
+from cache_textes import CacheTextes, CACHE_BILLETS, empreinte
 import pdfplumber
-from rapidfuzz import fuzz
 from io import BytesIO
-import unicodedata
-import re
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import types
 
-def normalize(s: str) -> str:
+# Manifeste local des fichiers déjà examinés (signature de stockage + personne)
+MANIFESTE_BILLETS = os.getenv("BILLETS_MANIFESTE", ".billets_manifeste.json")
+
+# Avance minimale (en points de score) pour arrêter la lecture d'un PDF
+MARGE_ARRET = 15
+
+# Démarrage des processus d'extraction : la synchronisation tourne dans un thread
+# du serveur Streamlit, et un fork d'un processus multithread peut rester bloqué
+# sur un verrou tenu par un autre thread au moment du fork
+METHODE_PROCESSUS = ("forkserver" if "forkserver" in multiprocessing.get_all_start_methods()
+                     else "spawn")
+
+
+_CONTEXTE = multiprocessing.get_context(METHODE_PROCESSUS)
+
+
+class ProcessusExtraction(_CONTEXTE.Process):
+    """
+    Processus d'extraction.
+
+    Avec forkserver ou spawn, chaque processus réimporte le module __main__ du
+    parent. Sous Streamlit, __main__ est le script app.py lui-même : le
+    réexécuter hors session ferait échouer le processus. Le module principal
+    est donc masqué le temps du démarrage (les fonctions exécutées viennent
+    toutes de modules importables).
+    """
+
+    def start(self):
+        principal = sys.modules["__main__"]
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            super().start()
+        finally:
+            sys.modules["__main__"] = principal
+
+
+class ContexteExtraction(type(_CONTEXTE)):
+    """Contexte multiprocessing du pool d'extraction (voir ProcessusExtraction)."""
+    Process = ProcessusExtraction
+
+
+def telecharger(bucket_name: str, filename: str) -> bytes:
+    """Télécharge un fichier du bucket (exécuté dans le pool de threads)."""
+    return supabase.storage.from_(bucket_name).download(filename)
+
+
+def mots_par_page(pdf_bytes: bytes):
+    """
+    Générateur des mots normalisés d'un PDF, page par page.
+
+    Yields:
+        tuple: (mots de la page, nombre total de pages)
     """
-    Met en minuscules, enlève accents, apostrophes, espaces et caractères spéciaux.
+    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+        total = len(pdf.pages)
+        for page in pdf.pages:
+            page_text = page.extract_text() or ""
+            yield [normalize(w) for w in page_text.split()], total
+
+
+def extraire_mots(pdf_bytes: bytes, arret=None):
     """
-    s = s.lower()
-    s = ''.join(c for c in unicodedata.normalize('NFD', s)
-                if unicodedata.category(c) != 'Mn')
-    s = re.sub(r'[^a-z]', '', s)
-    return s
+    Mots normalisés d'un PDF (exécuté dans le pool de processus).
 
-def update_billets_from_storage(bucket_name="Billets", score_threshold=70):
+    La lecture s'arrête dès que `arret(mots lus jusqu'ici)` est vrai ; sans
+    `arret`, toutes les pages sont lues.
+
+    Returns:
+        tuple: (mots, pages lues, nombre total de pages)
+    """
+    mots = []
+    pages_lues = 0
+    total = 0
+    for mots_page, total in mots_par_page(pdf_bytes):
+        mots += mots_page
+        pages_lues += 1
+        if arret is not None and pages_lues < total and arret(mots):
+            break
+    return mots, pages_lues, total
+
+
+def signature(f: dict) -> dict:
+    """Métadonnées de stockage qui changent quand un fichier est remplacé."""
+    metadata = f.get("metadata") or {}
+    return {
+        "taille": metadata.get("size"),
+        "etag": metadata.get("eTag"),
+        "updated_at": f.get("updated_at"),
+    }
+
+
+def empreinte_roster(personnes) -> str:
+    """
+    Empreinte des noms normalisés du roster : elle change quand une personne
+    est ajoutée ou renommée, et les billets sans correspondance sont alors
+    réexaminés.
+    """
+    noms = sorted(f"{normalize(p['prenom'])} {normalize(p['nom'])}" for p in personnes)
+    return hashlib.sha1("\n".join(noms).encode()).hexdigest()
+
+
+def charger_manifeste(chemin=MANIFESTE_BILLETS) -> dict:
+    """
+    Manifeste local : nom de fichier -> signature, personne associée (ou None)
+    et, pour un billet sans correspondance, empreinte du roster examiné.
+    """
+    try:
+        with open(chemin, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def enregistrer_manifeste(manifeste: dict, chemin=MANIFESTE_BILLETS):
+    tmp = f"{chemin}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(manifeste, fh, ensure_ascii=False, indent=1)
+    os.replace(tmp, chemin)
+
+
+def attribuer_billet(filename, personne_id, connu=False, modifie=False):
+    """
+    Insère le billet de `personne_id`, ou le réattribue si le fichier connu a été remplacé.
+
+    Returns:
+        str: "ajoute", "mis_a_jour" ou "existant"
+    """
+    if not connu:
+        supabase.table("billets").insert({
+            "joueuse_id": personne_id,
+            "nom_fichier": filename,
+            "url_stockage": filename  # ou l’URL complète si nécessaire
+        }).execute()
+        return "ajoute"
+    if modifie:
+        supabase.table("billets").update({"joueuse_id": personne_id})\
+            .eq("nom_fichier", filename).execute()
+        return "mis_a_jour"
+    return "existant"
+
+
+def enregistrer_billet(filename, pdf_words, index, score_threshold, connu=False, modifie=False):
+    """
+    Étape d'écriture : associe les mots extraits à une personne et insère le billet.
+    Un billet déjà connu dont le fichier a été remplacé est réattribué.
+
+    Returns:
+        str: "ajoute", "mis_a_jour", "existant" ou "sans_correspondance"
+        personne_id: id de la personne retenue (ou None)
+    """
+    best_match, best_score = index.meilleure_correspondance(pdf_words)
+
+    # Vérifier si le score est suffisant
+    if best_score >= score_threshold and best_match is not None:
+        # Utiliser UUID de la personne (joueuse ou staff)
+        personne_id = best_match.get("id")
+        statut = attribuer_billet(filename, personne_id, connu, modifie)
+
+        if statut == "ajoute":
+            print(f"Billet ajouté pour {best_match['prenom']} {best_match['nom']}")
+        elif statut == "mis_a_jour":
+            print(f"Billet mis à jour pour {best_match['prenom']} {best_match['nom']} : {filename}")
+        else:
+            print(f"Billet déjà existant : {best_match['prenom']} - {filename}")
+        return statut, personne_id
+
+    print(f"Aucune correspondance fiable pour {filename}")
+    return "sans_correspondance", None
+
+
+def update_billets_from_storage(bucket_name="Billets", score_threshold=70,
+                                max_telechargements=4, max_processus=2,
+                                incremental=True, manifeste_path=MANIFESTE_BILLETS,
+                                cache_path=CACHE_BILLETS, marge=MARGE_ARRET,
+                                progression=None):
     """
     Parcourt tous les PDFs du bucket Supabase 'Billets', extrait le texte,
     associe le fichier à une joueuse ou un staff (UUID), et met à jour
     la table 'billets' uniquement si le fichier n'existe pas déjà.
+
+    Les fichiers passent par un pipeline : téléchargements dans un pool de
+    `max_telechargements` threads, extraction pdfplumber dans un pool de
+    `max_processus` processus, puis une seule étape d'écriture (correspondance
+    et insertion) sur le thread appelant.
+
+    En mode incrémental, un seul list() du bucket est comparé aux billets
+    connus (une requête) et au manifeste local des signatures (taille, eTag,
+    updated_at) : seuls les fichiers nouveaux ou remplacés sont téléchargés,
+    ainsi que les billets sans correspondance quand le roster a changé depuis
+    leur examen (empreinte_roster).
+
+    Les mots extraits sont mis en cache par empreinte du contenu (CacheTextes) :
+    un contenu déjà vu n'est pas réanalysé, et un doublon d'un billet déjà
+    attribué (même contenu, autre nom) reçoit directement la même personne.
+
+    Les pages sont lues une à une et la lecture s'arrête dès qu'une personne
+    dépasse le seuil avec `marge` points d'avance sur la suivante ; sinon le
+    PDF est lu en entier. Le rapport compte les pages lues et ignorées.
+
+    `progression(filename, statut, rapport)` est appelée une fois le listing
+    comparé (filename=None, statut "liste", rapport["a_traiter"] renseigné)
+    puis après chaque fichier traité, avec son statut : "ajoute",
+    "mis_a_jour", "existant", "doublon", "sans_correspondance" ou "erreur".
+
+    Returns:
+        dict: compteurs de la synchronisation (None si le bucket est vide)
     """
 
     # Récupérer toutes les joueuses et le staff
     joueurs = supabase.table("joueuses").select("*").execute().data
     staffs = supabase.table("staff").select("*").execute().data
+    # Noms normalisés une seule fois pour toute la synchronisation
+    index = IndexNoms(joueurs + staffs, score_threshold)
+    roster = empreinte_roster(joueurs + staffs)
+
+    # Billets déjà en base, en une seule requête
+    connus = {b["nom_fichier"] for b in
+              supabase.table("billets").select("nom_fichier").execute().data}
+    manifeste = charger_manifeste(manifeste_path)
 
     # Lister les fichiers du bucket
     files = supabase.storage.from_(bucket_name).list()
@@ -32,147 +238,224 @@ def update_billets_from_storage(bucket_name="Billets", score_threshold=70):
         print("Aucun fichier trouvé dans le bucket.")
         return
 
+    rapport = {"fichiers": len(files), "ignores": 0, "telecharges": 0, "ajoutes": 0,
+               "mis_a_jour": 0, "existants": 0, "sans_correspondance": 0, "doublons": 0,
+               "erreurs": 0, "pages_lues": 0, "pages_ignorees": 0, "a_traiter": 0}
+
+    def signaler(filename, statut):
+        if progression is not None:
+            progression(filename, statut, rapport)
+
+    a_traiter = {}
     for f in files:
         filename = f["name"]
+        sig = signature(f)
+        entree = manifeste.get(filename)
+        modifie = entree is not None and entree["signature"] != sig
 
-        try:
-            file_bytes = supabase.storage.from_(bucket_name).download(filename)
-        except Exception as e:
-            print(f"Erreur téléchargement {filename}: {e}")
-            continue
+        if incremental and not modifie:
+            # Un billet sans correspondance est réexaminé si le roster a changé
+            if entree is not None and (filename in connus or entree.get("roster") == roster):
+                rapport["ignores"] += 1
+                continue
+            if entree is None and filename in connus:
+                # Billet antérieur au manifeste : on l'adopte sans le télécharger
+                manifeste[filename] = {"signature": sig, "personne_id": None}
+                rapport["ignores"] += 1
+                continue
 
-        pdf_file = BytesIO(file_bytes)
-        text = ""
-        try:
-            with pdfplumber.open(pdf_file) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-        except Exception as e:
-            print(f"Erreur lecture PDF {filename}: {e}")
-            continue
-
-        pdf_words = [normalize(w) for w in text.split()]
-
-        # Chercher la meilleure correspondance parmi toutes les personnes
-        best_match = None
-        best_score = 0
-
-        # Joueurs
-        for j in joueurs:
-            prenom_norm = normalize(j['prenom'])
-            nom_norm = normalize(j['nom'])
-            score_prenom = max([fuzz.ratio(prenom_norm, w) for w in pdf_words])
-            score_nom = max([fuzz.ratio(nom_norm, w) for w in pdf_words])
-            total_score = (score_prenom + score_nom) / 2
-            if total_score > best_score:
-                best_score = total_score
-                best_match = j
-
-        # Staff
-        for s in staffs:
-            prenom_norm = normalize(s['prenom'])
-            nom_norm = normalize(s['nom'])
-            score_prenom = max([fuzz.ratio(prenom_norm, w) for w in pdf_words])
-            score_nom = max([fuzz.ratio(nom_norm, w) for w in pdf_words])
-            total_score = (score_prenom + score_nom) / 2
-            if total_score > best_score:
-                best_score = total_score
-                best_match = s
-
-        # Vérifier si le score est suffisant
-        if best_score >= score_threshold and best_match is not None:
-            # Utiliser UUID de la personne (joueuse ou staff)
-            personne_id = best_match.get("id")
-
-            # Vérifier si le billet existe déjà
-            existing = supabase.table("billets").select("*")\
-                .eq("nom_fichier", filename).execute().data
-
-            if not existing:
-                supabase.table("billets").insert({
-                    "joueuse_id": personne_id,
-                    "nom_fichier": filename,
-                    "url_stockage": filename  # ou l’URL complète si nécessaire
-                }).execute()
-                print(f"Billet ajouté pour {best_match['prenom']} {best_match['nom']}")
-            else:
-                print(f"Billet déjà existant : {best_match['prenom']} - {filename}")
-        else:
-            print(f"Aucune correspondance fiable pour {filename}")
-    update_billets_db()
+        a_traiter[filename] = (sig, modifie)
+
+    rapport["a_traiter"] = len(a_traiter)
+    signaler(None, "liste")
+
+    arret = partial(index.correspondance_nette, marge=marge)
+
+    def ecrire(filename, pdf_words, cle):
+        sig, modifie = a_traiter[filename]
+        statut, personne_id = enregistrer_billet(
+            filename, pdf_words, index, score_threshold,
+            connu=filename in connus, modifie=modifie,
+        )
+        rapport[{"ajoute": "ajoutes", "existant": "existants"}.get(statut, statut)] += 1
+        manifeste[filename] = {"signature": sig, "personne_id": personne_id}
+        if personne_id is None:
+            manifeste[filename]["roster"] = roster
+        cache.associer(cle, personne_id)
+        signaler(filename, statut)
+
+    with CacheTextes(cache_path) as cache, \
+            ThreadPoolExecutor(max_workers=max_telechargements) as telechargeurs, \
+            ProcessPoolExecutor(max_workers=max_processus,
+                                mp_context=ContexteExtraction()) as extracteurs:
+        telechargements = {
+            telechargeurs.submit(telecharger, bucket_name, filename): filename
+            for filename in a_traiter
+        }
+        extractions = {}
+        en_cours = set(telechargements)
+
+        while en_cours:
+            termines, en_cours = wait(en_cours, return_when=FIRST_COMPLETED)
+            for fut in termines:
+                if fut in telechargements:
+                    filename = telechargements[fut]
+                    try:
+                        file_bytes = fut.result()
+                    except Exception as e:
+                        print(f"Erreur téléchargement {filename}: {e}")
+                        rapport["erreurs"] += 1
+                        signaler(filename, "erreur")
+                        continue
+                    rapport["telecharges"] += 1
+                    cle = empreinte(file_bytes)
+                    entree = cache.lire(cle)
 
+                    if entree is None or not (entree["complet"]
+                                              or arret(entree["mots"])):
+                        # Absent du cache, ou seulement ses premières pages sans
+                        # résultat net : lecture complète dans ce dernier cas
+                        extraction = extracteurs.submit(
+                            extraire_mots, file_bytes, arret if entree is None else None)
+                        extractions[extraction] = (filename, cle)
+                        en_cours.add(extraction)
+                    elif (entree["nom_fichier"] != filename
+                          and entree["personne_id"] is not None):
+                        # Même contenu qu'un billet déjà attribué : pas de réanalyse
+                        sig, modifie = a_traiter[filename]
+                        attribuer_billet(filename, entree["personne_id"],
+                                         connu=filename in connus, modifie=modifie)
+                        print(f"Doublon de {entree['nom_fichier']} : {filename}")
+                        rapport["doublons"] += 1
+                        manifeste[filename] = {"signature": sig,
+                                               "personne_id": entree["personne_id"]}
+                        signaler(filename, "doublon")
+                    else:
+                        ecrire(filename, entree["mots"], cle)
+                else:
+                    filename, cle = extractions[fut]
+                    try:
+                        pdf_words, pages_lues, total = fut.result()
+                    except Exception as e:
+                        print(f"Erreur lecture PDF {filename}: {e}")
+                        rapport["erreurs"] += 1
+                        signaler(filename, "erreur")
+                        continue
+                    rapport["pages_lues"] += pages_lues
+                    rapport["pages_ignorees"] += total - pages_lues
+                    cache.ecrire(cle, pdf_words, filename, complet=pages_lues == total)
+                    ecrire(filename, pdf_words, cle)
 
-def update_billets_db():
+        rapport.update(cache.stats())
+
+    # On oublie les fichiers qui ne sont plus dans le bucket
+    noms = {f["name"] for f in files}
+    enregistrer_manifeste({k: v for k, v in manifeste.items() if k in noms}, manifeste_path)
+
+    print(f"Synchronisation : {rapport['telecharges']} téléchargé(s), "
+          f"{rapport['ignores']} inchangé(s) ignoré(s), {rapport['ajoutes']} ajouté(s), "
+          f"{rapport['mis_a_jour']} mis à jour, {rapport['doublons']} doublon(s), "
+          f"{rapport['erreurs']} erreur(s) ; cache : {rapport['cache_hits']} hit(s), "
+          f"{rapport['cache_misses']} miss ; pages : {rapport['pages_lues']} lue(s), "
+          f"{rapport['pages_ignorees']} ignorée(s)")
+
+    # Même listing, et sans revenir sur les fichiers déjà examinés
+    update_billets_db(files, deja_traites=noms)
+    return rapport
+
+
+def update_billets_db(files=None, deja_traites=(), bucket_name="Billets",
+                      cache_path=CACHE_BILLETS):
+    """
+    Synchronise la table 'billets' avec le storage : supprime les billets dont
+    le fichier a disparu et ajoute ceux qui manquent.
+
+    La réconciliation est ensembliste : une lecture des billets, au plus une
+    lecture du roster, une suppression `in_` pour tous les fichiers disparus et
+    une insertion groupée pour tous les nouveaux billets. Les PDFs déjà
+    analysés sont relus depuis le cache de textes (CacheTextes).
+
+    Args:
+        files: listing du bucket déjà obtenu (sinon le bucket est relisté)
+        deja_traites: fichiers déjà examinés par update_billets_from_storage
+    """
 
-    bucket_name = "Billets"
     billets_db = supabase.table("billets").select("nom_fichier").execute().data
 
     existing_filenames = {b["nom_fichier"] for b in billets_db}
-    files = supabase.storage.from_(bucket_name).list()
+    if files is None:
+        files = supabase.storage.from_(bucket_name).list()
 
     current_storage_files = {f["name"] for f in files if f["name"].endswith(".pdf")}
 
     # --- 1️⃣ Nettoyage : suppression des billets absents du storage ---
-    missing_files = existing_filenames - current_storage_files
-    for missing in missing_files:
-        supabase.table("billets").delete().eq("nom_fichier", missing).execute()
-        print(f"🗑️ Supprimé {missing} (absent du storage)")
+    missing_files = sorted(existing_filenames - current_storage_files)
+    if missing_files:
+        supabase.table("billets").delete().in_("nom_fichier", missing_files).execute()
+        for missing in missing_files:
+            print(f"🗑️ Supprimé {missing} (absent du storage)")
 
-    # --- 2️⃣ Boucle principale : ajout / mise à jour ---
-    for f in files:
-        if not f["name"].endswith(".pdf"):
-            continue
+    # --- 2️⃣ Ajout des billets manquants ---
+    nouveaux = sorted(current_storage_files - existing_filenames - set(deja_traites))
+    if not nouveaux:
+        print("🧹 Nettoyage terminé : base billets synchronisée avec le storage.")
+        return
 
-        filename = f["name"]
-        url = supabase.storage.from_(bucket_name).get_public_url(filename)
-
-        # Vérifie si le billet existe déjà
-        existing = supabase.table("billets").select("*").eq("nom_fichier", filename).execute().data
-        if existing:
-            continue  # on ne duplique pas
-
-        # Télécharge le PDF pour analyse (lecture texte)
-        pdf_bytes = supabase.storage.from_(bucket_name).download(filename)
-        reader = PdfReader(BytesIO(pdf_bytes))
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
-
-        # Nettoyage du texte
-        def normalize(s):
-            s = s.upper()
-            s = unicodedata.normalize("NFD", s)
-            s = "".join(c for c in s if unicodedata.category(c) != "Mn")
-            return s.replace(" ", "").replace("-", "")
-
-        text_norm = normalize(text)
-
-        # Recherche joueuse
-        joueuses = supabase.table("joueuses").select("id, prenom, nom").execute().data
-        staff = supabase.table("staff").select("id, prenom, nom").execute().data
-
-        best_match = None
-        best_score = 0
-
-        for person in joueuses + staff:
-            nom = normalize(person["nom"])
-            prenom = normalize(person["prenom"])
-            score = (nom in text_norm) + (prenom in text_norm)
-            if score > best_score:
-                best_score = score
-                best_match = person
-
-        if best_match and best_score >= 1:
-            supabase.table("billets").insert({
-                "joueuse_id": best_match["id"],  # même clé pour staff, peu importe
-                "stage_id": None,
-                "nom_fichier": filename,
-                "url_stockage": url,
-            }).execute()
-            print(f"✅ Ajouté : {filename} → {best_match['prenom']} {best_match['nom']}")
-        else:
-            print(f"⚠️ Aucun match trouvé pour {filename}")
+    # Roster lu et normalisé une seule fois
+    joueuses = supabase.table("joueuses").select("id, prenom, nom").execute().data
+    staff = supabase.table("staff").select("id, prenom, nom").execute().data
+    personnes = [(p, normalize(p["nom"]), normalize(p["prenom"]))
+                 for p in joueuses + staff]
+
+    def scores(mots):
+        # Texte normalisé sans séparateurs, pour la recherche de sous-chaînes
+        text_norm = "".join(mots)
+        return [(nom in text_norm) + (prenom in text_norm) for _, nom, prenom in personnes]
+
+    def arret(mots):
+        # Une seule personne dont le nom et le prénom figurent déjà dans le texte
+        return scores(mots).count(2) == 1
+
+    lignes = []
+    pages_lues = pages_ignorees = 0
+    with CacheTextes(cache_path) as cache:
+        for filename in nouveaux:
+            try:
+                pdf_bytes = telecharger(bucket_name, filename)
+                cle = empreinte(pdf_bytes)
+                entree = cache.lire(cle)
+                if entree is None or not (entree["complet"] or arret(entree["mots"])):
+                    mots, lues, total = extraire_mots(pdf_bytes, arret if entree is None else None)
+                    pages_lues += lues
+                    pages_ignorees += total - lues
+                    entree = {"mots": mots}
+                    cache.ecrire(cle, mots, filename, complet=lues == total)
+            except Exception as e:
+                print(f"Erreur lecture PDF {filename}: {e}")
+                continue
+
+            best_match = None
+            best_score = 0
+
+            for (person, _, _), score in zip(personnes, scores(entree["mots"])):
+                if score > best_score:
+                    best_score = score
+                    best_match = person
+
+            if best_match and best_score >= 1:
+                lignes.append({
+                    "joueuse_id": best_match["id"],  # même clé pour staff, peu importe
+                    "stage_id": None,
+                    "nom_fichier": filename,
+                    "url_stockage": filename,  # l'app préfixe l'URL publique du bucket
+                })
+                print(f"✅ Ajouté : {filename} → {best_match['prenom']} {best_match['nom']}")
+            else:
+                print(f"⚠️ Aucun match trouvé pour {filename}")
+
+    if lignes:
+        supabase.table("billets").insert(lignes).execute()
 
+    print(f"Cache de textes : {cache.hits} hit(s), {cache.misses} miss ; "
+          f"pages : {pages_lues} lue(s), {pages_ignorees} ignorée(s)")
     print("🧹 Nettoyage terminé : base billets synchronisée avec le storage.")